@@ -0,0 +1,43 @@
+"""Minimal Django configuration for benchmarks that exercise fitness_app models."""
+import os
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "octofit_tracker", "backend")
+
+
+def setup_django(database_url=None):
+    """Configure Django against ``database_url`` (in-memory SQLite by default) and migrate.
+
+    Against a real server the benchmark runs in a throwaway test database, so
+    point it at a server, not at data you care about. Returns a teardown callable.
+    """
+    sys.path.insert(0, BACKEND)
+    import dj_database_url
+    import django
+    from django.conf import settings
+
+    database = dj_database_url.parse(database_url) if database_url else {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+    if database["ENGINE"].endswith("sqlite3") and database["NAME"] != ":memory:":
+        # Django would otherwise test against a shared in-memory database, where
+        # concurrent writers fail instead of waiting for the lock
+        database["TEST"] = {"NAME": database["NAME"]}
+        database.setdefault("OPTIONS", {})["timeout"] = 30
+    settings.configure(
+        DATABASES={"default": database},
+        INSTALLED_APPS=[
+            "django.contrib.contenttypes",
+            "django.contrib.auth",
+            "rest_framework",
+            "fitness_app",
+        ],
+        ALLOWED_HOSTS=["testserver"],
+        USE_TZ=True,
+    )
+    django.setup()
+    from django.db import connection
+
+    test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    return lambda: connection.creation.destroy_test_db(test_name, verbosity=0)
@@ -0,0 +1,102 @@
+"""Load benchmark for the health check and metrics servers.
+
+Starts ``HealthCheckHandler`` and ``MetricsHandler`` under every server mode and
+drives them with concurrent keep-alive clients, reporting requests/sec and latency
+percentiles.
+
+Usage (from the repository root):
+
+    python -m benchmarks.http_servers --clients 32 --requests 500
+"""
+import argparse
+import http.client
+import os
+import threading
+import time
+
+# The benchmark measures server throughput, not the per-IP rate limiter
+os.environ.setdefault("RATE_LIMIT", str(10 ** 9))
+
+from octofit_tracker.backend.overachievers import HealthCheckHandler, MetricsHandler  # noqa: E402
+from octofit_tracker.backend.overachievers.servers import SERVER_MODES, make_server  # noqa: E402
+
+TARGETS = [
+    ("HealthCheckHandler", HealthCheckHandler, "/health"),
+    ("MetricsHandler", MetricsHandler, "/metrics"),
+]
+
+
+def percentile(sorted_values, pct):
+    """Return the ``pct`` percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_client(port, path, requests, latencies, errors):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors.append(1)
+                connection.close()
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+def bench(handler_class, path, mode, clients, requests, max_workers):
+    server = make_server(("127.0.0.1", 0), handler_class, mode=mode, max_workers=max_workers)
+    port = server.server_address[1]
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    latencies, errors = [], []
+    workers = [
+        threading.Thread(target=run_client, args=(port, path, requests, latencies, errors))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    server.shutdown()
+    server.server_close()
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--max-workers", type=int, default=16, help="server worker pool size")
+    parser.add_argument("--modes", nargs="+", default=list(SERVER_MODES), choices=SERVER_MODES)
+    args = parser.parse_args(argv)
+
+    print(f"{'handler':<20} {'mode':<10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for name, handler_class, path in TARGETS:
+        for mode in args.modes:
+            result = bench(handler_class, path, mode, args.clients, args.requests, args.max_workers)
+            print(f"{name:<20} {mode:<10} {result['rps']:>10.0f} {result['p50_ms']:>10.2f} "
+                  f"{result['p99_ms']:>10.2f} {result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Import-time budget check for the overachievers package.
+
+Imports the package in fresh interpreters under ``python -X importtime`` and
+reports the best cumulative import time, the slowest modules it pulled in, and
+any heavy dependency that was imported eagerly. Exits non-zero when the import
+exceeds the budget or loads a heavy dependency, so it can gate CI.
+
+Usage (from the repository root):
+
+    python -m benchmarks.import_time --budget-ms 150 --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PACKAGE = "octofit_tracker.backend.overachievers"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 150))
+# Dependencies that must only be imported when the feature using them runs
+HEAVY_MODULES = ("celery", "redis", "dotenv", "json_log_formatter", "smtplib", "asyncio", "django")
+
+# Runs in the child interpreter after the import; reports what the import left behind
+_PROBE = (
+    "import sys, threading; import {module}; "
+    "print(threading.active_count()); "
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def parse_importtime(stderr, module=PACKAGE):
+    """Return ``(total_us, [(cumulative_us, name), ...])`` for the import of ``module``.
+
+    Interpreter start-up modules are listed first; everything from the first
+    top-level line belonging to ``module`` onwards is the cost of the import.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Drop the separator space; the indentation that remains is the nesting depth
+        rows.append((int(cumulative), name[1:].rstrip()))
+    root = module.split(".")[0]
+    start = next(
+        (i for i, (_, name) in enumerate(rows) if name.strip() == root or name.strip().startswith(root + ".")),
+        None,
+    )
+    if start is None:
+        raise ValueError(f"{module} does not appear in the -X importtime output.")
+    # Nested imports are printed (indented) before their parent; top-level lines hold the totals
+    total = sum(cumulative for cumulative, name in rows[start:] if not name.startswith(" "))
+    modules = [(cumulative, name.strip()) for cumulative, name in rows[start:]]
+    return total, modules
+
+
+def measure_import(module=PACKAGE, runs=5):
+    """Import ``module`` in ``runs`` fresh interpreters and return the fastest run.
+
+    The result is a dict with the total import time in milliseconds, the
+    modules it imported, the number of live threads afterwards and the heavy
+    dependencies that ended up in ``sys.modules``.
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            cwd=REPO_ROOT,
+            timeout=60,
+            check=True,
+        )
+        total_us, modules = parse_importtime(result.stderr, module)
+        threads, heavy = result.stdout.splitlines()[-2:]
+        run = {
+            "total_ms": total_us / 1000,
+            "modules": modules,
+            "threads": int(threads),
+            "heavy_modules": [name for name in heavy.split(",") if name],
+        }
+        if best is None or run["total_ms"] < best["total_ms"]:
+            best = run
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=PACKAGE, help="module to import")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS, help="maximum import time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    result = measure_import(args.module, args.runs)
+    print(f"{'module':<60} {'cumulative ms':>14}")
+    for cumulative, name in sorted(result["modules"], reverse=True)[:args.top]:
+        print(f"{name:<60} {cumulative / 1000:>14.1f}")
+    print()
+    print(f"import {args.module}: {result['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"threads after import: {result['threads']}")
+    print(f"heavy modules imported: {', '.join(result['heavy_modules']) or 'none'}")
+
+    failures = []
+    if result["total_ms"] > args.budget_ms:
+        failures.append(f"import took {result['total_ms']:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if result["heavy_modules"]:
+        failures.append(f"imported eagerly: {', '.join(result['heavy_modules'])}")
+    if result["threads"] != 1:
+        failures.append(f"import started {result['threads'] - 1} thread(s)")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
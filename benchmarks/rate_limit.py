@@ -0,0 +1,84 @@
+"""Micro-benchmark: RateLimiter versus the original ``is_rate_limited`` function.
+
+Feeds every limiter a stream of distinct client IPs (a scanner spraying source
+addresses) and reports the cost per check and the memory retained afterwards.
+
+Usage (from the repository root):
+
+    python -m benchmarks.rate_limit --clients 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import defaultdict
+
+from octofit_tracker.backend.overachievers.rate_limit import RATE_LIMIT_MODES, RateLimiter
+
+RATE_LIMIT = 5
+
+
+def make_legacy_limiter():
+    """The original unbounded, lock-free fixed-window implementation."""
+    rate_limit_data = defaultdict(lambda: {"last_request": 0, "request_count": 0})
+
+    def is_rate_limited(client_ip):
+        current_time = time.time()
+        client_data = rate_limit_data[client_ip]
+        if current_time - client_data["last_request"] > 1:
+            client_data["last_request"] = current_time
+            client_data["request_count"] = 1
+            return False
+        else:
+            client_data["request_count"] += 1
+            if client_data["request_count"] > RATE_LIMIT:
+                return True
+            return False
+
+    return is_rate_limited
+
+
+def client_ips(count):
+    return [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(count)]
+
+
+def measure(name, make_check, ips):
+    """Time one pass over ``ips``, then repeat it under tracemalloc for memory."""
+    gc.collect()
+    check = make_check()
+    started = time.perf_counter()
+    for ip in ips:
+        check(ip)
+    elapsed = time.perf_counter() - started
+    del check
+
+    gc.collect()
+    tracemalloc.start()
+    check = make_check()
+    for ip in ips:
+        check(ip)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed / len(ips) * 1e9:>10.0f} {len(ips) / elapsed:>12.0f} {retained / 2 ** 20:>12.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1_000_000, help="distinct client IPs")
+    parser.add_argument("--max-clients", type=int, default=100_000, help="RateLimiter client cap")
+    args = parser.parse_args(argv)
+
+    ips = client_ips(args.clients)
+    print(f"{'limiter':<28} {'ns/check':>10} {'checks/s':>12} {'retained MiB':>12}")
+
+    measure("is_rate_limited (legacy)", make_legacy_limiter, ips)
+    for mode in RATE_LIMIT_MODES:
+        measure(
+            f"RateLimiter ({mode})",
+            lambda: RateLimiter(RATE_LIMIT, period=1, mode=mode, max_clients=args.max_clients).is_limited,
+            ips,
+        )
+
+
+if __name__ == "__main__":
+    main()
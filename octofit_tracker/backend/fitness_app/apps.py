@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FitnessAppConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "fitness_app"
+
+    def ready(self):
+        # Register signal handlers (cache invalidation)
+        from . import signals  # noqa: F401
@@ -0,0 +1,41 @@
+"""Daily badge awards.
+
+An award used to fetch the badge, get-or-create the day's counter, read it and
+write it back: four queries, and concurrent taps could all pass the limit check
+before any of them wrote. Now the badge and its season come from the cached
+catalog (see catalog.py) and the limit is enforced by a conditional UPDATE
+(``DailyBadgeLimit.claim``), so an award is normally a single query.
+"""
+import time
+
+from overachievers.metrics import REGISTRY
+
+from .catalog import get_catalog_badge
+from .models import DailyBadgeLimit, PurchasableBadge
+
+badge_award_duration = REGISTRY.histogram(
+    "badge_award_duration_seconds",
+    "Time to check and record a daily badge award, by outcome.",
+    labelnames=("outcome",),
+)
+
+AWARDED = "awarded"
+NOT_FOUND = "not_found"
+OUT_OF_SEASON = "out_of_season"
+LIMIT_REACHED = "limit_reached"
+
+
+def award_badge(user, badge_id):
+    """Award badge ``badge_id`` to ``user`` if it is in season and under today's limit; return the outcome."""
+    started = time.perf_counter()
+    badge = get_catalog_badge(badge_id)
+    if badge is None:
+        outcome = NOT_FOUND
+    elif badge["season"] != PurchasableBadge.current_season():
+        outcome = OUT_OF_SEASON
+    elif not DailyBadgeLimit.claim(user):
+        outcome = LIMIT_REACHED
+    else:
+        outcome = AWARDED
+    badge_award_duration.observe(time.perf_counter() - started, outcome=outcome)
+    return outcome
@@ -0,0 +1,52 @@
+"""Cached badge catalog.
+
+The purchasable badge catalog is read on every visit to the shop but changes
+only when an admin edits a badge or tier. ``get_badge_catalog`` serves a
+serialized snapshot from the cache and rebuilds it with a single query (badges
+joined to their tiers) when it is missing.
+
+Snapshots are keyed by the badge and tier version stamps (see versions.py),
+which signals bump whenever a ``PurchasableBadge`` or ``BadgeTier`` is saved or
+deleted. Bulk operations (``QuerySet.update``, ``bulk_create``) send no signals
+and must call ``invalidate_badge_catalog``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import BadgeTier, PurchasableBadge
+from .serializers import PurchasableBadgeSerializer
+from .versions import bump_version, get_version
+
+CATALOG_CACHE_TIMEOUT = getattr(settings, "BADGE_CATALOG_CACHE_TIMEOUT", 60 * 60)
+SNAPSHOT_KEY = "fitness_app:badge-catalog:{badges}-{tiers}"
+# Version stamps the catalog depends on
+CATALOG_RESOURCES = (PurchasableBadge._meta.model_name, BadgeTier._meta.model_name)
+
+
+def get_badge_catalog():
+    """Return the serialized catalog: a list of badges with their nested tier.
+
+    Icons are relative URLs, so one snapshot serves every host; views make them
+    absolute per request.
+    """
+    # A snapshot built from data read before a write is stored under the old
+    # stamps and never served.
+    badges, tiers = (get_version(resource) for resource in CATALOG_RESOURCES)
+    key = SNAPSHOT_KEY.format(badges=badges, tiers=tiers)
+    catalog = cache.get(key)
+    if catalog is None:
+        badges = PurchasableBadge.objects.select_related("tier").order_by("id")
+        catalog = PurchasableBadgeSerializer(badges, many=True).data
+        catalog = [dict(badge, tier=dict(badge["tier"])) for badge in catalog]
+        cache.set(key, catalog, timeout=CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+
+def get_catalog_badge(badge_id):
+    """Return the catalog entry for ``badge_id`` (an int or a numeric string), or None."""
+    return next((badge for badge in get_badge_catalog() if str(badge["id"]) == str(badge_id)), None)
+
+
+def invalidate_badge_catalog():
+    """Drop the cached catalog once the current transaction commits."""
+    bump_version(PurchasableBadge._meta.model_name)
@@ -0,0 +1,56 @@
+"""Conditional GET for API viewsets, driven by version stamps.
+
+``ConditionalGetMixin`` tags ``list`` and ``retrieve`` responses with an ETag and
+Last-Modified derived from the resource's version stamps (see versions.py).
+When the client's If-None-Match or If-Modified-Since still matches, it answers
+304 after authentication and throttling, but before any query or
+serialization.
+
+Last-Modified has one-second resolution. While the newest stamp's second is
+still running, a later write in that second would keep the same date and
+If-Modified-Since would answer 304 for a changed resource, so until then only
+the ETag is sent and validated.
+"""
+import time
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .versions import get_version
+
+
+class ConditionalGetMixin:
+    # Stamps the representation depends on; the first one defaults to the model
+    version_resources = ()
+    # Keep stamps per requesting user, for viewsets scoped to request.user
+    version_per_user = False
+
+    def get_version_stamps(self):
+        resources = self.version_resources or (self.queryset.model._meta.model_name,)
+        user_id = self.request.user.pk if self.version_per_user else None
+        return [(resource, get_version(resource, user_id)) for resource in resources]
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, view, request, *args, **kwargs):
+        # Kept for the view, e.g. to key cached responses (see response_cache.py)
+        stamps = self.version_stamps = self.get_version_stamps()
+        etag = '"{}"'.format("-".join(f"{resource}.{stamp}" for resource, stamp in stamps))
+        last_modified = max(stamp for _, stamp in stamps) // 1_000_000_000
+        if time.time_ns() // 1_000_000_000 <= last_modified:
+            last_modified = None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            # Representations depend on the authenticated user
+            patch_vary_headers(response, ["Authorization"])
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,105 @@
+"""A student's home screen in one response.
+
+The dashboard used to take a call each to the profile, weight-log, achievement
+and badge endpoints. ``get_dashboard`` returns all of it from a cached
+per-user snapshot, built on a miss with a fixed five queries whatever the
+user's history:
+
+1. the user, joined to their profile and streak;
+2. their latest weight logs;
+3. their achievement counts (all time, this week, this month) in one aggregate;
+4. the badges they bought, grouped per badge and joined to the tier;
+5. the badges they earned.
+
+Snapshots are keyed by the user's version stamps for each of those resources
+(see versions.py), which signals bump on every write, by the global stamps of
+the badge catalog, whose names, icons and tiers purchased badges show, and by
+the local day, since the streak and the weekly and monthly counts depend on it.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Q
+from django.utils.timezone import localdate
+
+from .models import Achievement, Badge, BadgeTier, PurchasableBadge, Streak, UserProfile, WeeklyBadgePurchase, WeightLog
+from .versions import get_versions
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 15 * 60)
+LATEST_WEIGHTS = 7
+SNAPSHOT_KEY = "fitness_app:dashboard:{user_id}:{day}:{stamps}"
+# Version stamps the dashboard depends on, all kept per user
+DASHBOARD_RESOURCES = tuple(
+    model._meta.model_name for model in (UserProfile, WeightLog, Achievement, Streak, WeeklyBadgePurchase, Badge)
+)
+# Global version stamps the dashboard depends on
+DASHBOARD_GLOBAL_RESOURCES = tuple(model._meta.model_name for model in (PurchasableBadge, BadgeTier))
+
+
+def get_dashboard(user):
+    """Return the dashboard of ``user``. Image fields are relative URLs; views make them absolute."""
+    today = localdate()
+    stamps = "-".join(
+        str(stamp) for stamp in get_versions(DASHBOARD_RESOURCES, user.pk) + get_versions(DASHBOARD_GLOBAL_RESOURCES)
+    )
+    key = SNAPSHOT_KEY.format(
+        user_id=user.pk, day=today.isoformat(), stamps=hashlib.blake2b(stamps.encode(), digest_size=16).hexdigest()
+    )
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = build_dashboard(user.pk, today)
+        cache.set(key, dashboard, timeout=DASHBOARD_CACHE_TIMEOUT)
+    return dashboard
+
+
+def build_dashboard(user_id, today):
+    user = get_user_model().objects.select_related("profile", "streak").get(pk=user_id)
+    profile = getattr(user, "profile", None)
+    streak = getattr(user, "streak", None)
+
+    weights = list(
+        WeightLog.objects.filter(user_id=user_id)
+        .order_by("-date", "-id")
+        .values("id", "weight", "date", "recorded_at")[:LATEST_WEIGHTS]
+    )
+    week_start = today - timedelta(days=today.weekday())
+    achievements = Achievement.objects.filter(user_id=user_id).aggregate(
+        total=Count("id"),
+        this_week=Count("id", filter=Q(date_achieved__gte=week_start)),
+        this_month=Count("id", filter=Q(date_achieved__gte=today.replace(day=1))),
+    )
+    purchased = [
+        {
+            "id": row["badge_id"],
+            "name": row["badge__name"],
+            "icon": default_storage.url(row["badge__icon"]) if row["badge__icon"] else None,
+            "tier": row["badge__tier__name"],
+            "count": row["count"],
+            "last_purchased": row["last_purchased"],
+        }
+        for row in WeeklyBadgePurchase.objects.filter(user_id=user_id)
+        .values("badge_id", "badge__name", "badge__icon", "badge__tier__name")
+        .annotate(count=Count("id"), last_purchased=Max("purchase_date"))
+        .order_by("-last_purchased", "badge_id")
+    ]
+    earned = list(Badge.objects.filter(user_id=user_id).order_by("-earned_date", "-id").values("id", "name", "earned_date"))
+
+    return {
+        "user": {"id": user.pk, "username": user.username},
+        "profile": profile and {
+            "avatar": profile.avatar.url if profile.avatar else None,
+            "bio": profile.bio,
+        },
+        "latest_weights": weights,
+        "achievements": achievements,
+        "streak": {
+            "current": streak.current_on(today) if streak else 0,
+            "longest": streak.longest_streak if streak else 0,
+            "last_activity_date": streak.last_activity_date if streak else None,
+        },
+        "badges": {"purchased": purchased, "earned": earned},
+    }
@@ -0,0 +1,142 @@
+"""Bulk weight-log ingestion for wearable syncs.
+
+A sync uploads weeks of readings at once. Running a serializer and an INSERT
+per reading costs a round trip and a Python object graph each; here the
+payload is validated column by column, deduplicated against itself and the
+user's stored readings with one range query, and written with batched
+``bulk_create`` in a single transaction.
+
+Readings are identified by ``(user, recorded_at)``: re-sending a reading is
+reported as a duplicate rather than logged twice.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import WeightLog
+from .streaks import record_activity_days
+from .versions import bump_version
+
+MAX_ENTRIES = getattr(settings, "WEIGHT_LOG_BULK_MAX_ENTRIES", 5000)
+BATCH_SIZE = getattr(settings, "WEIGHT_LOG_BULK_BATCH_SIZE", 500)
+# Heavier than any recorded human, in either kilograms or pounds
+MAX_WEIGHT = 1500
+# Devices stamp readings by their own clock, which may run a little ahead
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _parse_weight(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        weight = float(value)
+    except ValueError:
+        return None
+    return weight if math.isfinite(weight) and 0 < weight <= MAX_WEIGHT else None
+
+
+def _parse_timestamp(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        recorded_at = parse_datetime(value)
+    except ValueError:
+        return None
+    if recorded_at is not None and timezone.is_naive(recorded_at):
+        recorded_at = timezone.make_aware(recorded_at)
+    return recorded_at
+
+
+def validate_entries(entries):
+    """Parse ``entries`` one column at a time.
+
+    Returns ``(weights, timestamps, errors)``: the parsed columns, with None
+    where a value is invalid, and a dict of field errors by entry index.
+    """
+    rows = [entry if isinstance(entry, dict) else {} for entry in entries]
+    weights = [_parse_weight(row.get("weight")) for row in rows]
+    timestamps = [_parse_timestamp(row.get("recorded_at")) for row in rows]
+    latest = timezone.now() + MAX_CLOCK_SKEW
+
+    errors = {}
+    for index, (entry, weight, recorded_at) in enumerate(zip(entries, weights, timestamps)):
+        if not isinstance(entry, dict):
+            errors[index] = {"non_field_errors": ["Expected an object with weight and recorded_at."]}
+            continue
+        problems = {}
+        if weight is None:
+            problems["weight"] = [f"A number greater than 0 and at most {MAX_WEIGHT} is required."]
+        if recorded_at is None:
+            problems["recorded_at"] = ["An ISO 8601 timestamp is required."]
+        elif recorded_at > latest:
+            problems["recorded_at"] = ["Timestamp is in the future."]
+        if problems:
+            errors[index] = problems
+    return weights, timestamps, errors
+
+
+def _insert(user, weights, timestamps, valid):
+    """Insert the readings at ``valid`` indexes that are new; return their results."""
+    results = {}
+    if not valid:
+        return results
+    window = [timestamps[index] for index in valid]
+    seen = set(
+        WeightLog.objects.filter(user=user, recorded_at__range=(min(window), max(window)))
+        .values_list("recorded_at", flat=True)
+    )
+    pending = []
+    for index in valid:
+        if timestamps[index] in seen:
+            results[index] = {"index": index, "status": "duplicate"}
+            continue
+        seen.add(timestamps[index])
+        pending.append(index)
+
+    logs = WeightLog.objects.bulk_create(
+        [
+            WeightLog(
+                user=user,
+                weight=weights[index],
+                recorded_at=timestamps[index],
+                date=timezone.localdate(timestamps[index]),
+            )
+            for index in pending
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    for index, log in zip(pending, logs):
+        results[index] = {"index": index, "status": "created", "id": log.pk}
+    if pending:
+        # bulk_create sends no signals (see versions.py and streaks.py)
+        bump_version(WeightLog._meta.model_name, user.pk)
+        record_activity_days(user.pk, [log.date for log in logs])
+    return results
+
+
+def ingest_weight_logs(user, entries):
+    """Validate, deduplicate and store ``entries`` for ``user``.
+
+    Each entry is ``{"weight": ..., "recorded_at": ...}``. Returns one result per
+    entry, in input order, with ``status`` "created" (and the new ``id``),
+    "duplicate" or "invalid" (and ``errors``). Either every new reading is
+    stored or none is.
+    """
+    weights, timestamps, errors = validate_entries(entries)
+    valid = [index for index in range(len(entries)) if index not in errors]
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                results = _insert(user, weights, timestamps, valid)
+            break
+        except IntegrityError:
+            # A concurrent sync stored some of the same readings; dedupe again
+            if attempt:
+                raise
+    for index, problems in errors.items():
+        results[index] = {"index": index, "status": "invalid", "errors": problems}
+    return [results[index] for index in range(len(entries))]
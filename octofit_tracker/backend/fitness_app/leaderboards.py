@@ -0,0 +1,243 @@
+"""School-wide leaderboards kept in Redis sorted sets.
+
+Ranking every student by ``COUNT(*)`` over ``Achievement`` or
+``WeeklyBadgePurchase`` is a full aggregate per request. Instead each board is
+a sorted set of user ids scored by their count, updated with ``ZINCRBY`` (O(log
+n)) when a row is written or deleted, once the transaction commits.
+
+There are two metrics, ``achievements`` and ``badges`` (purchases), each with
+an all-time board and weekly (ISO week) and monthly boards. Rows count towards
+the period of their own local date. Past periods' boards expire after
+``PERIOD_RETENTION`` further periods.
+
+Rank, top-N and around-me queries use competition ranking: tied users share a
+rank, counted as one more than the number of users with a strictly higher
+score. When Redis is unreachable, updates are skipped (and logged) for
+``retry_interval`` seconds. The ``rebuild_leaderboards`` command rewrites the
+current boards from the relational tables.
+"""
+import logging
+import time
+from datetime import timedelta
+from threading import Lock
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.utils.timezone import localdate
+
+from overachievers.redis_client import get_redis_client
+
+from .models import Achievement, WeeklyBadgePurchase
+
+logger = logging.getLogger(__name__)
+
+# metric -> (model, date field)
+METRICS = {
+    "achievements": (Achievement, "date_achieved"),
+    "badges": (WeeklyBadgePurchase, "purchase_date"),
+}
+WINDOWS = ("weekly", "monthly", "all")
+# Past weekly and monthly boards stay readable for this many further periods
+PERIOD_RETENTION = 1
+REBUILD_BATCH_SIZE = 1000
+
+# Add to a user's scores, dropping them from boards where they reach zero.
+#   KEYS = boards, ARGV[1] = user id, ARGV[2] = increment, ARGV[3..] = TTL per board (0 for none)
+UPDATE_SCRIPT = """
+for i = 1, #KEYS do
+    local score = tonumber(redis.call('ZINCRBY', KEYS[i], ARGV[2], ARGV[1]))
+    if score <= 0 then
+        redis.call('ZREM', KEYS[i], ARGV[1])
+    end
+    local ttl = tonumber(ARGV[i + 2])
+    if ttl > 0 then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return #KEYS
+"""
+
+
+def period_bounds(window, day):
+    """Return ``(label, first day, last day)`` of the ``window`` period containing ``day``."""
+    if window == "weekly":
+        year, week, weekday = day.isocalendar()
+        first = day - timedelta(days=weekday - 1)
+        return f"{year}-W{week:02d}", first, first + timedelta(days=6)
+    if window == "monthly":
+        first = day.replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+        return f"{day.year}-{day.month:02d}", first, following - timedelta(days=1)
+    if window == "all":
+        return "all", None, None
+    raise ValueError(f"Unknown leaderboard window: {window}. Expected one of: {', '.join(WINDOWS)}")
+
+
+class LeaderboardUnavailable(Exception):
+    """Redis could not be reached to read a board."""
+
+
+class Leaderboards:
+    """The leaderboards in Redis, shared by every process."""
+
+    def __init__(self, client=None, prefix="leaderboard", retry_interval=5.0, clock=time.monotonic):
+        # Imported here so importing the module does not pull in redis
+        from redis.exceptions import RedisError
+
+        self._redis_error = RedisError
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._client = client
+        self._update_script = None
+        self._clock = clock
+        self._retry_at = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_client()
+        return self._client
+
+    def key(self, metric, window, day=None):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown leaderboard metric: {metric}. Expected one of: {', '.join(METRICS)}")
+        label = period_bounds(window, day or localdate())[0]
+        # The hash tag keeps one metric's boards in one Redis Cluster slot, as scripts require
+        return f"{self.prefix}:{{{metric}}}:{window}:{label}"
+
+    def _ttl(self, window, day):
+        """Seconds until the board for ``day``'s period should expire; 0 for the all-time board."""
+        _, _, last = period_bounds(window, day)
+        if last is None:
+            return 0
+        keep_until = last + (last - period_bounds(window, last)[1] + timedelta(days=1)) * PERIOD_RETENTION
+        return max(1, (keep_until - localdate()).days + 1) * 24 * 60 * 60
+
+    def add(self, metric, user_id, day, amount=1):
+        """Add ``amount`` to the user's ``metric`` on every board covering ``day``."""
+        if self._clock() < self._retry_at:
+            return
+        keys = [self.key(metric, window, day) for window in WINDOWS]
+        ttls = [self._ttl(window, day) for window in WINDOWS]
+        try:
+            if self._update_script is None:
+                self._update_script = self.client.register_script(UPDATE_SCRIPT)
+            self._update_script(keys=keys, args=[user_id, amount] + ttls)
+        except self._redis_error as e:
+            self._retry_at = self._clock() + self.retry_interval
+            logger.warning("Leaderboard update skipped, Redis unavailable: %s", e)
+
+    def _rank_of(self, key, score):
+        return self.client.zcount(key, f"({score}", "+inf") + 1
+
+    def _ranked(self, key, entries, start):
+        """Turn ``(member, score)`` pairs, best first from position ``start``, into competition-ranked rows."""
+        rows = []
+        for offset, (member, score) in enumerate(entries):
+            if rows and score == rows[-1]["score"]:
+                rank = rows[-1]["rank"]
+            elif rows or start == 0:
+                rank = start + offset + 1
+            else:
+                # May be tied with users above the slice
+                rank = self._rank_of(key, score)
+            rows.append({"rank": rank, "user_id": int(member), "score": score})
+        return rows
+
+    def top(self, metric, window, limit=10, day=None):
+        """The best ``limit`` users on the board, as ``{"rank", "user_id", "score"}`` rows."""
+        key = self.key(metric, window, day)
+        return self._ranked(key, self.client.zrevrange(key, 0, limit - 1, withscores=True, score_cast_func=int), 0)
+
+    def rank(self, metric, window, user_id, day=None):
+        """The user's ``{"rank", "user_id", "score"}`` on the board, or None if they are not on it."""
+        key = self.key(metric, window, day)
+        score = self.client.zscore(key, user_id)
+        if score is None:
+            return None
+        return {"rank": self._rank_of(key, score), "user_id": user_id, "score": int(score)}
+
+    def around(self, metric, window, user_id, radius=5, day=None):
+        """The user's row with up to ``radius`` rows either side; empty if they are not on the board."""
+        key = self.key(metric, window, day)
+        position = self.client.zrevrank(key, user_id)
+        if position is None:
+            return []
+        start = max(0, position - radius)
+        entries = self.client.zrevrange(key, start, position + radius, withscores=True, score_cast_func=int)
+        return self._ranked(key, entries, start)
+
+    def standings(self, metric, window, user_id, limit=10, radius=5, day=None):
+        """The board's top ``limit`` rows and the rows around ``user_id``, with usernames.
+
+        Raises ``LeaderboardUnavailable`` if Redis cannot be reached.
+        """
+        day = day or localdate()
+        try:
+            top = self.top(metric, window, limit, day)
+            around = self.around(metric, window, user_id, radius, day)
+        except self._redis_error as e:
+            raise LeaderboardUnavailable(str(e)) from e
+        usernames = dict(
+            get_user_model().objects.filter(pk__in={row["user_id"] for row in top + around})
+            .values_list("pk", "username")
+        )
+        for row in top + around:
+            row["username"] = usernames.get(row["user_id"])
+        return {
+            "metric": metric,
+            "window": window,
+            "period": period_bounds(window, day)[0],
+            "top": top,
+            "me": next((row for row in around if row["user_id"] == user_id), None),
+            "around": around,
+        }
+
+    def rebuild(self, metric, window, day=None):
+        """Rewrite the board for ``day``'s period from the relational table; returns its size."""
+        day = day or localdate()
+        model, date_field = METRICS[metric]
+        _, first, last = period_bounds(window, day)
+        rows = model.objects.all()
+        if first is not None:
+            rows = rows.filter(**{f"{date_field}__range": (first, last)})
+        counts = rows.values_list("user_id").annotate(Count("id")).order_by()
+        key = self.key(metric, window, day)
+        staging = f"{key}:rebuild"
+        self.client.delete(staging)
+        size = 0
+        batch = {}
+        for user_id, count in counts.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch[user_id] = count
+            if len(batch) == REBUILD_BATCH_SIZE:
+                self.client.zadd(staging, batch)
+                size += len(batch)
+                batch = {}
+        if batch:
+            self.client.zadd(staging, batch)
+            size += len(batch)
+        # Swap the finished board in, so readers never see a partial one
+        pipe = self.client.pipeline()
+        if size:
+            pipe.rename(staging, key)
+            ttl = self._ttl(window, day)
+            if ttl:
+                pipe.expire(key, ttl)
+        else:
+            pipe.delete(key)
+        pipe.execute()
+        return size
+
+
+_boards = None
+_boards_lock = Lock()
+
+
+def get_leaderboards():
+    """Return the process-wide Leaderboards."""
+    global _boards
+    if _boards is None:
+        with _boards_lock:
+            if _boards is None:
+                _boards = Leaderboards()
+    return _boards
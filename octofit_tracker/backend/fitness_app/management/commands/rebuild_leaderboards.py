@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from fitness_app.leaderboards import METRICS, WINDOWS, get_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the current weekly, monthly and all-time leaderboards in Redis from the Achievement and "
+        "WeeklyBadgePurchase tables."
+    )
+
+    def handle(self, *args, **options):
+        boards = get_leaderboards()
+        for metric in METRICS:
+            for window in WINDOWS:
+                size = boards.rebuild(metric, window)
+                self.stdout.write(f"Rebuilt {window} {metric} leaderboard: {size} users")
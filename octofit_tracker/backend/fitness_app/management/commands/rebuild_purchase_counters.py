@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localdate
+
+from fitness_app.models import WeeklyBadgePurchase
+from fitness_app.purchases import WINDOW_DAYS, get_purchase_counter
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the Redis weekly purchase counters from WeeklyBadgePurchase rows, for every user with "
+        "recent purchases or counters."
+    )
+
+    def handle(self, *args, **options):
+        counter = get_purchase_counter()
+        today = localdate()
+        recent = WeeklyBadgePurchase.objects.filter(purchase_date__gt=today - timedelta(days=WINDOW_DAYS))
+        user_ids = set(recent.values_list("user_id", flat=True).distinct())
+        user_ids.update(counter.seeded_user_ids())
+        for user_id in sorted(user_ids):
+            counter.rebuild(user_id, today, overwrite=True)
+        self.stdout.write(f"Rebuilt weekly purchase counters for {len(user_ids)} users")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from fitness_app.streaks import REBUILD_CHUNK_SIZE, rebuild_streaks
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's streak from their weight logs and achievements."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=REBUILD_CHUNK_SIZE, help="users written per transaction"
+        )
+
+    def handle(self, *args, **options):
+        users = rebuild_streaks(chunk_size=options["chunk_size"])
+        self.stdout.write(f"Rebuilt streaks for {users} users")
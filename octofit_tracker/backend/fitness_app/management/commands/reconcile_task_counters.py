@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from fitness_app.models import TaskSummary
+
+
+class Command(BaseCommand):
+    help = "Recount completed and pending tasks and repair the TaskSummary counters."
+
+    def handle(self, *args, **options):
+        summary, drifted = TaskSummary.reconcile()
+        if drifted:
+            self.stdout.write(self.style.WARNING(
+                f"Repaired task counters: {summary.completed} completed, {summary.pending} pending"
+            ))
+        else:
+            self.stdout.write(f"Task counters in sync: {summary.completed} completed, {summary.pending} pending")
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+def count_existing_tasks(apps, schema_editor):
+    Task = apps.get_model("fitness_app", "Task")
+    TaskSummary = apps.get_model("fitness_app", "TaskSummary")
+    TaskSummary.objects.create(
+        pk=1,
+        completed=Task.objects.filter(completed=True).count(),
+        pending=Task.objects.filter(completed=False).count(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fitness_app", "0002_badgetier_achievement_dailybadgelimit_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("completed", models.IntegerField(default=0)),
+                ("pending", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing_tasks, migrations.RunPython.noop),
+    ]
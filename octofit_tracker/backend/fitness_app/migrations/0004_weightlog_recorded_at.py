@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:38
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fitness_app", "0003_tasksummary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Added without a default, so existing logs stay NULL rather than all
+        # sharing one timestamp (which the unique constraint would reject)
+        migrations.AddField(
+            model_name="weightlog",
+            name="recorded_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="weightlog",
+            name="recorded_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name="weightlog",
+            name="date",
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddConstraint(
+            model_name="weightlog",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recorded_at"), name="unique_weightlog_reading"
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_daily_limits(apps, schema_editor):
+    """Fold duplicate (user, date) counters into one, so the unique constraint can be added."""
+    DailyBadgeLimit = apps.get_model("fitness_app", "DailyBadgeLimit")
+    duplicates = (
+        DailyBadgeLimit.objects.values("user", "date")
+        .annotate(rows=Count("id"), total=Sum("badge_count"))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        limits = DailyBadgeLimit.objects.filter(user=duplicate["user"], date=duplicate["date"]).order_by("id")
+        keep = limits.first()
+        limits.exclude(pk=keep.pk).delete()
+        keep.badge_count = duplicate["total"]
+        keep.save(update_fields=["badge_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fitness_app", "0004_weightlog_recorded_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="achievement",
+            index=models.Index(
+                fields=["user", "date_achieved", "id"], name="achievement_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="weeklybadgepurchase",
+            index=models.Index(
+                fields=["user", "purchase_date"], name="weeklypurchase_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="weightlog",
+            index=models.Index(fields=["user", "date", "id"], name="weightlog_user_date_idx"),
+        ),
+        migrations.RunPython(merge_duplicate_daily_limits, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="dailybadgelimit",
+            constraint=models.UniqueConstraint(
+                fields=("user", "date"), name="unique_daily_badge_limit"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fitness_app", "0005_per_user_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dailybadgelimit",
+            name="date",
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fitness_app", "0006_dailybadgelimit_local_date"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="weeklybadgepurchase",
+            name="purchase_date",
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
@@ -0,0 +1,311 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.validators import MinValueValidator
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+
+class Badge(models.Model):
+    name = models.CharField(max_length=100)
+    description = models.TextField()
+    earned_date = models.DateField(auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="badges")
+
+    def __str__(self):
+        return self.name
+
+
+class Streak(models.Model):
+    """Consecutive days of activity, maintained by ``fitness_app.streaks``."""
+
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_activity_date = models.DateField(blank=True, null=True)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="streak")
+
+    def current_on(self, day):
+        """The streak as of ``day``: broken unless the user was active on it or the day before."""
+        if self.last_activity_date is None or self.last_activity_date < day - timedelta(days=1):
+            return 0
+        return self.current_streak
+
+    def __str__(self):
+        return f"{self.user} ({self.current_streak} days)"
+
+
+class TaskQuerySet(models.QuerySet):
+    """Keeps ``TaskSummary`` in step with bulk writes, which send no signals."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            completed = sum(1 for task in objs if task.completed)
+            TaskSummary.adjust(completed=completed, pending=len(objs) - completed)
+        return objs
+
+    bulk_create.alters_data = True
+
+    def update(self, **kwargs):
+        if "completed" not in kwargs:
+            return super().update(**kwargs)
+        value = kwargs["completed"]
+        with transaction.atomic(using=self.db):
+            if not isinstance(value, bool):
+                # An expression: we can't tell which rows flip, so recount
+                updated = super().update(**kwargs)
+                TaskSummary.reconcile()
+                return updated
+            # An UPDATE reports exactly the rows it changed, so the rows it
+            # flips are updated apart from those that already have the value
+            unchanged = models.QuerySet.update(self.filter(completed=value), **kwargs)
+            flipped = models.QuerySet.update(self.filter(completed=not value), **kwargs)
+            delta = flipped if value else -flipped
+            TaskSummary.adjust(completed=delta, pending=-delta)
+        return unchanged + flipped
+
+    update.alters_data = True
+
+
+class Task(models.Model):
+    name = models.CharField(max_length=255)
+    completed = models.BooleanField(default=False)
+
+    objects = TaskQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # The stored state, so a save knows whether the task moved between counters
+        if "completed" in task.__dict__:
+            task._saved_completed = task.completed
+        return task
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "completed" not in update_fields:
+            return super().save(*args, **kwargs)
+        inserting = self._state.adding and self.pk is None
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if inserting:
+                TaskSummary.adjust(completed=int(self.completed), pending=int(not self.completed))
+            elif hasattr(self, "_saved_completed"):
+                if self._saved_completed != self.completed:
+                    delta = 1 if self.completed else -1
+                    TaskSummary.adjust(completed=delta, pending=-delta)
+            else:
+                # Previous state unknown (built with a pk, or loaded deferred)
+                TaskSummary.reconcile()
+        self._saved_completed = self.completed
+
+    def __str__(self):
+        return self.name
+
+
+class TaskSummary(models.Model):
+    """Completed and pending ``Task`` counts, kept in a single row.
+
+    Task saves, deletes, ``bulk_create`` and ``update`` adjust the counts in the
+    same transaction. Writes that bypass them (raw SQL, ``bulk_update``) do
+    not; the ``reconcile_task_counters`` command repairs any drift.
+    """
+
+    # The only row
+    SINGLETON_ID = 1
+
+    # Signed, so a drifted count can't make task writes fail a constraint
+    completed = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+
+    @classmethod
+    def adjust(cls, completed=0, pending=0):
+        if not completed and not pending:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            completed=models.F("completed") + completed,
+            pending=models.F("pending") + pending,
+        )
+        if not updated:
+            cls.reconcile()
+
+    @classmethod
+    def reconcile(cls):
+        """Recount from the ``Task`` table and return ``(summary, drifted)``."""
+        with transaction.atomic():
+            # Counting under the row lock: writers adjust the row in their own
+            # transaction, so every task they committed is in the count
+            summary, created = cls.objects.select_for_update().get_or_create(pk=cls.SINGLETON_ID)
+            # Aliases can't reuse the name of the field they filter on
+            counts = Task.objects.aggregate(
+                completed_count=models.Count("id", filter=models.Q(completed=True)),
+                pending_count=models.Count("id", filter=models.Q(completed=False)),
+            )
+            counts = (counts["completed_count"], counts["pending_count"])
+            drifted = (summary.completed, summary.pending) != counts
+            if drifted:
+                summary.completed, summary.pending = counts
+                summary.save(update_fields=["completed", "pending"])
+        return summary, drifted and not created
+
+    @classmethod
+    def current(cls):
+        try:
+            return cls.objects.get(pk=cls.SINGLETON_ID)
+        except cls.DoesNotExist:
+            return cls.reconcile()[0]
+
+
+class BadgeTier(models.Model):
+    name = models.CharField(max_length=50)
+    description = models.TextField(blank=True, null=True)
+    level = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+
+    def __str__(self):
+        return self.name
+
+
+class Achievement(models.Model):
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    date_achieved = models.DateField(auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Matches the per-user keyset pagination order (see AchievementPagination)
+            models.Index(fields=["user", "date_achieved", "id"], name="achievement_user_date_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class DailyBadgeLimit(models.Model):
+    # Badges a user can be awarded per day
+    MAX_BADGES_PER_DAY = 3
+
+    # The user's local day, as the season check uses
+    date = models.DateField(default=localdate)
+    badge_count = models.PositiveIntegerField(default=0)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_badge_limits")
+
+    class Meta:
+        constraints = [
+            # One counter per user and day; also the index for get_or_create lookups
+            models.UniqueConstraint(fields=["user", "date"], name="unique_daily_badge_limit"),
+        ]
+
+    def can_award_badge(self):
+        return self.badge_count < self.MAX_BADGES_PER_DAY
+
+    def increment_badge_count(self):
+        self.badge_count = models.F("badge_count") + 1
+        self.save(update_fields=["badge_count"])
+        self.refresh_from_db(fields=["badge_count"])
+
+    @classmethod
+    def claim(cls, user, day=None):
+        """Take one of the user's badge slots for ``day`` (today by default); False at the limit.
+
+        The check and the increment are one conditional UPDATE, so concurrent
+        awards can't both see the last free slot. The first award of the day
+        inserts the row instead; if a concurrent award inserted it first, the
+        unique (user, date) constraint rejects ours and the UPDATE is retried.
+        """
+        day = day or localdate()
+        available = cls.objects.filter(user=user, date=day, badge_count__lt=cls.MAX_BADGES_PER_DAY)
+        if available.update(badge_count=models.F("badge_count") + 1):
+            return True
+        try:
+            with transaction.atomic():
+                cls.objects.create(user=user, date=day, badge_count=1)
+            return True
+        except IntegrityError:
+            return bool(available.update(badge_count=models.F("badge_count") + 1))
+
+
+class PurchasableBadge(models.Model):
+    SEASON_CHOICES = [
+        ("spring", "Spring"),
+        ("summer", "Summer"),
+        ("autumn", "Autumn"),
+        ("winter", "Winter"),
+    ]
+    # Northern-hemisphere meteorological seasons
+    SEASON_BY_MONTH = {
+        12: "winter", 1: "winter", 2: "winter",
+        3: "spring", 4: "spring", 5: "spring",
+        6: "summer", 7: "summer", 8: "summer",
+        9: "autumn", 10: "autumn", 11: "autumn",
+    }
+
+    name = models.CharField(max_length=100)
+    description = models.TextField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    icon = models.ImageField(upload_to="badges/")
+    season = models.CharField(max_length=10, choices=SEASON_CHOICES, default="spring")
+    tier = models.ForeignKey(BadgeTier, on_delete=models.CASCADE, related_name="badges")
+
+    @classmethod
+    def current_season(cls):
+        return cls.SEASON_BY_MONTH[localdate().month]
+
+    def is_current_season(self):
+        return self.season == self.current_season()
+
+    def __str__(self):
+        return self.name
+
+
+class UserProfile(models.Model):
+    avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    bio = models.TextField(blank=True, null=True)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile")
+
+    def __str__(self):
+        return str(self.user)
+
+
+class WeeklyBadgePurchase(models.Model):
+    # Badges a user can buy in any rolling seven days
+    MAX_PURCHASES_PER_WEEK = 3
+
+    # The user's local day, as the weekly window uses
+    purchase_date = models.DateField(default=localdate)
+    badge = models.ForeignKey(PurchasableBadge, on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="weekly_badge_purchases")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "purchase_date"], name="weeklypurchase_user_date_idx"),
+        ]
+
+    @classmethod
+    def can_purchase_badge(cls, user):
+        week_start = localdate() - timedelta(days=6)
+        purchases = cls.objects.filter(user=user, purchase_date__gte=week_start).count()
+        return purchases < cls.MAX_PURCHASES_PER_WEEK
+
+
+class WeightLog(models.Model):
+    weight = models.FloatField()
+    # Settable, so synced readings keep the day they were taken
+    date = models.DateField(default=localdate)
+    # When the reading was taken; null for logs recorded before timestamps were kept
+    recorded_at = models.DateTimeField(default=timezone.now, null=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # A device re-syncing the same reading must not log it twice
+            models.UniqueConstraint(fields=["user", "recorded_at"], name="unique_weightlog_reading"),
+        ]
+        indexes = [
+            # Matches the per-user keyset pagination order (see WeightLogPagination)
+            models.Index(fields=["user", "date", "id"], name="weightlog_user_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.weight} on {self.date}"
@@ -0,0 +1,152 @@
+"""Nutrition lookups against the Edamam nutrition API.
+
+The same foods are looked up thousands of times a day, and every lookup used
+to be a fresh, unbounded ``requests.get``. ``NutritionService`` answers from,
+in order:
+
+1. an in-process LRU (``LocalTTLCache``), for the hottest foods;
+2. the shared Django cache, so workers reuse each other's lookups;
+3. the upstream API, over a pooled ``requests.Session`` with connect and read
+   timeouts. Concurrent misses for the same food are coalesced
+   (``SingleFlight``), so a burst reaches the upstream once.
+
+Foods are cached under a normalized key (case and whitespace folded). Lookups
+are counted in ``nutrition_lookups_total`` by where they were answered.
+"""
+import hashlib
+import time
+from threading import Lock
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from overachievers.metrics import REGISTRY
+
+from .caching import LocalTTLCache, SingleFlight
+
+NUTRITION_TIMEOUT = getattr(settings, "NUTRITION_TIMEOUT", 5.0)
+NUTRITION_CONNECT_TIMEOUT = getattr(settings, "NUTRITION_CONNECT_TIMEOUT", 2.0)
+NUTRITION_CACHE_TIMEOUT = getattr(settings, "NUTRITION_CACHE_TIMEOUT", 24 * 60 * 60)
+NUTRITION_LOCAL_CACHE_SIZE = getattr(settings, "NUTRITION_LOCAL_CACHE_SIZE", 1024)
+# Short, so workers pick up entries refreshed in the shared cache
+NUTRITION_LOCAL_CACHE_TIMEOUT = getattr(settings, "NUTRITION_LOCAL_CACHE_TIMEOUT", 5 * 60)
+NUTRITION_POOL_SIZE = getattr(settings, "NUTRITION_POOL_SIZE", 10)
+CACHE_KEY = "fitness_app:nutrition:{digest}"
+
+nutrition_lookups_total = REGISTRY.counter(
+    "nutrition_lookups_total",
+    "Nutrition lookups by where they were answered: local_hit, shared_hit, coalesced, miss or error.",
+    labelnames=("result",),
+)
+nutrition_upstream_duration = REGISTRY.histogram(
+    "nutrition_upstream_duration_seconds", "Latency of nutrition API requests."
+)
+
+
+class NutritionLookupError(Exception):
+    """The upstream lookup failed; ``status_code`` is the status to answer with."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def normalize_food(food):
+    """Fold case and whitespace, so "Banana " and "banana" share a cache entry."""
+    return " ".join(food.lower().split())
+
+
+def build_session(pool_size=NUTRITION_POOL_SIZE):
+    """A session that keeps up to ``pool_size`` connections to the upstream alive."""
+    session = requests.Session()
+    # Retry only failed connects (a pooled connection the server already closed);
+    # read=False re-raises read timeouts as such rather than as connection errors
+    retries = Retry(total=1, connect=1, read=False, status=0, other=0)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class NutritionService:
+    def __init__(self, api_url, app_id, app_key, session=None, shared_cache=cache,
+                 cache_timeout=NUTRITION_CACHE_TIMEOUT, local_cache=None,
+                 timeout=(NUTRITION_CONNECT_TIMEOUT, NUTRITION_TIMEOUT)):
+        self.api_url = api_url
+        self.app_id = app_id
+        self.app_key = app_key
+        self.session = session or build_session()
+        self.shared_cache = shared_cache
+        self.cache_timeout = cache_timeout
+        self.local_cache = local_cache or LocalTTLCache(NUTRITION_LOCAL_CACHE_SIZE, NUTRITION_LOCAL_CACHE_TIMEOUT)
+        self.timeout = timeout
+        self._flights = SingleFlight()
+
+    def lookup(self, food):
+        """Return the nutrition data for ``food``, raising ``NutritionLookupError`` if the upstream fails."""
+        key = normalize_food(food)
+        data = self.local_cache.get(key)
+        if data is not None:
+            nutrition_lookups_total.inc(result="local_hit")
+            return data
+        data, shared = self._flights.do(key, lambda: self._load(key))
+        if shared:
+            nutrition_lookups_total.inc(result="coalesced")
+        return data
+
+    def _load(self, key):
+        # Digested, since foods may hold characters some cache backends reject in keys
+        shared_key = CACHE_KEY.format(digest=hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+        data = self.shared_cache.get(shared_key)
+        if data is not None:
+            nutrition_lookups_total.inc(result="shared_hit")
+        else:
+            data = self._fetch(key)
+            nutrition_lookups_total.inc(result="miss")
+            self.shared_cache.set(shared_key, data, timeout=self.cache_timeout)
+        self.local_cache.set(key, data)
+        return data
+
+    def _fetch(self, food):
+        params = {"app_id": self.app_id, "app_key": self.app_key, "ingr": food}
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+        except requests.Timeout as e:
+            nutrition_lookups_total.inc(result="error")
+            raise NutritionLookupError(504, f"Nutrition API timed out: {e}")
+        except requests.RequestException as e:
+            nutrition_lookups_total.inc(result="error")
+            raise NutritionLookupError(502, f"Nutrition API unreachable: {e}")
+        finally:
+            nutrition_upstream_duration.observe(time.perf_counter() - started)
+        if response.status_code != 200:
+            nutrition_lookups_total.inc(result="error")
+            raise NutritionLookupError(response.status_code, f"Nutrition API returned {response.status_code}")
+        try:
+            return response.json()
+        except ValueError as e:
+            # e.g. a proxy's HTML error page
+            nutrition_lookups_total.inc(result="error")
+            raise NutritionLookupError(502, f"Nutrition API returned invalid JSON: {e}")
+
+
+_service = None
+_service_lock = Lock()
+
+
+def get_nutrition_service():
+    """Return the process-wide NutritionService, configured from the NUTRITION_* settings."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = NutritionService(
+                    getattr(settings, "NUTRITION_API_URL", "https://api.edamam.com/api/nutrition-data"),
+                    getattr(settings, "NUTRITION_APP_ID", ""),
+                    getattr(settings, "NUTRITION_APP_KEY", ""),
+                )
+    return _service
@@ -0,0 +1,136 @@
+"""Keyset (cursor) pagination.
+
+Page-number pagination counts the whole table and skips rows with OFFSET, so a
+deep page costs more than a shallow one. ``KeysetPagination`` filters on the
+last row seen instead: every page is one index range scan of ``page_size + 1``
+rows, whatever its depth, and inserts never shift rows between pages.
+
+The ordering must be on non-null fields and end with a unique one (``id``) so a
+position is unambiguous. The total is only counted when a client asks for it
+with ``?count=true``.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _flip(name):
+    return name[1:] if name.startswith('-') else f'-{name}'
+
+
+class KeysetPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # Field names, '-' for descending; the last one must be unique
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        self.count = queryset.count() if self.wants_count(request) else None
+
+        position, reverse = self.decode_cursor(request)
+        ordering = [_flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            # Fetched backwards from the first row of a later page
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.rows = rows
+        return rows
+
+    def after(self, ordering, position):
+        """Filter for the rows that come after ``position`` in ``ordering``."""
+        names = [name.lstrip('-') for name in ordering]
+        condition = Q()
+        for i, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            term = Q(**{f'{names[i]}__{lookup}': position[i]})
+            term &= Q(**dict(zip(names[:i], position[:i])))
+            condition |= term
+        # The redundant bound on the leading field lets the database use a range scan
+        first = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{names[0]}__{first}': position[0]}) & condition
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def decode_cursor(self, request):
+        """Return ``(position, reverse)`` from the cursor parameter, or ``(None, False)`` on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = cursor['p']
+            if len(values) != len(self.fields):
+                raise ValueError(encoded)
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return position, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse=False):
+        cursor = {'p': [field.value_to_string(row) for field in self.fields]}
+        if reverse:
+            cursor['r'] = True
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+                'count': {'type': 'integer', 'description': f'Only with ?{self.count_query_param}=true'},
+            },
+        }
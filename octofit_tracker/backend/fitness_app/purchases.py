@@ -0,0 +1,194 @@
+"""Rolling weekly badge purchase counter.
+
+``WeeklyBadgePurchase.can_purchase_badge`` counts a user's purchase rows for
+the last seven days on every attempt, and concurrent purchases can all pass the
+check before any of them inserts. ``WeeklyPurchaseCounter`` keeps one Redis
+counter per user and day instead, each expiring once it leaves the window.
+A purchase is one ``EVALSHA`` that sums the window and, if it is under the
+limit, increments today's counter: the slot is reserved before the row is
+written, and released again if the write fails.
+
+A user's counters are seeded from ``WeeklyBadgePurchase`` (the source of truth)
+the first time they are needed, and the ``rebuild_purchase_counters`` command
+rewrites them to repair drift. When Redis is unreachable purchases fall back to
+counting rows for ``retry_interval`` seconds.
+"""
+import logging
+import time
+from datetime import timedelta
+from threading import Lock
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils.timezone import localdate
+
+from overachievers.redis_client import get_redis_client
+
+from .models import WeeklyBadgePurchase
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 7
+# A day's counter stays readable for the whole window it belongs to
+BUCKET_TTL_SECONDS = (WINDOW_DAYS + 1) * 24 * 60 * 60
+
+# Reserve a purchase slot in a user's rolling window.
+#   KEYS[1] = seeded marker, KEYS[2..] = day counters, today first
+#   ARGV = limit, TTL in seconds
+# Returns 1 if reserved, 0 at the limit, -1 if the counters need seeding.
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local total = 0
+for i = 2, #KEYS do
+    total = total + (tonumber(redis.call('GET', KEYS[i])) or 0)
+end
+if total >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Write a user's day counters from purchase rows.
+#   KEYS[1] = seeded marker, KEYS[2..] = day counters
+#   ARGV[1] = TTL in seconds, ARGV[2] = 1 to overwrite seeded counters, ARGV[3..] = counts
+# Without overwrite, counters another request already seeded are left alone, so
+# its reservations are not lost.
+REBUILD_SCRIPT = """
+if ARGV[2] ~= '1' and redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+for i = 2, #KEYS do
+    local count = tonumber(ARGV[i + 1])
+    if count > 0 then
+        redis.call('SET', KEYS[i], count, 'EX', ARGV[1])
+    else
+        redis.call('DEL', KEYS[i])
+    end
+end
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[1])
+return 1
+"""
+
+
+class WeeklyPurchaseCounter:
+    """Per-user purchase counts over a rolling window, shared by every process through Redis."""
+
+    def __init__(self, limit=WeeklyBadgePurchase.MAX_PURCHASES_PER_WEEK, client=None, prefix="purchases",
+                 retry_interval=5.0, clock=time.monotonic):
+        # Imported here so importing the module does not pull in redis
+        from redis.exceptions import RedisError
+
+        self._redis_error = RedisError
+        self.limit = limit
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._client = client
+        self._reserve_script = None
+        self._rebuild_script = None
+        self._clock = clock
+        self._retry_at = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_client()
+        return self._client
+
+    def _keys(self, user_id, today):
+        # The hash tag keeps one user's keys in one Redis Cluster slot, as scripts require
+        base = f"{self.prefix}:{{{user_id}}}"
+        days = [today - timedelta(days=offset) for offset in range(WINDOW_DAYS)]
+        return [f"{base}:seeded"] + [f"{base}:{day.isoformat()}" for day in days]
+
+    def _available(self):
+        return self._clock() >= self._retry_at
+
+    def _unavailable(self, error):
+        self._retry_at = self._clock() + self.retry_interval
+        logger.warning("Redis purchase counter unavailable, counting purchase rows: %s", error)
+
+    def reserve(self, user_id, today=None):
+        """Take a purchase slot for today; False at the limit, None if Redis is unavailable."""
+        if not self._available():
+            return None
+        today = today or localdate()
+        keys = self._keys(user_id, today)
+        try:
+            if self._reserve_script is None:
+                self._reserve_script = self.client.register_script(RESERVE_SCRIPT)
+            for _ in range(2):
+                reserved = int(self._reserve_script(keys=keys, args=[self.limit, BUCKET_TTL_SECONDS]))
+                if reserved >= 0:
+                    return bool(reserved)
+                self.rebuild(user_id, today)
+            return None
+        except self._redis_error as e:
+            self._unavailable(e)
+            return None
+
+    def release(self, user_id, today=None):
+        """Give back a slot taken by ``reserve``, e.g. when the purchase could not be stored."""
+        today = today or localdate()
+        try:
+            self.client.decr(self._keys(user_id, today)[1])
+        except self._redis_error as e:
+            self._unavailable(e)
+
+    def rebuild(self, user_id, today=None, overwrite=False):
+        """Set the user's day counters from ``WeeklyBadgePurchase``; returns False if already seeded."""
+        today = today or localdate()
+        keys = self._keys(user_id, today)
+        counts = dict(
+            WeeklyBadgePurchase.objects.filter(
+                user_id=user_id, purchase_date__gt=today - timedelta(days=WINDOW_DAYS)
+            ).values_list("purchase_date").annotate(Count("id"))
+        )
+        per_day = [counts.get(today - timedelta(days=offset), 0) for offset in range(WINDOW_DAYS)]
+        if self._rebuild_script is None:
+            self._rebuild_script = self.client.register_script(REBUILD_SCRIPT)
+        return bool(self._rebuild_script(keys=keys, args=[BUCKET_TTL_SECONDS, int(overwrite)] + per_day))
+
+    def seeded_user_ids(self):
+        """Yield the ids of users whose counters are in Redis."""
+        for key in self.client.scan_iter(match=f"{self.prefix}:*:seeded", count=1000):
+            key = key.decode() if isinstance(key, bytes) else key
+            yield int(key[key.index("{") + 1:key.index("}")])
+
+
+_counter = None
+_counter_lock = Lock()
+
+
+def get_purchase_counter():
+    """Return the process-wide WeeklyPurchaseCounter."""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = WeeklyPurchaseCounter()
+    return _counter
+
+
+def purchase_badge(user, badge_id):
+    """Record a purchase of ``badge_id`` by ``user`` unless it exceeds the weekly limit; True if recorded."""
+    counter = get_purchase_counter()
+    today = localdate()
+    reserved = counter.reserve(user.pk, today)
+    if reserved is None:
+        if not WeeklyBadgePurchase.can_purchase_badge(user):
+            return False
+    elif not reserved:
+        return False
+    try:
+        with transaction.atomic():
+            WeeklyBadgePurchase.objects.create(user=user, badge_id=badge_id, purchase_date=today)
+    except Exception:
+        if reserved:
+            counter.release(user.pk, today)
+        raise
+    return True
@@ -0,0 +1,72 @@
+"""Per-user response caching for API viewsets.
+
+Django's cache middleware keys pages by URL, so behind token authentication it
+would hand one user's weight logs to the next caller of the same URL.
+``CachedResponseMixin`` caches inside the view instead, after authentication,
+permissions and throttling have run. Each entry is keyed by:
+
+* the authenticated user, so entries are never shared between users;
+* the host, path, query string and negotiated renderer;
+* the resource's version stamps (see versions.py), so writes invalidate
+  entries without deleting them.
+
+Only 200 responses to authenticated requests are cached, as response data
+(rendered again per request). Lookups are counted in
+``response_cache_lookups_total`` per view, for hit ratios.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from overachievers.metrics import REGISTRY
+
+from .conditional import ConditionalGetMixin
+
+RESPONSE_CACHE_TIMEOUT = getattr(settings, "API_RESPONSE_CACHE_TIMEOUT", 5 * 60)
+CACHE_KEY = "fitness_app:response:{user_id}:{digest}"
+
+response_cache_lookups_total = REGISTRY.counter(
+    "response_cache_lookups_total",
+    "API response cache lookups by view and result: hit, miss or bypass.",
+    labelnames=("view", "result"),
+)
+
+
+class CachedResponseMixin(ConditionalGetMixin):
+    response_cache_timeout = RESPONSE_CACHE_TIMEOUT
+
+    def conditional_response(self, view, request, *args, **kwargs):
+        return super().conditional_response(self._cached(view), request, *args, **kwargs)
+
+    def response_cache_key(self, request):
+        parts = [
+            request.get_host(),
+            request.path,
+            "&".join(sorted(f"{name}={value}" for name, values in request.query_params.lists() for value in values)),
+            request.accepted_renderer.format,
+        ]
+        parts += [f"{resource}.{stamp}" for resource, stamp in self.version_stamps]
+        digest = hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+        return CACHE_KEY.format(user_id=request.user.pk, digest=digest)
+
+    def _cached(self, view):
+        name = type(self).__name__
+
+        def cached_view(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                response_cache_lookups_total.inc(view=name, result="bypass")
+                return view(request, *args, **kwargs)
+            key = self.response_cache_key(request)
+            data = cache.get(key)
+            if data is not None:
+                response_cache_lookups_total.inc(view=name, result="hit")
+                return Response(data)
+            response_cache_lookups_total.inc(view=name, result="miss")
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=self.response_cache_timeout)
+            return response
+
+        return cached_view
@@ -4,7 +4,9 @@ from .models import WeightLog, Achievement, UserProfile, BadgeTier, PurchasableB
 class WeightLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = WeightLog
-        fields = ['id', 'weight', 'date']
+        fields = ['id', 'weight', 'date', 'recorded_at']
+        # Backfills with explicit timestamps go through the bulk endpoint
+        read_only_fields = ['date', 'recorded_at']
 
 class AchievementSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,4 +28,4 @@ class PurchasableBadgeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PurchasableBadge
-        fields = ['id', 'name', 'description', 'price', 'tier', 'icon']
\ No newline at end of file
+        fields = ['id', 'name', 'description', 'price', 'season', 'tier', 'icon']
\ No newline at end of file
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .leaderboards import METRICS, get_leaderboards
+from .models import (
+    Achievement, Badge, BadgeTier, PurchasableBadge, Streak, Task, TaskSummary, UserProfile, WeeklyBadgePurchase,
+    WeightLog,
+)
+from .streaks import record_activity
+from .trends import invalidate_weight_series
+from .versions import bump_version
+
+
+@receiver([post_save, post_delete], sender=PurchasableBadge)
+@receiver([post_save, post_delete], sender=BadgeTier)
+def shared_resource_changed(sender, **kwargs):
+    # Also invalidates the cached badge catalog (see catalog.py)
+    bump_version(sender._meta.model_name)
+
+
+@receiver([post_save, post_delete], sender=Achievement)
+@receiver([post_save, post_delete], sender=WeightLog)
+# Also invalidate the user's cached dashboard (see dashboard.py)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=Streak)
+@receiver([post_save, post_delete], sender=WeeklyBadgePurchase)
+@receiver([post_save, post_delete], sender=Badge)
+def user_resource_changed(sender, instance, **kwargs):
+    bump_version(sender._meta.model_name, instance.user_id)
+
+
+@receiver(post_save, sender=WeightLog)
+@receiver(post_delete, sender=WeightLog)
+def weight_log_changed(sender, instance, created=False, **kwargs):
+    # New logs are merged into the cached trend series on the next read;
+    # edits and deletes change days already computed
+    if not created:
+        invalidate_weight_series(instance.user_id)
+
+
+@receiver(post_save, sender=WeightLog)
+def weight_logged(sender, instance, created, **kwargs):
+    if created:
+        record_activity(instance.user_id, instance.date)
+
+
+@receiver(post_save, sender=Achievement)
+def achievement_earned(sender, instance, created, **kwargs):
+    if created:
+        record_activity(instance.user_id, instance.date_achieved)
+
+
+@receiver([post_save, post_delete], sender=Achievement)
+@receiver([post_save, post_delete], sender=WeeklyBadgePurchase)
+def leaderboard_row_changed(sender, instance, created=False, **kwargs):
+    if kwargs["signal"] is post_save and not created:
+        return
+    metric = "achievements" if sender is Achievement else "badges"
+    day = getattr(instance, METRICS[metric][1])
+    amount = 1 if created else -1
+    # After commit, so rolled-back rows never count
+    transaction.on_commit(lambda: get_leaderboards().add(metric, instance.user_id, day, amount))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    # Runs for QuerySet.delete() too: receivers turn off fast deletes
+    completed = getattr(instance, "_saved_completed", instance.completed)
+    TaskSummary.adjust(completed=-int(completed), pending=-int(not completed))
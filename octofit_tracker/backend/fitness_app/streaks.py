@@ -0,0 +1,142 @@
+"""Daily activity streaks, kept up to date as activity is recorded.
+
+A day counts towards a user's streak if they logged a weight or earned an
+achievement on it. Days are the school's local days (``TIME_ZONE``): weight
+logs carry the local day of their reading, and ``local_day`` converts a moment
+to one, so an activity just after midnight counts for the new day whatever the
+server's clock says.
+
+Recording an activity is O(1): one conditional UPDATE extends, restarts or
+leaves the user's ``Streak`` row, whatever the length of their history. Days
+older than the row's ``last_activity_date`` (a late sync of old readings) and
+deleted activity are not applied incrementally; the ``rebuild_streaks``
+command recomputes every streak from history.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils.timezone import localdate
+
+from .models import Achievement, Streak, WeightLog
+from .versions import bump_versions
+
+REBUILD_CHUNK_SIZE = 2000
+
+
+def local_day(when=None):
+    """The school-local day of the aware datetime ``when`` (now by default)."""
+    return localdate(when)
+
+
+def advance(current, longest, last, day):
+    """Return ``(current, longest, last)`` after an activity on ``day``; days up to ``last`` change nothing."""
+    if last is not None and day <= last:
+        return current, longest, last
+    current = current + 1 if last == day - timedelta(days=1) else 1
+    return current, max(longest, current), day
+
+
+def record_activity(user_id, day=None):
+    """Count ``day`` (today by default) towards the user's streak."""
+    day = day or local_day()
+    previous = day - timedelta(days=1)
+    extended = Case(
+        When(last_activity_date=previous, then=F("current_streak") + 1),
+        default=Value(1),
+    )
+    # Rows already at or past ``day`` are left alone, so repeats are no-ops
+    pending = Streak.objects.filter(
+        Q(last_activity_date__lt=day) | Q(last_activity_date__isnull=True), user_id=user_id
+    )
+    if pending.update(
+        current_streak=extended, longest_streak=Greatest("longest_streak", extended), last_activity_date=day
+    ):
+        return
+    if Streak.objects.filter(user_id=user_id).exists():
+        return
+    try:
+        with transaction.atomic():
+            Streak.objects.create(user_id=user_id, current_streak=1, longest_streak=1, last_activity_date=day)
+    except IntegrityError:
+        # A concurrent first activity created the row
+        pending.update(
+            current_streak=extended, longest_streak=Greatest("longest_streak", extended), last_activity_date=day
+        )
+
+
+def record_activity_days(user_id, days):
+    """Count several days towards the user's streak at once, e.g. after a bulk import."""
+    days = sorted(set(days))
+    if len(days) <= 1:
+        if days:
+            record_activity(user_id, days[0])
+        return
+    # No savepoint: within a caller's transaction (as in ingest) it would only add queries
+    with transaction.atomic(savepoint=False):
+        streak = Streak.objects.select_for_update().filter(user_id=user_id).first()
+        if streak is None:
+            # A concurrent first activity makes this fail the unique user constraint;
+            # callers retry on IntegrityError, as ingest_weight_logs does
+            streak = Streak(user_id=user_id)
+        state = streak.current_streak, streak.longest_streak, streak.last_activity_date
+        for day in days:
+            state = advance(*state, day)
+        streak.current_streak, streak.longest_streak, streak.last_activity_date = state
+        streak.save()
+
+
+def activity_days():
+    """``(user_id, day)`` for every day each user was active, ordered by user then day."""
+    weight_days = WeightLog.objects.values_list("user_id", "date")
+    achievement_days = Achievement.objects.values_list("user_id", "date_achieved")
+    # UNION (not UNION ALL) also drops days with several activities
+    return weight_days.union(achievement_days).order_by("user_id", "date")
+
+
+def rebuild_streaks(chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute every streak from activity history; returns the number of users with activity.
+
+    History is streamed in order and folded one user at a time, and streaks are
+    written ``chunk_size`` users at a time, so memory stays bounded however
+    much history there is.
+    """
+    users = 0
+    chunk = {}
+    for user_id, days in groupby(activity_days().iterator(chunk_size=chunk_size), key=lambda row: row[0]):
+        state = (0, 0, None)
+        for _, day in days:
+            state = advance(*state, day)
+        chunk[user_id] = state
+        users += 1
+        if len(chunk) >= chunk_size:
+            _write_streaks(chunk)
+            chunk = {}
+    if chunk:
+        _write_streaks(chunk)
+    # Streaks of users whose activity was all deleted
+    inactive = Streak.objects.filter(
+        ~Exists(WeightLog.objects.filter(user_id=OuterRef("user_id"))),
+        ~Exists(Achievement.objects.filter(user_id=OuterRef("user_id"))),
+    ).exclude(current_streak=0, longest_streak=0, last_activity_date=None)
+    bump_versions(Streak._meta.model_name, list(inactive.values_list("user_id", flat=True)))
+    inactive.update(current_streak=0, longest_streak=0, last_activity_date=None)
+    return users
+
+
+def _write_streaks(states):
+    fields = ["current_streak", "longest_streak", "last_activity_date"]
+    with transaction.atomic():
+        existing = Streak.objects.filter(user_id__in=states).in_bulk(field_name="user_id")
+        for user_id, streak in existing.items():
+            streak.current_streak, streak.longest_streak, streak.last_activity_date = states[user_id]
+        Streak.objects.bulk_update(existing.values(), fields)
+        Streak.objects.bulk_create(
+            Streak(user_id=user_id, current_streak=current, longest_streak=longest, last_activity_date=last)
+            for user_id, (current, longest, last) in states.items()
+            if user_id not in existing
+        )
+        # bulk writes send no signals (see versions.py)
+        bump_versions(Streak._meta.model_name, states)
@@ -1,8 +1,1073 @@
-from django.test import TestCase
-from .models import Task
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Thread
+from urllib.parse import parse_qs, urlsplit
+import json
+import time
+from unittest.mock import Mock, patch
+import numpy as np
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Q
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from overachievers import middleware
+from overachievers.rate_limit import RedisRateLimiter
+from . import leaderboards, nutrition, purchases, response_cache, streaks, throttling, trends, versions, weather
+from .ingest import ingest_weight_logs
+from .models import Achievement, Badge, BadgeTier, DailyBadgeLimit, PurchasableBadge, Streak, Task, TaskSummary, UserProfile, WeeklyBadgePurchase, WeightLog
+from .views import AchievementViewSet, AwardBadgeView, DashboardView, LeaderboardView, NutritionCheckView, PurchaseBadgeView, PurchasableBadgeViewSet, WeatherInfoView, WeightLogViewSet, task_analytics, task_list
+
+# Query counts below assume stamps cost no query, as with Redis; within one test
+# process the local-memory cache is shared and stands in for it
+STAMPS_IN_DEFAULT_CACHE = override_settings(VERSION_CACHE_ALIAS="default")
+
 
 class TaskModelTest(TestCase):
     def test_create_task(self):
         task = Task.objects.create(name="Test Task", completed=False)
         self.assertEqual(task.name, "Test Task")
         self.assertFalse(task.completed)
+
+class MetricsViewTest(TestCase):
+    def test_only_allowed_addresses_can_scrape(self):
+        factory = RequestFactory()
+        self.assertEqual(middleware.metrics_view(factory.get("/metrics/", REMOTE_ADDR="127.0.0.1")).status_code, 200)
+        self.assertEqual(middleware.metrics_view(factory.get("/metrics/", REMOTE_ADDR="203.0.113.7")).status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=["203.0.113.0/24"]):
+            self.assertEqual(middleware.metrics_view(factory.get("/metrics/", REMOTE_ADDR="203.0.113.7")).status_code, 200)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_token_grants_access_from_anywhere(self):
+        factory = RequestFactory()
+        request = factory.get("/metrics/", REMOTE_ADDR="203.0.113.7", HTTP_AUTHORIZATION="Bearer scrape-secret")
+        response = middleware.metrics_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"django_http_requests_total", response.content)
+        request = factory.get("/metrics/", REMOTE_ADDR="203.0.113.7", HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(middleware.metrics_view(request).status_code, 403)
+
+class SharedUserRateThrottleTest(TestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest("fakeredis is required")
+        # Two throttles share one fake Redis, like two gunicorn workers
+        limiter = RedisRateLimiter(3, period=60, client=fakeredis.FakeRedis(), prefix="test-api")
+        patcher = patch.object(throttling.SharedUserRateThrottle, "THROTTLE_RATES", {"user": "3/min"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        throttling._limiters[(3, 60)] = limiter
+        self.addCleanup(throttling._limiters.pop, (3, 60), None)
+
+    def _request(self):
+        request = Request(APIRequestFactory().get("/api/weight-logs/"))
+        request.user = AnonymousUser()
+        return request
+
+    def test_limit_is_shared(self):
+        results = [throttling.SharedUserRateThrottle().allow_request(self._request(), None) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+@STAMPS_IN_DEFAULT_CACHE
+class BadgeCatalogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shopper", password="secret")
+        patcher = patch.object(PurchasableBadgeViewSet, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_badges(self, count):
+        for i in range(count):
+            tier = BadgeTier.objects.create(name=f"Tier {i}", level=i + 1)
+            PurchasableBadge.objects.create(
+                name=f"Badge {i}", description="Shiny", price="9.99", icon=f"badges/{i}.png", tier=tier
+            )
+
+    def _list(self):
+        request = APIRequestFactory().get("/api/purchasable-badges/")
+        force_authenticate(request, user=self.user)
+        return PurchasableBadgeViewSet.as_view({"get": "list"})(request)
+
+    def test_query_count_does_not_grow_with_catalog(self):
+        for count in (2, 20):
+            with self.subTest(badges=count):
+                cache.clear()
+                self._create_badges(count)
+                with self.assertNumQueries(1):
+                    response = self._list()
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data[0]["tier"]["name"], "Tier 0")
+
+    def test_cached_catalog_needs_no_queries(self):
+        self._create_badges(3)
+        self._list()
+        with self.assertNumQueries(0):
+            response = self._list()
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]["icon"], "http://testserver/badges/0.png")
+
+    def test_writes_invalidate_catalog(self):
+        self._create_badges(1)
+        self.assertEqual(self._list().data[0]["name"], "Badge 0")
+        with self.captureOnCommitCallbacks(execute=True):
+            PurchasableBadge.objects.update(name="Renamed")
+            PurchasableBadge.objects.get().save()
+        self.assertEqual(self._list().data[0]["name"], "Renamed")
+        with self.captureOnCommitCallbacks(execute=True):
+            BadgeTier.objects.get().delete()
+        self.assertEqual(self._list().data, [])
+
+
+@STAMPS_IN_DEFAULT_CACHE
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="lifter", password="secret")
+        self.other = User.objects.create_user(username="runner", password="secret")
+        for viewset in (WeightLogViewSet, PurchasableBadgeViewSet):
+            patcher = patch.object(viewset, "throttle_classes", [])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, viewset, user, **headers):
+        request = APIRequestFactory().get("/api/", **headers)
+        force_authenticate(request, user=user)
+        return viewset.as_view({"get": "list"})(request)
+
+    def test_unchanged_list_is_304_without_queries(self):
+        WeightLog.objects.create(weight=80.5, user=self.user)
+        response = self._get(WeightLogViewSet, self.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Authorization", response["Vary"])
+        with self.assertNumQueries(0):
+            response = self._get(WeightLogViewSet, self.user, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_if_modified_since(self):
+        self._get(WeightLogViewSet, self.user)
+        # Last-Modified is only sent once the stamp's second has passed
+        with patch("time.time_ns", return_value=time.time_ns() + 1_000_000_000):
+            response = self._get(WeightLogViewSet, self.user)
+            response = self._get(WeightLogViewSet, self.user, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_last_modified_within_the_stamps_second(self):
+        # A write later in the same second would keep the same date
+        second = time.time_ns() // 1_000_000_000
+        clock = Mock(return_value=second * 1_000_000_000 + 100)
+        with patch("time.time_ns", clock):
+            self._get(WeightLogViewSet, self.user)
+            clock.return_value += 100
+            response = self._get(WeightLogViewSet, self.user)
+            self.assertNotIn("Last-Modified", response)
+            response = self._get(WeightLogViewSet, self.user, HTTP_IF_MODIFIED_SINCE=http_date(second))
+            self.assertEqual(response.status_code, 200)
+            clock.return_value += 1_000_000_000
+            response = self._get(WeightLogViewSet, self.user)
+        self.assertEqual(response["Last-Modified"], http_date(second))
+
+    def test_writes_bump_only_their_users_version(self):
+        mine = self._get(WeightLogViewSet, self.user)["ETag"]
+        theirs = self._get(WeightLogViewSet, self.other)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            WeightLog.objects.create(weight=70.0, user=self.other)
+        self.assertEqual(self._get(WeightLogViewSet, self.user, HTTP_IF_NONE_MATCH=mine).status_code, 304)
+        response = self._get(WeightLogViewSet, self.other, HTTP_IF_NONE_MATCH=theirs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_badge_list_depends_on_tiers(self):
+        tier = BadgeTier.objects.create(name="Gold", level=1)
+        etag = self._get(PurchasableBadgeViewSet, self.user)["ETag"]
+        self.assertEqual(self._get(PurchasableBadgeViewSet, self.user, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            tier.save()
+        self.assertEqual(self._get(PurchasableBadgeViewSet, self.user, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class VersionStampTest(TestCase):
+    def test_stamps_are_shared_without_redis(self):
+        from django.conf import settings
+
+        if settings.REDIS_URL:
+            self.skipTest("Stamps are in the shared Redis cache")
+        # Another worker's local-memory cache is not this one's; the stamp table is
+        self.assertEqual(settings.VERSION_CACHE_ALIAS, "versions")
+        stamp = versions.get_version("weightlog", 1)
+        cache.clear()
+        self.assertEqual(versions.get_version("weightlog", 1), stamp)
+        with self.captureOnCommitCallbacks(execute=True):
+            versions.bump_version("weightlog", 1)
+        self.assertEqual(caches["versions"].get(versions._key("weightlog", 1)), versions.get_version("weightlog", 1))
+        self.assertNotEqual(versions.get_version("weightlog", 1), stamp)
+        self.assertEqual(versions.get_versions(["weightlog"], 2), [versions.get_version("weightlog", 2)])
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="walker", password="secret")
+        patcher = patch.object(WeightLogViewSet, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(task_list.cls, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Several logs per day, so pages split ties on date
+        WeightLog.objects.bulk_create(
+            WeightLog(
+                weight=80 - i / 10,
+                date=date(2024, 1, 1) + timedelta(days=i // 3),
+                recorded_at=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i),
+                user=self.user,
+            )
+            for i in range(25)
+        )
+        self.expected = list(WeightLog.objects.order_by("-date", "-id").values_list("id", flat=True))
+
+    def _get(self, view, url):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.user)
+        return view(request)
+
+    def _weight_logs(self, url):
+        return self._get(WeightLogViewSet.as_view({"get": "list"}), url)
+
+    def test_walks_every_row_once_in_both_directions(self):
+        url, pages = "/api/weight-logs/?page_size=4", []
+        while url:
+            response = self._weight_logs(url)
+            pages.append([log["id"] for log in response.data["results"]])
+            url = response.data["next"]
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+        self.assertEqual(len(pages), 7)
+
+        url, backwards = response.data["previous"], []
+        while url:
+            response = self._weight_logs(url)
+            backwards.append([log["id"] for log in response.data["results"]])
+            url = response.data["previous"]
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_count_is_opt_in(self):
+        self.assertNotIn("count", self._weight_logs("/api/weight-logs/").data)
+        self.assertEqual(self._weight_logs("/api/weight-logs/?count=true").data["count"], 25)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self._weight_logs("/api/weight-logs/?cursor=bm9wZQ").status_code, 404)
+
+    def test_task_pages_run_one_query(self):
+        Task.objects.bulk_create(Task(name=f"Task {i}") for i in range(30))
+        first = self._get(task_list, "/api/tasks/")
+        with self.assertNumQueries(1):
+            second = self._get(task_list, first.data["next"])
+        self.assertEqual(len(second.data["results"]), 10)
+        self.assertGreater(second.data["results"][0]["id"], first.data["results"][-1]["id"])
+
+
+class TaskSummaryTest(TestCase):
+    def assertCounts(self, completed, pending):
+        summary = TaskSummary.current()
+        self.assertEqual((summary.completed, summary.pending), (completed, pending))
+
+    def test_saves_and_deletes(self):
+        task = Task.objects.create(name="Squats")
+        Task.objects.create(name="Lunges", completed=True)
+        self.assertCounts(1, 1)
+        task.completed = True
+        task.save()
+        task.save()
+        self.assertCounts(2, 0)
+        Task.objects.get(name="Lunges").delete()
+        self.assertCounts(1, 0)
+
+    def test_bulk_writes(self):
+        Task.objects.bulk_create([Task(name=f"Task {i}", completed=i < 2) for i in range(5)])
+        self.assertCounts(2, 3)
+        self.assertEqual(Task.objects.filter(name__in=["Task 1", "Task 2", "Task 3"]).update(completed=True), 3)
+        self.assertCounts(4, 1)
+        Task.objects.update(completed=~Q(completed=True))
+        self.assertCounts(1, 4)
+        Task.objects.filter(completed=False).delete()
+        self.assertCounts(1, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Task.objects.create(name="Plank")
+        TaskSummary.objects.update(completed=7)
+        out = StringIO()
+        call_command("reconcile_task_counters", stdout=out)
+        self.assertIn("Repaired", out.getvalue())
+        self.assertCounts(0, 1)
+
+    def test_analytics_is_a_single_lookup(self):
+        Task.objects.bulk_create(Task(name=f"Task {i}", completed=i % 2 == 0) for i in range(10))
+        request = APIRequestFactory().get("/api/analytics/")
+        force_authenticate(request, user=User(username="coach"))
+        with patch.object(task_analytics.cls, "throttle_classes", []), self.assertNumQueries(1):
+            response = task_analytics(request)
+        self.assertEqual(response.data, {"completed": 5, "pending": 5})
+
+
+class BulkWeightLogTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="wearer", password="secret")
+        patcher = patch.object(WeightLogViewSet, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, payload):
+        request = APIRequestFactory().post("/api/weight-logs/bulk/", payload, format="json")
+        force_authenticate(request, user=self.user)
+        return WeightLogViewSet.as_view({"post": "bulk"})(request)
+
+    def test_backfill_with_per_item_results(self):
+        WeightLog.objects.create(weight=82.0, recorded_at=datetime(2024, 3, 1, 7, tzinfo=timezone.utc), user=self.user)
+        response = self._post({"entries": [
+            {"weight": 81.5, "recorded_at": "2024-03-02T07:00:00Z"},
+            {"weight": 82.0, "recorded_at": "2024-03-01T08:00:00+01:00"},  # stored already
+            {"weight": "81.1", "recorded_at": "2024-03-03T07:00:00Z"},
+            {"weight": 81.1, "recorded_at": "2024-03-03T07:00:00Z"},  # repeated in the payload
+            {"weight": -3, "recorded_at": "yesterday"},
+            "81.0",
+        ]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["created"], response.data["duplicates"], response.data["invalid"]), (2, 2, 2))
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, ["created", "duplicate", "created", "duplicate", "invalid", "invalid"])
+        self.assertEqual(set(response.data["results"][4]["errors"]), {"weight", "recorded_at"})
+        log = WeightLog.objects.get(pk=response.data["results"][0]["id"])
+        self.assertEqual(log.date, date(2024, 3, 2))
+        self.assertEqual(WeightLog.objects.filter(user=self.user).count(), 3)
+
+    def test_thousands_of_entries_in_few_queries(self):
+        start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        entries = [{"weight": 80, "recorded_at": (start + timedelta(minutes=i)).isoformat()} for i in range(2000)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post(entries)
+        # One range lookup, batched INSERTs (SQLite caps rows per statement) and the streak update
+        self.assertLess(len(queries), 15)
+        self.assertEqual(response.data["created"], 2000)
+        self.assertEqual(self._post(entries).data["duplicates"], 2000)
+
+    def test_rejects_oversized_payloads(self):
+        with patch("fitness_app.views.MAX_ENTRIES", 2):
+            response = self._post([{"weight": 80, "recorded_at": "2024-01-01T00:00:00Z"}] * 3)
+        self.assertEqual(response.status_code, 400)
+
+
+@STAMPS_IN_DEFAULT_CACHE
+class WeightTrendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="trender", password="secret")
+        patcher = patch.object(WeightLogViewSet, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _log(self, day, weight):
+        with self.captureOnCommitCallbacks(execute=True):
+            return WeightLog.objects.create(
+                weight=weight,
+                date=date(2024, 1, 1) + timedelta(days=day),
+                # Distinct per reading, even for several on one day
+                recorded_at=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(days=day, seconds=weight),
+                user=self.user,
+            )
+
+    def _trend(self, query=""):
+        request = APIRequestFactory().get(f"/api/weight-logs/trend/{query}")
+        force_authenticate(request, user=self.user)
+        return WeightLogViewSet.as_view({"get": "trend"})(request)
+
+    def test_ewma_matches_recurrence(self):
+        values = np.random.default_rng(1).normal(80, 2, 2000)
+        for alpha in (0.01, 0.25, 0.9):
+            expected, previous = [], values[0]
+            for value in values:
+                previous = alpha * value + (1 - alpha) * previous
+                expected.append(previous)
+            np.testing.assert_allclose(trends.ewma(values, alpha), expected)
+
+    def test_rolling_mean_uses_calendar_days(self):
+        days = np.array([0, 1, 5, 6, 20])
+        values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        np.testing.assert_allclose(trends.rolling_mean(days, values, 7), [1, 1.5, 2, 2.5, 5])
+        np.testing.assert_allclose(trends.rolling_mean(days, values, 7, start=3), [2.5, 5])
+
+    def test_trend_report(self):
+        for day in range(28):
+            self._log(day, 90 - day / 7)  # Losing a kilo a week
+        response = self._trend()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["days"]), 28)
+        self.assertAlmostEqual(response.data["slope_per_week"], -1.0)
+        self.assertIsNone(response.data["weekly_delta"][0])
+        self.assertAlmostEqual(response.data["weekly_delta"][-1], -1.0, places=2)
+        self.assertEqual(self._trend("?window=0").status_code, 400)
+
+    def test_new_logs_are_merged_incrementally(self):
+        for day in (0, 1, 3):
+            self._log(day, 80 + day)
+        self._trend()
+        self._log(3, 84)  # a second reading on a day already cached
+        self._log(9, 75)
+        with self.assertNumQueries(2):
+            # New rows since the watermark and the count check
+            merged = self._trend().data
+        cache.clear()
+        self.assertEqual(merged, self._trend().data)
+        self.assertEqual(merged["weights"][2], 83.5)
+
+    def test_edits_drop_the_cached_series(self):
+        log = self._log(0, 80)
+        self._log(1, 81)
+        self._trend()
+        with self.captureOnCommitCallbacks(execute=True):
+            log.weight = 70
+            log.save()
+        self.assertEqual(self._trend().data["weights"], [70, 81])
+        with self.assertNumQueries(0):
+            self._trend()
+
+
+@STAMPS_IN_DEFAULT_CACHE
+class AwardBadgeTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tapper", password="secret")
+        tier = BadgeTier.objects.create(name="Gold", level=1)
+        self.badge = PurchasableBadge.objects.create(
+            name="Sunrise", description="Early", price="1.00", icon="badges/sun.png", tier=tier,
+            season=PurchasableBadge.current_season(),
+        )
+        patcher = patch.object(AwardBadgeView, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _award(self, badge_id):
+        request = APIRequestFactory().post("/api/award-badge/", {"badge_id": badge_id}, format="json")
+        force_authenticate(request, user=self.user)
+        return AwardBadgeView.as_view()(request)
+
+    def test_award_is_one_query(self):
+        self._award(self.badge.pk)  # creates today's counter and warms the catalog
+        with self.assertNumQueries(1):
+            self.assertEqual(self._award(self.badge.pk).status_code, 200)
+        self.assertEqual(self._award(self.badge.pk + 1).status_code, 404)
+
+    def test_limit_holds_under_100_parallel_requests(self):
+        self._award(self.badge.pk)  # warm the catalog, so threads only race on the counter
+        DailyBadgeLimit.objects.all().delete()
+        start = Barrier(100)
+
+        def tap(_):
+            start.wait()
+            try:
+                while True:
+                    try:
+                        return self._award(self.badge.pk).status_code
+                    except OperationalError as e:
+                        # SQLite's shared-cache test database fails on lock
+                        # contention instead of waiting; a failed statement
+                        # changed nothing, so the tap is simply retried
+                        if "locked" not in str(e):
+                            raise
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=100) as pool:
+            statuses = list(pool.map(tap, range(100)))
+        self.assertEqual(statuses.count(200), DailyBadgeLimit.MAX_BADGES_PER_DAY)
+        self.assertEqual(statuses.count(400), 100 - DailyBadgeLimit.MAX_BADGES_PER_DAY)
+        self.assertEqual(DailyBadgeLimit.objects.get(user=self.user).badge_count, DailyBadgeLimit.MAX_BADGES_PER_DAY)
+
+
+@STAMPS_IN_DEFAULT_CACHE
+class WeeklyPurchaseCounterTest(TestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest("fakeredis is required")
+        cache.clear()
+        self.redis = fakeredis.FakeRedis()
+        self.counter = purchases.WeeklyPurchaseCounter(client=self.redis, prefix="test-purchases")
+        patcher = patch.object(purchases, "_counter", self.counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(PurchaseBadgeView, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="shopper", password="secret")
+        tier = BadgeTier.objects.create(name="Silver", level=2)
+        self.badge = PurchasableBadge.objects.create(
+            name="Moon", description="Night owl", price="2.00", icon="badges/moon.png", tier=tier
+        )
+
+    def _purchase(self):
+        request = APIRequestFactory().post("/api/purchase-badge/", {"badge_id": self.badge.pk}, format="json")
+        force_authenticate(request, user=self.user)
+        return PurchaseBadgeView.as_view()(request)
+
+    def test_limit_counts_the_rolling_week(self):
+        today = date.today()
+        # Two purchases still in the window, one that has left it
+        for days_ago in (1, 6, 7):
+            WeeklyBadgePurchase.objects.create(user=self.user, badge=self.badge, purchase_date=today - timedelta(days=days_ago))
+        with patch.object(purchases, "localdate", return_value=today):
+            self.assertEqual(self._purchase().status_code, 200)
+            # Seeded from the rows on first use; afterwards a rejection is one script call, no query
+            with self.assertNumQueries(0):
+                self.assertEqual(self._purchase().status_code, 400)
+        self.assertEqual(WeeklyBadgePurchase.objects.filter(user=self.user).count(), 4)
+
+    def test_failed_insert_releases_the_slot(self):
+        with patch.object(WeeklyBadgePurchase.objects, "create", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                purchases.purchase_badge(self.user, self.badge.pk)
+        for _ in range(WeeklyBadgePurchase.MAX_PURCHASES_PER_WEEK):
+            self.assertTrue(purchases.purchase_badge(self.user, self.badge.pk))
+        self.assertFalse(purchases.purchase_badge(self.user, self.badge.pk))
+
+    def test_falls_back_to_counting_rows_without_redis(self):
+        from redis.exceptions import ConnectionError
+
+        self.counter._reserve_script = Mock(side_effect=ConnectionError("down"))
+        with self.assertLogs("fitness_app.purchases", "WARNING"):
+            self.assertTrue(purchases.purchase_badge(self.user, self.badge.pk))
+        for _ in range(WeeklyBadgePurchase.MAX_PURCHASES_PER_WEEK - 1):
+            self.assertTrue(purchases.purchase_badge(self.user, self.badge.pk))
+        self.assertFalse(purchases.purchase_badge(self.user, self.badge.pk))
+
+    def test_rebuild_command_repairs_drift(self):
+        self.assertTrue(purchases.purchase_badge(self.user, self.badge.pk))
+        # A lost release leaves the counters claiming the week is full
+        self.redis.set(self.counter._keys(self.user.pk, purchases.localdate())[1], 3)
+        self.assertFalse(purchases.purchase_badge(self.user, self.badge.pk))
+        out = StringIO()
+        call_command("rebuild_purchase_counters", stdout=out)
+        self.assertIn("1 users", out.getvalue())
+        self.assertTrue(purchases.purchase_badge(self.user, self.badge.pk))
+
+class StubUpstream:
+    """A local HTTP server standing in for a third-party API; records each request's query.
+
+    ``body`` is sent as JSON, or as it is if it is bytes.
+    """
+
+    def __init__(self, status=200, delay=0.0, body=None):
+        self.status = status
+        self.delay = delay
+        self.body = body if body is not None else {"calories": 105}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(parse_qs(urlsplit(self.path).query))
+                time.sleep(stub.delay)
+                payload = stub.body if isinstance(stub.body, bytes) else json.dumps(stub.body).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except BrokenPipeError:
+                    pass  # The client timed out first
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class NutritionServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.upstream = StubUpstream()
+        self.addCleanup(self.upstream.close)
+        self.service = nutrition.NutritionService(self.upstream.url, "app", "key", timeout=(1, 0.5))
+        patcher = patch.object(nutrition, "_service", self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(NutritionCheckView, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="eater", password="secret")
+
+    def _check(self, food):
+        request = APIRequestFactory().get("/api/nutrition-check/", {"food": food})
+        force_authenticate(request, user=self.user)
+        return NutritionCheckView.as_view()(request)
+
+    def test_normalized_foods_share_a_cache_entry(self):
+        for food in ("1 Banana", "  1 banana ", "1   BANANA"):
+            response = self._check(food)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, {"calories": 105})
+        self.assertEqual(len(self.upstream.requests), 1)
+        self.assertEqual(self.upstream.requests[0], {"app_id": ["app"], "app_key": ["key"], "ingr": ["1 banana"]})
+        # A fresh worker still answers from the shared cache
+        worker = nutrition.NutritionService(self.upstream.url, "app", "key")
+        self.assertEqual(worker.lookup("1 banana"), {"calories": 105})
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    def test_concurrent_lookups_are_coalesced(self):
+        self.upstream.delay = 0.2
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(lambda _: self.service.lookup("apple"), range(20)))
+        self.assertEqual(results, [{"calories": 105}] * 20)
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    def test_upstream_errors_are_not_cached(self):
+        self.upstream.status = 503
+        response = self._check("kale")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data, {"error": "Failed to fetch nutrition data"})
+        self.upstream.status = 200
+        self.assertEqual(self._check("kale").status_code, 200)
+        self.assertEqual(len(self.upstream.requests), 2)
+
+    def test_slow_upstream_times_out(self):
+        self.upstream.delay = 1.0
+        self.assertEqual(self._check("durian").status_code, 504)
+
+    def test_invalid_json_is_a_bad_gateway(self):
+        self.upstream.body = b"<html>Proxy error</html>"
+        response = self._check("fig")
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.data, {"error": "Failed to fetch nutrition data"})
+
+    def test_blank_food_is_rejected(self):
+        self.assertEqual(self._check("   ").status_code, 400)
+        self.assertEqual(self.upstream.requests, [])
+
+class WeatherServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.upstream = StubUpstream(body={"main": {"temp": 281.5}})
+        self.addCleanup(self.upstream.close)
+        self.now = 1_000_000.0
+        self.service = weather.WeatherService(
+            self.upstream.url, "key", fresh_for=600, stale_for=3600, timeout=0.5, clock=lambda: self.now
+        )
+        self.addCleanup(self.service.close)
+        patcher = patch.object(weather, "_service", self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(WeatherInfoView, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="forecaster", password="secret")
+
+    def _weather(self, location):
+        request = APIRequestFactory().get("/api/weather-info/", {"location": location})
+        force_authenticate(request, user=self.user)
+        return WeatherInfoView.as_view()(request)
+
+    def test_fresh_entries_are_served_from_cache(self):
+        for location in ("New York, US", "new york,us", " NEW  YORK , us"):
+            response = self._weather(location)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, {"main": {"temp": 281.5}})
+        self.assertEqual(self.upstream.requests, [{"q": ["new york,us"], "appid": ["key"]}])
+
+    def test_stale_entries_are_served_while_refreshing(self):
+        self.service.get("Boston")
+        self.upstream.body = {"main": {"temp": 290.0}}
+        self.upstream.delay = 0.3
+        self.now += 601
+        started = time.perf_counter()
+        self.assertEqual(self.service.get("Boston"), {"main": {"temp": 281.5}})
+        self.assertLess(time.perf_counter() - started, 0.2)
+        # Every stale read shares the one refresh in flight
+        self.assertEqual(self.service.get("Boston"), {"main": {"temp": 281.5}})
+        self.assertEqual(self.service.refresh("boston").result(timeout=2), {"main": {"temp": 290.0}})
+        self.assertEqual(self.service.get("Boston"), {"main": {"temp": 290.0}})
+        self.assertEqual(len(self.upstream.requests), 2)
+
+    def test_concurrent_misses_share_one_request(self):
+        self.upstream.delay = 0.2
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(lambda _: self.service.get("Chicago"), range(20)))
+        self.assertEqual(results, [{"main": {"temp": 281.5}}] * 20)
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    def test_upstream_failures(self):
+        self.upstream.status = 404
+        with self.assertLogs("fitness_app.weather", "WARNING"):
+            self.assertEqual(self._weather("Atlantis").status_code, 404)
+        self.upstream.status = 200
+        self.upstream.delay = 1.0
+        with self.assertLogs("fitness_app.weather", "WARNING"):
+            self.assertEqual(self._weather("Denver").status_code, 504)
+
+    def test_invalid_json_is_a_bad_gateway(self):
+        self.upstream.body = b"<html>Proxy error</html>"
+        with self.assertLogs("fitness_app.weather", "WARNING") as logs:
+            self.assertEqual(self._weather("Reno").status_code, 502)
+        self.assertIn("invalid JSON", "\n".join(logs.output))
+        self.assertIsNone(cache.get(weather.cache_key(weather.normalize_location("Reno"))))
+
+    def test_refresher_keeps_configured_locations_fresh(self):
+        self.service.start_refresher(["New York", "Boston"], interval=0.05)
+        deadline = time.monotonic() + 2
+        while len(self.upstream.requests) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sorted(r["q"][0] for r in self.upstream.requests), ["boston", "new york"])
+        self.assertEqual(self.service.get("new york"), {"main": {"temp": 281.5}})
+        self.assertEqual(len(self.upstream.requests), 2)
+
+    def test_refresher_survives_a_failed_pass(self):
+        # The refresher's thread has its own cache handle; patch the backend class
+        backend = type(caches["default"])
+        aget = backend.aget
+        failures = [ConnectionError("cache unreachable")]
+
+        async def flaky_aget(self, key, *args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return await aget(self, key, *args, **kwargs)
+
+        with patch.object(backend, "aget", flaky_aget), \
+                self.assertLogs("fitness_app.weather", "ERROR") as logs:
+            self.service.start_refresher(["Boston"], interval=0.05)
+            deadline = time.monotonic() + 2
+            while not self.upstream.requests and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertIn("cache unreachable", "\n".join(logs.output))
+        self.assertEqual([r["q"][0] for r in self.upstream.requests], ["boston"])
+
+class StreakTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="runner", password="secret")
+        self.start = date(2026, 3, 1)
+
+    def _log(self, day, user=None):
+        # Distinct readings, however many on one day
+        recorded_at = datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc) + timedelta(
+            seconds=WeightLog.objects.count()
+        )
+        return WeightLog.objects.create(user=user or self.user, weight=70, date=day, recorded_at=recorded_at)
+
+    def _streak(self, user=None):
+        streak = Streak.objects.get(user=user or self.user)
+        return streak.current_streak, streak.longest_streak, streak.last_activity_date
+
+    def test_activity_extends_and_restarts_the_streak(self):
+        for offset in (0, 1, 1, 2, 5, 6):
+            self._log(self.start + timedelta(days=offset))
+        self.assertEqual(self._streak(), (2, 3, self.start + timedelta(days=6)))
+        # Achievements count too, once per day
+        Achievement.objects.create(user=self.user, title="Early bird")
+        Achievement.objects.create(user=self.user, title="Night owl")
+        today = Achievement.objects.filter(user=self.user).first().date_achieved
+        self.assertEqual(self._streak()[2], today)
+
+    def test_recording_is_constant_time(self):
+        for offset in range(60):
+            self._log(self.start + timedelta(days=offset))
+        with self.assertNumQueries(1):
+            streaks.record_activity(self.user.pk, self.start + timedelta(days=60))
+        self.assertEqual(self._streak(), (61, 61, self.start + timedelta(days=60)))
+
+    def test_current_on_breaks_after_a_missed_day(self):
+        self._log(self.start)
+        self._log(self.start + timedelta(days=1))
+        streak = Streak.objects.get(user=self.user)
+        self.assertEqual(streak.current_on(self.start + timedelta(days=2)), 2)
+        self.assertEqual(streak.current_on(self.start + timedelta(days=3)), 0)
+
+    @override_settings(TIME_ZONE="America/New_York")
+    def test_days_follow_the_school_timezone(self):
+        # An hour apart on one UTC day, but either side of midnight in New York
+        readings = [
+            {"weight": 70, "recorded_at": "2026-03-02T04:30:00Z"},
+            {"weight": 70, "recorded_at": "2026-03-02T05:30:00Z"},
+        ]
+        ingest_weight_logs(self.user, readings)
+        self.assertEqual(self._streak(), (2, 2, date(2026, 3, 2)))
+        self.assertEqual(streaks.local_day(datetime(2026, 3, 2, 4, 30, tzinfo=timezone.utc)), date(2026, 3, 1))
+
+    def test_bulk_ingest_updates_the_streak(self):
+        self._log(self.start)
+        ingest_weight_logs(self.user, [
+            {"weight": 70, "recorded_at": f"2026-03-0{day}T12:00:00Z"} for day in (2, 3, 4, 6)
+        ])
+        self.assertEqual(self._streak(), (1, 4, date(2026, 3, 6)))
+
+    def test_rebuild_recomputes_from_history(self):
+        other = User.objects.create_user(username="walker", password="secret")
+        idle = User.objects.create_user(username="idle", password="secret")
+        for offset in (0, 1, 2, 4):
+            self._log(self.start + timedelta(days=offset))
+        self._log(self.start, user=other)
+        # Late syncs and deletions the incremental updates don't apply
+        self._log(self.start - timedelta(days=1))
+        WeightLog.objects.filter(user=other).delete()
+        self._log(self.start + timedelta(days=3), user=other)
+        Streak.objects.create(user=idle, current_streak=9, longest_streak=9, last_activity_date=self.start)
+        out = StringIO()
+        call_command("rebuild_streaks", "--chunk-size", "1", stdout=out)
+        self.assertIn("2 users", out.getvalue())
+        self.assertEqual(self._streak(), (1, 4, self.start + timedelta(days=4)))
+        self.assertEqual(self._streak(other), (1, 1, self.start + timedelta(days=3)))
+        self.assertEqual(self._streak(idle), (0, 0, None))
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest("fakeredis is required")
+        self.redis = fakeredis.FakeRedis()
+        self.boards = leaderboards.Leaderboards(client=self.redis, prefix="test-leaderboard")
+        patcher = patch.object(leaderboards, "_boards", self.boards)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(LeaderboardView, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = [User.objects.create_user(username=name, password="secret") for name in ("ana", "ben", "cy")]
+        tier = BadgeTier.objects.create(name="Gold", level=3)
+        self.badge = PurchasableBadge.objects.create(
+            name="Sun", description="Early riser", price="1.00", icon="badges/sun.png", tier=tier
+        )
+
+    def _achieve(self, user, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Achievement.objects.create(user=user, title="Lap") for _ in range(count)]
+
+    def _board(self, metric, window="weekly", **params):
+        request = APIRequestFactory().get(f"/api/leaderboards/{metric}/", {"window": window, **params})
+        force_authenticate(request, user=self.users[2])
+        return LeaderboardView.as_view()(request, metric=metric)
+
+    def test_writes_update_every_window_and_ties_share_a_rank(self):
+        ana, ben, cy = self.users
+        self._achieve(ana, 3)
+        self._achieve(ben, 3)
+        logs = self._achieve(cy, 1)
+        for window in leaderboards.WINDOWS:
+            top = self.boards.top("achievements", window)
+            self.assertEqual([(row["rank"], row["score"]) for row in top], [(1, 3), (1, 3), (3, 1)])
+        self.assertEqual(self.boards.rank("achievements", "monthly", cy.pk)["rank"], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            logs[0].delete()
+        # Users drop off a board when their score reaches zero
+        self.assertIsNone(self.boards.rank("achievements", "weekly", cy.pk))
+
+    def test_rows_count_towards_their_own_period(self):
+        ana = self.users[0]
+        last_month = date.today().replace(day=1) - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            WeeklyBadgePurchase.objects.create(user=ana, badge=self.badge, purchase_date=last_month)
+            WeeklyBadgePurchase.objects.create(user=ana, badge=self.badge)
+        self.assertEqual(self.boards.rank("badges", "monthly", ana.pk)["score"], 1)
+        self.assertEqual(self.boards.rank("badges", "monthly", ana.pk, day=last_month)["score"], 1)
+        self.assertEqual(self.boards.rank("badges", "all", ana.pk)["score"], 2)
+        # Past periods' boards expire; the all-time board does not
+        self.assertGreater(self.redis.ttl(self.boards.key("badges", "monthly", last_month)), 0)
+        self.assertEqual(self.redis.ttl(self.boards.key("badges", "all")), -1)
+
+    def test_around_me_ranks_a_slice_of_the_board(self):
+        key = self.boards.key("achievements", "weekly")
+        # Scores 20 down to 1, except users 5 and 6 tied on 15
+        self.redis.zadd(key, {user_id: 15 if user_id == 6 else 20 - user_id for user_id in range(20)})
+        around = self.boards.around("achievements", "weekly", 10, radius=2)
+        self.assertEqual([row["user_id"] for row in around], [8, 9, 10, 11, 12])
+        self.assertEqual([row["rank"] for row in around], [9, 10, 11, 12, 13])
+        # The slice starts inside the tie, and the user after it ranks 8th
+        around = self.boards.around("achievements", "weekly", 7, radius=1)
+        self.assertEqual([row["rank"] for row in around], [6, 8, 9])
+
+    def test_view_returns_top_and_around_me(self):
+        ana, ben, cy = self.users
+        self._achieve(ana, 2)
+        self._achieve(cy, 1)
+        response = self._board("achievements", limit=1, radius=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["top"], [{"rank": 1, "user_id": ana.pk, "score": 2, "username": "ana"}])
+        self.assertEqual(response.data["me"], {"rank": 2, "user_id": cy.pk, "score": 1, "username": "cy"})
+        self.assertEqual(len(response.data["around"]), 2)
+        self.assertEqual(self._board("streaks").status_code, 404)
+        self.assertEqual(self._board("badges", window="daily").status_code, 400)
+        self.assertEqual(self._board("badges", limit=0).status_code, 400)
+
+    def test_view_reports_redis_outages(self):
+        from redis.exceptions import ConnectionError
+
+        with patch.object(self.boards, "top", side_effect=ConnectionError("down")):
+            self.assertEqual(self._board("badges").status_code, 503)
+
+    def test_rebuild_command_rewrites_boards_from_tables(self):
+        ana, ben, cy = self.users
+        # bulk_create sends no signals, like rows written while Redis was down
+        Achievement.objects.bulk_create([Achievement(user=ana, title="Lap"), Achievement(user=ben, title="Lap")])
+        WeeklyBadgePurchase.objects.bulk_create([WeeklyBadgePurchase(user=ben, badge=self.badge)] * 2)
+        self.redis.zadd(self.boards.key("achievements", "weekly"), {cy.pk: 7})
+        out = StringIO()
+        call_command("rebuild_leaderboards", stdout=out)
+        self.assertIn("Rebuilt weekly achievements leaderboard: 2 users", out.getvalue())
+        self.assertEqual(
+            [(row["user_id"], row["score"]) for row in self.boards.top("achievements", "weekly")],
+            sorted([(ana.pk, 1), (ben.pk, 1)], reverse=True),
+        )
+        self.assertEqual(self.boards.rank("badges", "all", ben.pk)["score"], 2)
+
+@STAMPS_IN_DEFAULT_CACHE
+class DashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Leaderboards are not part of the dashboard
+        patcher = patch.object(leaderboards, "_boards", Mock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(DashboardView, "throttle_classes", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="dana", password="secret")
+        tier = BadgeTier.objects.create(name="Bronze", level=1)
+        self.badge = PurchasableBadge.objects.create(
+            name="Star", description="Shiny", price="1.00", icon="badges/star.png", tier=tier
+        )
+
+    def _dashboard(self):
+        request = APIRequestFactory().get("/api/dashboard/")
+        force_authenticate(request, user=self.user)
+        response = DashboardView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _history(self, days, first=0):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(days=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.update_or_create(user=self.user, defaults={"bio": "Runs at dawn"})
+            WeightLog.objects.bulk_create(
+                WeightLog(user=self.user, weight=80 - day / 10, date=(start + timedelta(days=day)).date(),
+                          recorded_at=start + timedelta(days=day))
+                for day in range(days)
+            )
+            Achievement.objects.bulk_create(Achievement(user=self.user, title=f"Lap {day}") for day in range(days))
+            WeeklyBadgePurchase.objects.bulk_create(
+                WeeklyBadgePurchase(user=self.user, badge=self.badge, purchase_date=date(2026, 1, 1)) for _ in range(days)
+            )
+            Badge.objects.create(user=self.user, name="First steps", description="")
+            Achievement.objects.create(user=self.user, title="Welcome")
+
+    def test_query_count_does_not_grow_with_history(self):
+        self._history(3)
+        with self.assertNumQueries(5):
+            small = self._dashboard()
+        cache.clear()
+        self._history(200, first=3)
+        with self.assertNumQueries(5):
+            large = self._dashboard()
+        self.assertEqual(len(small["latest_weights"]), 3)
+        self.assertEqual(len(large["latest_weights"]), 7)
+        self.assertEqual(large["achievements"]["total"], 205)
+        self.assertEqual(large["badges"]["purchased"][0]["count"], 203)
+        self.assertTrue(large["badges"]["purchased"][0]["icon"].startswith("http://testserver/"))
+        self.assertEqual(len(large["badges"]["earned"]), 2)
+        self.assertEqual(large["profile"]["bio"], "Runs at dawn")
+        self.assertEqual(large["streak"]["longest"], 1)
+
+    def test_cached_until_a_dashboard_resource_changes(self):
+        self._dashboard()
+        with self.assertNumQueries(0):
+            self._dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            WeeklyBadgePurchase.objects.create(user=self.user, badge=self.badge)
+        with self.assertNumQueries(5):
+            self.assertEqual(len(self._dashboard()["badges"]["purchased"]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            WeightLog.objects.create(user=self.user, weight=81)
+        data = self._dashboard()
+        self.assertEqual(data["latest_weights"][0]["weight"], 81)
+        self.assertEqual(data["streak"]["current"], 1)
+        # Another user's writes leave the snapshot alone
+        other = User.objects.create_user(username="eli", password="secret")
+        with self.captureOnCommitCallbacks(execute=True):
+            WeightLog.objects.create(user=other, weight=70)
+        with self.assertNumQueries(0):
+            self._dashboard()
+        # Purchased badges show the catalog's names and tiers
+        with self.captureOnCommitCallbacks(execute=True):
+            self.badge.name = "Comet"
+            self.badge.save()
+        self.assertEqual(self._dashboard()["badges"]["purchased"][0]["name"], "Comet")
+        with self.captureOnCommitCallbacks(execute=True):
+            tier = BadgeTier.objects.get(pk=self.badge.tier_id)
+            tier.name = "Silver"
+            tier.save()
+        self.assertEqual(self._dashboard()["badges"]["purchased"][0]["tier"], "Silver")
+
+@STAMPS_IN_DEFAULT_CACHE
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="lifter", password="secret")
+        self.other = User.objects.create_user(username="runner", password="secret")
+        for viewset in (WeightLogViewSet, AchievementViewSet):
+            patcher = patch.object(viewset, "throttle_classes", [])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            WeightLog.objects.create(weight=80.5, user=self.user)
+            WeightLog.objects.create(weight=60.0, user=self.other)
+
+    def _get(self, user, **params):
+        request = APIRequestFactory().get("/api/weight-logs/", params)
+        force_authenticate(request, user=user)
+        return WeightLogViewSet.as_view({"get": "list"})(request)
+
+    def _weights(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [log["weight"] for log in response.data["results"]]
+
+    def test_repeat_requests_are_served_from_cache(self):
+        hits = response_cache.response_cache_lookups_total.value(view="WeightLogViewSet", result="hit")
+        self.assertEqual(self._weights(self._get(self.user)), [80.5])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._weights(self._get(self.user)), [80.5])
+        self.assertEqual(
+            response_cache.response_cache_lookups_total.value(view="WeightLogViewSet", result="hit"), hits + 1
+        )
+        # Query parameters are part of the key
+        self.assertEqual(len(self._get(self.user, page_size=1).data["results"]), 1)
+
+    def test_users_never_share_entries(self):
+        self.assertEqual(self._weights(self._get(self.user)), [80.5])
+        self.assertEqual(self._weights(self._get(self.other)), [60.0])
+        self.assertEqual(self._weights(self._get(self.user)), [80.5])
+
+    def test_writes_invalidate_the_writers_entries(self):
+        self._get(self.user)
+        self._get(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            WeightLog.objects.create(weight=81.0, user=self.user)
+        self.assertEqual(sorted(self._weights(self._get(self.user))), [80.5, 81.0])
+        with self.assertNumQueries(0):
+            self._get(self.other)
+
+    def test_site_wide_cache_middleware_is_not_installed(self):
+        from django.conf import settings
+
+        self.assertNotIn("django.middleware.cache.UpdateCacheMiddleware", settings.MIDDLEWARE)
+        self.assertNotIn("django.middleware.cache.FetchFromCacheMiddleware", settings.MIDDLEWARE)
@@ -0,0 +1,51 @@
+from threading import Lock
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from overachievers.rate_limit import RedisRateLimiter
+
+# One shared limiter per (limit, period) so every throttle instance reuses the
+# same Redis script and local fallback.
+_limiters = {}
+_limiters_lock = Lock()
+
+
+def get_shared_limiter(limit, period):
+    """Return the process-wide RedisRateLimiter for a given rate."""
+    key = (limit, period)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = _limiters[key] = RedisRateLimiter(limit, period=period, prefix="ratelimit:api")
+    return limiter
+
+
+class SharedUserRateThrottle(SimpleRateThrottle):
+    """Per-user throttle enforced across all workers through Redis.
+
+    Rates are configured like DRF's built-in throttles, e.g.
+    ``DEFAULT_THROTTLE_RATES = {"user": "120/min"}``. Anonymous requests are
+    throttled by client IP.
+    """
+    scope = "user"
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        return not get_shared_limiter(self.num_requests, self.duration).is_limited(key)
+
+    def wait(self):
+        # A token bucket frees one slot every duration / num_requests seconds
+        return self.duration / self.num_requests
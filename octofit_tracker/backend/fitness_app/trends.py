@@ -0,0 +1,181 @@
+"""Weight trends: daily means, rolling mean, EWMA and regression slope.
+
+A user's readings are reduced to one mean per logged day and kept in the cache
+as NumPy arrays (``WeightSeries``), together with the rolling mean and EWMA for
+the default parameters. When new logs arrive only the rows after the last id
+seen are loaded, merged in, and the derived series recomputed from the first
+day they touch; earlier values cannot change.
+
+The cached series is stamped with the user's weight-log version (see
+versions.py), so a read that finds it current runs no query. Edits and deletes
+drop it (see signals.py). A row count check catches anything else the id
+watermark could miss, such as rows committed out of id order.
+"""
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import WeightLog
+from .versions import get_version
+
+TREND_CACHE_TIMEOUT = getattr(settings, "WEIGHT_TREND_CACHE_TIMEOUT", 24 * 60 * 60)
+SERIES_KEY = "fitness_app:weight-series:user-{user_id}"
+DEFAULT_WINDOW = 7  # Days in the rolling mean
+DEFAULT_ALPHA = 0.25  # EWMA smoothing factor; higher follows recent days more closely
+RECENT_DAYS = 28  # Span of the recent slope, next to the slope of the whole history
+
+
+def rolling_mean(days, values, window, start=0):
+    """Mean of ``values`` over the ``window`` calendar days ending on each day, from index ``start``.
+
+    ``days`` are sorted day ordinals; days without readings are simply absent.
+    """
+    if start >= len(days):
+        return np.empty(0)
+    # Only the days that can fall inside a window ending at or after days[start]
+    first_needed = np.searchsorted(days, days[start] - window + 1)
+    days, values = days[first_needed:], values[first_needed:]
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    lower = np.searchsorted(days, days - window + 1)
+    upper = np.arange(1, len(days) + 1)
+    means = (totals[upper] - totals[lower]) / (upper - lower)
+    return means[start - first_needed:]
+
+
+def ewma(values, alpha, previous=None):
+    """Exponentially weighted moving average, ``y[t] = alpha * x[t] + (1 - alpha) * y[t - 1]``.
+
+    ``previous`` is ``y[-1]``; by default the average starts at ``x[0]``. Computed
+    in closed form over blocks short enough that ``(1 - alpha) ** -k`` cannot
+    overflow.
+    """
+    values = np.asarray(values, dtype=float)
+    if not len(values) or alpha == 1:
+        return values.copy()
+    decay = 1.0 - alpha
+    previous = values[0] if previous is None else previous
+    block = max(1, int(300 / -np.log(decay)))
+    result = np.empty_like(values)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(len(chunk))
+        # y[k] = decay ** (k + 1) * y[-1] + alpha * sum(decay ** (k - j) * x[j] for j <= k)
+        result[start:start + len(chunk)] = powers * (decay * previous + alpha * np.cumsum(chunk / powers))
+        previous = result[start + len(chunk) - 1]
+    return result
+
+
+def slope_per_week(days, values):
+    """Least-squares slope of ``values`` against ``days``, per week; None without two distinct days."""
+    if len(days) < 2:
+        return None
+    offsets = days - days.mean()
+    spread = np.dot(offsets, offsets)
+    return float(np.dot(offsets, values - values.mean()) / spread * 7)
+
+
+class WeightSeries:
+    """One user's readings as daily sums and counts, with the default derived series."""
+
+    def __init__(self):
+        self.stamp = None
+        self.last_id = 0
+        self.readings = 0
+        self.days = np.empty(0, dtype=np.int64)
+        self.sums = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.rolling = np.empty(0)
+        self.ewma = np.empty(0)
+
+    @property
+    def means(self):
+        return self.sums / self.counts
+
+    def add(self, ids, days, weights):
+        """Merge readings in and recompute the derived series from the first day they touch."""
+        if not len(ids):
+            return
+        self.last_id = max(self.last_id, int(ids.max()))
+        self.readings += len(ids)
+
+        new_days, day_index = np.unique(days, return_inverse=True)
+        merged = np.union1d(self.days, new_days)
+        sums, counts = np.zeros(len(merged)), np.zeros(len(merged), dtype=np.int64)
+        kept = np.searchsorted(merged, self.days)
+        sums[kept], counts[kept] = self.sums, self.counts
+        added = np.searchsorted(merged, new_days)
+        sums[added] += np.bincount(day_index, weights=weights)
+        counts[added] += np.bincount(day_index)
+        self.days, self.sums, self.counts = merged, sums, counts
+
+        # Derived values before the first touched day only depend on earlier days
+        start = int(added[0])
+        means = self.means
+        self.rolling = np.concatenate((self.rolling[:start], rolling_mean(merged, means, DEFAULT_WINDOW, start)))
+        previous = self.ewma[start - 1] if start else None
+        self.ewma = np.concatenate((self.ewma[:start], ewma(means[start:], DEFAULT_ALPHA, previous)))
+
+
+def _load(logs):
+    rows = list(logs.values_list("id", "date", "weight"))
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    days = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    weights = np.fromiter((row[2] for row in rows), dtype=float, count=len(rows))
+    return ids, days, weights
+
+
+def get_weight_series(user):
+    """Return the user's current ``WeightSeries``, loading only what changed since it was cached."""
+    key = SERIES_KEY.format(user_id=user.pk)
+    # Read before the rows, so a write racing this read leaves the series stale, not wrong
+    stamp = get_version(WeightLog._meta.model_name, user.pk)
+    series = cache.get(key)
+    if series is not None and series.stamp == stamp:
+        return series
+
+    logs = WeightLog.objects.filter(user=user)
+    if series is not None:
+        new = _load(logs.filter(id__gt=series.last_id))
+        if series.readings + len(new[0]) != logs.count():
+            series = None
+    if series is None:
+        series, new = WeightSeries(), _load(logs)
+    series.add(*new)
+    series.stamp = stamp
+    cache.set(key, series, timeout=TREND_CACHE_TIMEOUT)
+    return series
+
+
+def invalidate_weight_series(user_id):
+    """Drop the cached series once the current transaction commits, e.g. after an edit."""
+    key = SERIES_KEY.format(user_id=user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _rounded(values):
+    return [None if np.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+def weight_trend(series, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA):
+    """Return the trend report for ``series``: per-day lists and overall slopes."""
+    days, means = series.days, series.means
+    rolling = series.rolling if window == DEFAULT_WINDOW else rolling_mean(days, means, window)
+    smoothed = series.ewma if alpha == DEFAULT_ALPHA else ewma(means, alpha)
+    # Change of the rolling mean since the last logged day at least a week earlier
+    week_ago = np.searchsorted(days, days - 7, side="right") - 1
+    weekly_delta = np.where(week_ago >= 0, rolling - rolling[np.maximum(week_ago, 0)], np.nan)
+    recent = days > days[-1] - RECENT_DAYS if len(days) else days.astype(bool)
+    return {
+        "days": [date.fromordinal(day).isoformat() for day in days.tolist()],
+        "weights": _rounded(means),
+        "rolling_mean": _rounded(rolling),
+        "ewma": _rounded(smoothed),
+        "weekly_delta": _rounded(weekly_delta),
+        "slope_per_week": slope_per_week(days, means),
+        "recent_slope_per_week": slope_per_week(days[recent], means[recent]),
+        "window": window,
+        "alpha": alpha,
+    }
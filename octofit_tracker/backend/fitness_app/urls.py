@@ -7,4 +7,6 @@ urlpatterns = [
     path('tasks/<int:id>/', views.task_detail, name='task_detail'),
     path('auth/token/', obtain_auth_token, name='api_token_auth'),
     path('analytics/', views.task_analytics, name='task_analytics'),
+    path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('leaderboards/<str:metric>/', views.LeaderboardView.as_view(), name='leaderboard'),
 ]
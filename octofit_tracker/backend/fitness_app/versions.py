@@ -0,0 +1,67 @@
+"""Per-resource version stamps.
+
+A stamp is a nanosecond timestamp kept in the cache for each resource (a model
+name), either globally or per user. Writes replace it with a fresh one, so
+readers can tell whether anything changed without touching the database:
+conditional GETs compare it with the client's ETag or If-Modified-Since, and
+cached snapshots include it in their key.
+
+Every worker process must see the same stamps, or one would answer 304 after
+another changed the data. They live in the ``VERSION_CACHE_ALIAS`` cache:
+Redis when it is configured, otherwise a database table, never a per-process
+cache.
+
+Signals in ``fitness_app.signals`` bump stamps on save and delete. Bulk
+operations (``QuerySet.update``, ``bulk_create``) send no signals and must call
+``bump_version`` themselves.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import transaction
+
+VERSION_KEY = "fitness_app:version:{resource}:{scope}"
+
+
+def _cache():
+    return caches[getattr(settings, "VERSION_CACHE_ALIAS", DEFAULT_CACHE_ALIAS)]
+
+
+def _key(resource, user_id=None):
+    return VERSION_KEY.format(resource=resource, scope="all" if user_id is None else f"user-{user_id}")
+
+
+def get_version(resource, user_id=None):
+    """Return the current stamp of ``resource``, creating one if the cache has none."""
+    cache = _cache()
+    key = _key(resource, user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        # add() keeps the stamp of a concurrent writer that got there first
+        cache.add(key, time.time_ns(), timeout=None)
+        stamp = cache.get(key)
+        if stamp is None:
+            # No usable cache: a fresh stamp per read is always safe
+            stamp = time.time_ns()
+    return stamp
+
+
+def get_versions(resources, user_id=None):
+    """Return the stamps of several resources, in order, with one cache round trip when all exist."""
+    keys = [_key(resource, user_id) for resource in resources]
+    found = _cache().get_many(keys)
+    return [found[key] if key in found else get_version(resource, user_id) for resource, key in zip(resources, keys)]
+
+
+def bump_version(resource, user_id=None):
+    """Give ``resource`` a new stamp once the current transaction commits."""
+    key = _key(resource, user_id)
+    transaction.on_commit(lambda: _cache().set(key, time.time_ns(), timeout=None))
+
+
+def bump_versions(resource, user_ids):
+    """Give ``resource`` a new stamp for each of ``user_ids`` once the current transaction commits."""
+    keys = [_key(resource, user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: _cache().set_many(dict.fromkeys(keys, time.time_ns()), timeout=None))
@@ -1,19 +1,37 @@
+from collections import Counter
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-import requests
-from .models import WeightLog, Achievement, UserProfile, BadgeTier, PurchasableBadge, DailyBadgeLimit, WeeklyBadgePurchase, Task
+from .models import WeightLog, Achievement, UserProfile, BadgeTier, PurchasableBadge, Task, TaskSummary
 from .serializers import WeightLogSerializer, AchievementSerializer, UserProfileSerializer, BadgeTierSerializer, PurchasableBadgeSerializer
+from .awards import LIMIT_REACHED, NOT_FOUND, OUT_OF_SEASON, award_badge
+from .catalog import get_badge_catalog, get_catalog_badge
+from .conditional import ConditionalGetMixin
+from .dashboard import get_dashboard
+from .ingest import MAX_ENTRIES, ingest_weight_logs
+from .leaderboards import METRICS as LEADERBOARD_METRICS, WINDOWS as LEADERBOARD_WINDOWS, LeaderboardUnavailable, get_leaderboards
+from .nutrition import NutritionLookupError, get_nutrition_service
+from .pagination import KeysetPagination
+from .purchases import purchase_badge
+from .response_cache import CachedResponseMixin
+from .trends import DEFAULT_ALPHA, DEFAULT_WINDOW, get_weight_series, weight_trend
+from .weather import WeatherLookupError, get_weather_service
 from django.http import JsonResponse
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.decorators import api_view
-from django.db.models import Count
+from rest_framework.decorators import action, api_view
 
-class WeightLogViewSet(viewsets.ModelViewSet):
+class WeightLogPagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+class AchievementPagination(KeysetPagination):
+    ordering = ('-date_achieved', '-id')
+
+class WeightLogViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = WeightLog.objects.all()
     serializer_class = WeightLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = WeightLogPagination
+    version_per_user = True
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
@@ -21,10 +39,43 @@ class WeightLogViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class AchievementViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        # Wearable syncs: {"entries": [{"weight": 81.2, "recorded_at": "2024-05-01T07:30:00Z"}, ...]}
+        entries = request.data.get('entries') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list):
+            return Response({"error": "Expected a list of entries."}, status=400)
+        if len(entries) > MAX_ENTRIES:
+            return Response({"error": f"At most {MAX_ENTRIES} entries per request."}, status=400)
+        results = ingest_weight_logs(request.user, entries)
+        counts = Counter(result['status'] for result in results)
+        return Response({
+            "created": counts['created'],
+            "duplicates": counts['duplicate'],
+            "invalid": counts['invalid'],
+            "results": results,
+        }, status=201 if counts['created'] else 200)
+
+    @action(detail=False, methods=['get'])
+    def trend(self, request):
+        return self.conditional_response(self.compute_trend, request)
+
+    def compute_trend(self, request):
+        try:
+            window = int(request.query_params.get('window', DEFAULT_WINDOW))
+            alpha = float(request.query_params.get('alpha', DEFAULT_ALPHA))
+        except ValueError:
+            return Response({"error": "window must be an integer and alpha a number"}, status=400)
+        if not 1 <= window <= 365 or not 0 < alpha <= 1:
+            return Response({"error": "window must be 1-365 days and alpha in (0, 1]"}, status=400)
+        return Response(weight_trend(get_weight_series(request.user), window=window, alpha=alpha))
+
+class AchievementViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Achievement.objects.all()
     serializer_class = AchievementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AchievementPagination
+    version_per_user = True
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
@@ -43,30 +94,42 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class BadgeTierViewSet(viewsets.ModelViewSet):
+class BadgeTierViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = BadgeTier.objects.all()
     serializer_class = BadgeTierSerializer
     permission_classes = [IsAuthenticated]
 
-class PurchasableBadgeViewSet(viewsets.ModelViewSet):
-    queryset = PurchasableBadge.objects.all()
+class PurchasableBadgeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = PurchasableBadge.objects.select_related('tier')
     serializer_class = PurchasableBadgeSerializer
     permission_classes = [IsAuthenticated]
+    # Badges are served with their nested tier
+    version_resources = ('purchasablebadge', 'badgetier')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.list_catalog, request)
+
+    def list_catalog(self, request):
+        # Served from the cached catalog snapshot (see catalog.py)
+        catalog = get_badge_catalog()
+        return Response([
+            dict(badge, icon=request.build_absolute_uri(badge['icon']) if badge['icon'] else None)
+            for badge in catalog
+        ])
 
 class NutritionCheckView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         food_item = request.query_params.get('food', '')
-        if not food_item:
+        if not food_item.strip():
             return Response({"error": "Food item is required"}, status=400)
 
-        # Example API call to Edamam (replace with your API key)
-        api_url = f"https://api.edamam.com/api/nutrition-data?app_id=YOUR_APP_ID&app_key=YOUR_APP_KEY&ingr={food_item}"
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            return Response(response.json())
-        return Response({"error": "Failed to fetch nutrition data"}, status=response.status_code)
+        # Cached and coalesced per normalized food (see nutrition.py)
+        try:
+            return Response(get_nutrition_service().lookup(food_item))
+        except NutritionLookupError as e:
+            return Response({"error": "Failed to fetch nutrition data"}, status=e.status_code)
 
 class WeatherInfoView(APIView):
     permission_classes = [IsAuthenticated]
@@ -74,12 +137,11 @@ class WeatherInfoView(APIView):
     def get(self, request):
         location = request.query_params.get('location', 'New York')
 
-        # Example API call to OpenWeatherMap (replace with your API key)
-        api_url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid=YOUR_API_KEY"
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            return Response(response.json())
-        return Response({"error": "Failed to fetch weather data"}, status=response.status_code)
+        # Served from cache, stale while it refreshes (see weather.py)
+        try:
+            return Response(get_weather_service().get(location))
+        except WeatherLookupError as e:
+            return Response({"error": "Failed to fetch weather data"}, status=e.status_code)
 
 class AwardBadgeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -89,22 +151,13 @@ class AwardBadgeView(APIView):
         if not badge_id:
             return Response({"error": "Badge ID is required"}, status=400)
 
-        try:
-            badge = PurchasableBadge.objects.get(id=badge_id)
-        except PurchasableBadge.DoesNotExist:
+        outcome = award_badge(request.user, badge_id)
+        if outcome == NOT_FOUND:
             return Response({"error": "Badge not found"}, status=404)
-
-        # Check if the badge is in the current season
-        if not badge.is_current_season():
+        if outcome == OUT_OF_SEASON:
             return Response({"error": "Badge is not available in the current season"}, status=400)
-
-        # Check daily badge limit
-        daily_limit, created = DailyBadgeLimit.objects.get_or_create(user=request.user, date=now().date())
-        if not daily_limit.can_award_badge():
+        if outcome == LIMIT_REACHED:
             return Response({"error": "Daily badge limit reached"}, status=400)
-
-        # Award the badge
-        daily_limit.increment_badge_count()
         return Response({"message": "Badge awarded successfully!"})
 
 class PurchaseBadgeView(APIView):
@@ -115,21 +168,52 @@ class PurchaseBadgeView(APIView):
         if not badge_id:
             return Response({"error": "Badge ID is required. Did you forget your glasses?"}, status=400)
 
-        try:
-            badge = PurchasableBadge.objects.get(id=badge_id)
-        except PurchasableBadge.DoesNotExist:
+        badge = get_catalog_badge(badge_id)
+        if badge is None:
             return Response({"error": "Badge not found. Maybe it went on vacation?"}, status=404)
 
-        # Check weekly badge purchase limit
-        if not WeeklyBadgePurchase.can_purchase_badge(request.user):
+        # Checks the weekly limit and records the purchase (see purchases.py)
+        if not purchase_badge(request.user, badge['id']):
             return Response({"error": "Weekly badge purchase limit reached. Save some badges for next week!"}, status=400)
+        return Response({"message": f"Badge '{badge['name']}' purchased successfully! Enjoy your shiny new badge!"})
 
-        # Record the badge purchase
-        WeeklyBadgePurchase.objects.create(user=request.user, badge=badge)
-        return Response({"message": f"Badge '{badge.name}' purchased successfully! Enjoy your shiny new badge!"})
+class LeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
 
-class TaskPagination(PageNumberPagination):
+    def get(self, request, metric):
+        if metric not in LEADERBOARD_METRICS:
+            return Response({"error": f"Unknown leaderboard. Try one of: {', '.join(LEADERBOARD_METRICS)}"}, status=404)
+        window = request.query_params.get('window', 'weekly')
+        if window not in LEADERBOARD_WINDOWS:
+            return Response({"error": f"window must be one of: {', '.join(LEADERBOARD_WINDOWS)}"}, status=400)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+            radius = int(request.query_params.get('radius', 5))
+        except ValueError:
+            return Response({"error": "limit and radius must be integers"}, status=400)
+        if not 1 <= limit <= 100 or not 0 <= radius <= 25:
+            return Response({"error": "limit must be 1-100 and radius 0-25"}, status=400)
+
+        # Sorted sets in Redis, updated as rows are written (see leaderboards.py)
+        try:
+            return Response(get_leaderboards().standings(metric, window, request.user.pk, limit, radius))
+        except LeaderboardUnavailable:
+            return Response({"error": "Leaderboards are taking a breather. Try again soon!"}, status=503)
+
+class DashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # Served from the user's cached snapshot (see dashboard.py)
+        dashboard = get_dashboard(request.user)
+        absolute = lambda url: request.build_absolute_uri(url) if url else None
+        profile = dashboard['profile'] and dict(dashboard['profile'], avatar=absolute(dashboard['profile']['avatar']))
+        purchased = [dict(badge, icon=absolute(badge['icon'])) for badge in dashboard['badges']['purchased']]
+        return Response(dict(dashboard, profile=profile, badges=dict(dashboard['badges'], purchased=purchased)))
+
+class TaskPagination(KeysetPagination):
     page_size = 10
+    ordering = ('id',)
 
 @api_view(['GET'])
 def task_list(request):
@@ -145,8 +229,6 @@ def task_detail(request, id):
 
 @api_view(['GET'])
 def task_analytics(request):
-    analytics = Task.objects.aggregate(
-        completed=Count('id', filter=models.Q(completed=True)),
-        pending=Count('id', filter=models.Q(completed=False)),
-    )
-    return Response(analytics)
\ No newline at end of file
+    # Maintained incrementally on every task write (see TaskSummary)
+    summary = TaskSummary.current()
+    return Response({"completed": summary.completed, "pending": summary.pending})
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""Weather lookups against OpenWeatherMap with stale-while-revalidate caching.
+
+``WeatherInfoView`` used to hold a WSGI worker for a full, unbounded upstream
+round trip on every call, mostly for the same few locations. ``WeatherService``
+keeps each normalized location in the shared Django cache with the time it was
+fetched:
+
+* fresh entries (younger than ``fresh_for``) are served as they are;
+* stale entries (up to ``stale_for`` older) are served immediately while a
+  refresh runs in the background;
+* only a location with no entry at all waits on the upstream.
+
+Upstream requests go through one pooled ``httpx.AsyncClient`` on an event loop
+in a daemon thread, with strict connect and read timeouts, and concurrent
+refreshes of one location share a request. ``start_refresher`` keeps the
+school's configured locations (``WEATHER_REFRESH_LOCATIONS``) fresh, so requests
+for them almost never wait.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import re
+import time
+from threading import Lock, Thread
+
+from django.conf import settings
+from django.core.cache import cache
+
+from overachievers.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+WEATHER_TIMEOUT = getattr(settings, "WEATHER_TIMEOUT", 3.0)
+WEATHER_CONNECT_TIMEOUT = getattr(settings, "WEATHER_CONNECT_TIMEOUT", 1.0)
+WEATHER_FRESH_SECONDS = getattr(settings, "WEATHER_FRESH_SECONDS", 10 * 60)
+WEATHER_STALE_SECONDS = getattr(settings, "WEATHER_STALE_SECONDS", 60 * 60)
+WEATHER_POOL_SIZE = getattr(settings, "WEATHER_POOL_SIZE", 20)
+CACHE_KEY = "fitness_app:weather:{digest}"
+
+weather_lookups_total = REGISTRY.counter(
+    "weather_lookups_total",
+    "Weather lookups by how they were answered: fresh_hit, stale_hit, miss or error.",
+    labelnames=("result",),
+)
+weather_upstream_duration = REGISTRY.histogram(
+    "weather_upstream_duration_seconds", "Latency of weather API requests."
+)
+
+
+class WeatherLookupError(Exception):
+    """The upstream lookup failed; ``status_code`` is the status to answer with."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def normalize_location(location):
+    """Fold case and whitespace, so "New York, US" and "new york,us" share a cache entry."""
+    return re.sub(r"\s*,\s*", ",", " ".join(location.lower().split()))
+
+
+def cache_key(location):
+    return CACHE_KEY.format(digest=hashlib.blake2b(location.encode(), digest_size=16).hexdigest())
+
+
+class WeatherService:
+    def __init__(self, api_url, api_key, shared_cache=cache, fresh_for=WEATHER_FRESH_SECONDS,
+                 stale_for=WEATHER_STALE_SECONDS, timeout=WEATHER_TIMEOUT,
+                 connect_timeout=WEATHER_CONNECT_TIMEOUT, pool_size=WEATHER_POOL_SIZE, clock=time.time):
+        # Imported here so importing the module does not pull in httpx
+        import httpx
+
+        self._httpx = httpx
+        self.api_url = api_url
+        self.api_key = api_key
+        self.shared_cache = shared_cache
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self._clock = clock
+        self._loop = None
+        self._client = None
+        self._thread = None
+        self._refresher = None
+        self._inflight = {}
+        self._lock = Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = Thread(target=self._loop.run_forever, name="weather", daemon=True)
+                self._thread.start()
+                self._client = asyncio.run_coroutine_threadsafe(self._make_client(), self._loop).result()
+        return self._loop
+
+    async def _make_client(self):
+        httpx = self._httpx
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+
+    def get(self, location):
+        """Return the weather for ``location``, raising ``WeatherLookupError`` if it has to be fetched and fails."""
+        location = normalize_location(location)
+        entry = self.shared_cache.get(cache_key(location))
+        if entry is not None:
+            if self._clock() - entry["fetched_at"] < self.fresh_for:
+                weather_lookups_total.inc(result="fresh_hit")
+            else:
+                weather_lookups_total.inc(result="stale_hit")
+                self.refresh(location)
+            return entry["data"]
+        weather_lookups_total.inc(result="miss")
+        try:
+            # The upstream timeouts bound the wait; the margin covers scheduling
+            return self.refresh(location).result(timeout=self.connect_timeout + self.timeout + 1)
+        except concurrent.futures.TimeoutError:
+            raise WeatherLookupError(504, "Weather API timed out")
+
+    def refresh(self, location):
+        """Fetch and cache ``location`` in the background; returns a future of its data.
+
+        A refresh already running for the location is shared rather than repeated.
+        """
+        loop = self._ensure_loop()
+        with self._lock:
+            future = self._inflight.get(location)
+            if future is None:
+                future = asyncio.run_coroutine_threadsafe(self._fetch(location), loop)
+                self._inflight[location] = future
+                future.add_done_callback(lambda done: self._finished(location, done))
+        return future
+
+    def _finished(self, location, future):
+        with self._lock:
+            self._inflight.pop(location, None)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Weather refresh for %r failed: %s", location, future.exception())
+
+    async def _fetch(self, location):
+        started = time.perf_counter()
+        try:
+            response = await self._client.get(self.api_url, params={"q": location, "appid": self.api_key})
+        except self._httpx.TimeoutException as e:
+            weather_lookups_total.inc(result="error")
+            raise WeatherLookupError(504, f"Weather API timed out: {e!r}")
+        except self._httpx.HTTPError as e:
+            weather_lookups_total.inc(result="error")
+            raise WeatherLookupError(502, f"Weather API unreachable: {e!r}")
+        finally:
+            weather_upstream_duration.observe(time.perf_counter() - started)
+        if response.status_code != 200:
+            weather_lookups_total.inc(result="error")
+            raise WeatherLookupError(response.status_code, f"Weather API returned {response.status_code}")
+        try:
+            data = response.json()
+        except ValueError as e:
+            # e.g. a proxy's HTML error page
+            weather_lookups_total.inc(result="error")
+            raise WeatherLookupError(502, f"Weather API returned invalid JSON: {e}")
+        entry = {"data": data, "fetched_at": self._clock()}
+        await self.shared_cache.aset(cache_key(location), entry, timeout=self.fresh_for + self.stale_for)
+        return data
+
+    def start_refresher(self, locations, interval=None):
+        """Keep ``locations`` fresh by re-fetching them every ``interval`` seconds (default: half of ``fresh_for``)."""
+        locations = [normalize_location(location) for location in locations if location.strip()]
+        if not locations or self._refresher is not None:
+            return
+        interval = interval or self.fresh_for / 2
+        self._refresher = asyncio.run_coroutine_threadsafe(self._refresh_forever(locations, interval), self._ensure_loop())
+
+    async def _refresh_forever(self, locations, interval):
+        while True:
+            try:
+                due = []
+                for location in locations:
+                    entry = await self.shared_cache.aget(cache_key(location))
+                    # One worker per interval refreshes a location; the others see it fresh
+                    if (entry is None or self._clock() - entry["fetched_at"] >= self.fresh_for - interval) and \
+                            await self.shared_cache.aadd(f"{cache_key(location)}:refreshing", 1, timeout=interval):
+                        due.append(asyncio.wrap_future(self.refresh(location)))
+                # Failures are logged by _finished; the entries stay stale until the next pass
+                await asyncio.gather(*due, return_exceptions=True)
+            except Exception:
+                # E.g. the shared cache is unreachable; the next pass tries again
+                logger.exception("Weather refresh pass failed")
+            await asyncio.sleep(interval)
+
+    def close(self):
+        """Stop the refresher and the event loop, closing pooled connections."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+
+_service = None
+_service_lock = Lock()
+
+
+def get_weather_service():
+    """Return the process-wide WeatherService, refreshing the WEATHER_REFRESH_LOCATIONS in the background."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                service = WeatherService(
+                    getattr(settings, "WEATHER_API_URL", "https://api.openweathermap.org/data/2.5/weather"),
+                    getattr(settings, "WEATHER_API_KEY", ""),
+                )
+                service.start_refresher(getattr(settings, "WEATHER_REFRESH_LOCATIONS", []))
+                _service = service
+    return _service
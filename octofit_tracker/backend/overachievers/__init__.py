@@ -1,48 +1,52 @@
+"""OctoFit Tracker - Overachievers package.
+
+Importing this package has no side effects: it does not load ``.env`` files,
+configure logging, connect to Redis, build the Celery app or start any server.
+Heavy dependencies are imported on first use, and ``celery_app`` and the Celery
+tasks are loaded lazily from ``tasks.py`` when first accessed.
+
+To run the health check and metrics servers, build the application explicitly:
+
+    app = create_app()
+    app.run()
+
+or use the command line entry point:
+
+    python -m octofit_tracker.backend.overachievers --server-mode asyncio
+"""
+import importlib
 import os
 import shutil
-import ssl
 import logging
-import logging.config
 import time
 import signal
+import sys
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from threading import Thread, Lock
+from http.server import BaseHTTPRequestHandler
+from threading import Event, Thread
 from datetime import datetime
-from collections import defaultdict
-from time import time
-from dotenv import load_dotenv
-from redis import Redis
-from celery import Celery
-import smtplib
-from email.mime.text import MIMEText
-from settings import CERT_FILE, KEY_FILE
-
-# Load environment variables from .env file
-load_dotenv()
+from .rate_limit import RateLimiter, RedisRateLimiter
+from .redis_client import get_redis_client
+from .probes import DependencyProber, HEALTH_PROBE_INTERVAL, check_database_connections
+from .metrics import REGISTRY
+from .access_log import log_access, start_queue_logging
+from .responses import PreparedResponse, ResponseCache, etag_matches
 
 # Configure Redis for Celery (Heroku-compatible)
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 # Configure database URL (if applicable)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")  # Default to SQLite for local development
-print(f"DATABASE_URL: {DATABASE_URL}")
+
+# HTTPS certificate and key (may be overridden by the CONFIG_PATH file)
+CERT_FILE = os.getenv("CERT_FILE", "path/to/default/certificate.crt")
+KEY_FILE = os.getenv("KEY_FILE", "path/to/default/private.key")
 
 # Configure structured logging dynamically based on environment
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
 
-if LOG_FORMAT == "json":
-    import json_log_formatter
-    formatter = json_log_formatter.JSONFormatter()
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter)
-    logger = logging.getLogger(__name__)
-    logger.addHandler(handler)
-    logger.setLevel(LOG_LEVEL)
-else:
-    logging.basicConfig(level=LOG_LEVEL)
-    logger = logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
 
 # Updated logging configuration for Heroku
 LOGGING = {
@@ -68,67 +72,82 @@ LOGGING = {
     },
 }
 
-# Apply the logging configuration
-logging.config.dictConfig(LOGGING)
+# Listeners writing queued log records (see access_log.py); stopped at shutdown
+_log_listeners = []
+
+def configure_logging():
+    """Apply the logging configuration. Safe to call more than once.
+
+    Handlers are moved behind a bounded queue, so logging never blocks a request.
+    """
+    if _log_listeners:
+        return
+    import logging.config
+    # Read again so values loaded from .env by create_app() apply
+    log_level = os.getenv("LOG_LEVEL", LOG_LEVEL).upper()
+    log_format = os.getenv("LOG_FORMAT", LOG_FORMAT).lower()
+    if log_format == "json":
+        import json_log_formatter
+        handler = logging.StreamHandler()
+        handler.setFormatter(json_log_formatter.JSONFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(log_level)
+    handlers = {"console": {**LOGGING["handlers"]["console"], "formatter": "json" if log_format == "json" else "default"}}
+    logging.config.dictConfig({**LOGGING, "handlers": handlers, "root": {**LOGGING["root"], "level": log_level}})
+    _log_listeners.append(start_queue_logging())
+    if logger.handlers:
+        _log_listeners.append(start_queue_logging(logger))
+
+# Attributes loaded on first access (PEP 562), so importing the package stays cheap.
+# name -> (submodule, attribute)
+_LAZY_ATTRIBUTES = {
+    "celery_app": (".tasks", "celery_app"),
+    # `celery -A octofit_tracker.backend.overachievers` looks for an attribute named `celery`
+    "celery": (".tasks", "celery_app"),
+    "send_email_task": (".tasks", "send_email_task"),
+    "send_bulk_email_task": (".tasks", "send_bulk_email_task"),
+}
 
-# Metrics collection with thread safety
-metrics = {"health_checks": 0, "https_failures": 0}
-metrics_lock = Lock()
+def __getattr__(name):
+    try:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    return getattr(importlib.import_module(module_name, __name__), attribute)
 
 # Uptime tracking
 start_time = datetime.now()
 
-# Rate limiting configuration
-RATE_LIMIT = int(os.getenv("RATE_LIMIT", 5))  # Max requests per second
-rate_limit_data = defaultdict(lambda: {"last_request": 0, "request_count": 0})
-
-# Celery configuration
-celery_app = Celery("octofit_tracker", broker=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
-celery_app.conf.update(
-    result_backend=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+# Metrics collection (see metrics.py); exported by /metrics in Prometheus format
+health_checks_total = REGISTRY.counter("health_checks_total", "Number of health checks performed.")
+https_failures_total = REGISTRY.counter("https_failures_total", "Number of failed attempts to configure HTTPS.")
+REGISTRY.gauge("uptime_seconds", "Seconds since the package was initialized.").set_function(
+    lambda: (datetime.now() - start_time).total_seconds()
 )
 
-@celery_app.task
-def send_email_task(recipient_email, subject, message):
-    """Send an email asynchronously."""
-    try:
-        email_host = os.getenv("EMAIL_HOST")
-        email_port = int(os.getenv("EMAIL_PORT", 587))
-        email_user = os.getenv("EMAIL_HOST_USER")
-        email_password = os.getenv("EMAIL_HOST_PASSWORD")
-
-        msg = MIMEText(message)
-        msg["Subject"] = subject
-        msg["From"] = email_user
-        msg["To"] = recipient_email
-
-        with smtplib.SMTP(email_host, email_port) as server:
-            server.starttls()
-            server.login(email_user, email_password)
-            server.sendmail(email_user, [recipient_email], msg.as_string())
-
-        logger.info(f"Email sent to {recipient_email}")
-        return f"Email sent to {recipient_email}"
-    except Exception as e:
-        logger.error(f"Failed to send email to {recipient_email}: {e}")
-        raise
+def metrics_summary():
+    """Return the health counters as a plain dict for JSON responses."""
+    return {
+        "health_checks": health_checks_total.value(),
+        "https_failures": https_failures_total.value(),
+    }
+
+# Rate limiting configuration
+def build_rate_limiter():
+    """Build the health server rate limiter from the environment."""
+    rate_limit = int(os.getenv("RATE_LIMIT", 5))  # Max requests per second
+    mode = os.getenv("RATE_LIMIT_MODE", "token_bucket").lower()  # token_bucket or sliding_log
+    max_clients = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 100_000))  # Hard cap on tracked clients
+    limiter = RateLimiter(rate_limit, period=1, mode=mode, max_clients=max_clients)
+    if os.getenv("RATE_LIMIT_BACKEND", "local").lower() == "redis":  # Shared by all workers
+        limiter = RedisRateLimiter(rate_limit, period=1, prefix="ratelimit:health", fallback=limiter)
+    return limiter
+
+rate_limiter = build_rate_limiter()
 
 def is_rate_limited(client_ip):
     """Check if a client IP is rate-limited."""
-    current_time = time()
-    client_data = rate_limit_data[client_ip]
-    if current_time - client_data["last_request"] > 1:
-        client_data["last_request"] = current_time
-        client_data["request_count"] = 1
-        return False
-    else:
-        client_data["request_count"] += 1
-        if client_data["request_count"] > RATE_LIMIT:
-            return True
-        return False
+    return rate_limiter.is_limited(client_ip)
 
 def ensure_correct_folder(expected_folder):
     """Ensure the script is running from the correct folder."""
@@ -161,6 +180,7 @@ def initialize_package():
 
 def configure_https(cert_file, key_file, retries=3, delay=2):
     """Configure HTTPS using the provided certificate and key files with retries."""
+    import ssl
     for attempt in range(retries):
         try:
             if not os.path.exists(cert_file) or not os.path.exists(key_file):
@@ -170,8 +190,7 @@ def configure_https(cert_file, key_file, retries=3, delay=2):
             logger.info("HTTPS configured successfully.")
             return ssl_context
         except Exception as e:
-            with metrics_lock:
-                metrics["https_failures"] += 1
+            https_failures_total.inc()
             logger.warning(f"Attempt {attempt + 1} to configure HTTPS failed: {e}")
             if attempt < retries - 1:
                 time.sleep(delay)
@@ -192,7 +211,8 @@ def validate_environment_variables(required_vars):
 def graceful_shutdown(signum=None, frame=None):
     """Perform cleanup tasks during application shutdown."""
     logger.info("Performing graceful shutdown...")
-    for server in servers:
+    dependency_prober.stop()
+    for server in running_servers:
         logger.info(f"Shutting down server: {server.server_address}")
         server.server_close()
     for thread in threads:
@@ -200,46 +220,68 @@ def graceful_shutdown(signum=None, frame=None):
             logger.info(f"Stopping thread: {thread.name}")
             thread.join(timeout=5)
     logger.info("All threads and servers stopped. Shutdown complete.")
+    # Flush queued log records
+    for listener in _log_listeners:
+        listener.stop()
     exit(0)
 
+def configure_django():
+    """Point Django at the project settings so the database probe has a database to check.
+
+    ``DJANGO_SETTINGS_MODULE`` defaults to ``overachievers.settings``, imported
+    from the backend directory as ``manage.py`` does. A failure is logged and
+    the database is then reported as ``not_configured``.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "overachievers.settings")
+    try:
+        import django
+        django.setup()
+    except Exception as e:
+        logger.warning(f"Failed to configure Django: {e}. The database will be reported as not configured.")
+
 def check_database_connection():
-    """Check database connectivity."""
-    # Simulate a database connection check (replace with actual logic)
+    """Check database connectivity with a timeout-bounded SELECT 1 on every configured alias."""
     try:
-        # Example: Replace with actual database connection logic
-        connected = True  # Simulated database connection status
-        if connected:
-            return {"status": "connected"}
-        else:
-            return {"status": "disconnected"}
+        return check_database_connections()
     except Exception as e:
         logger.error(f"Database connection check failed: {e}")
         return {"status": "error", "error": str(e)}
 
 def check_redis_connection():
-    """Check Redis connectivity."""
+    """Check Redis connectivity over the shared connection pool."""
     try:
-        redis_client = Redis.from_url(REDIS_URL)
-        redis_client.ping()
+        get_redis_client().ping()
         return {"status": "connected"}
     except Exception as e:
         logger.error(f"Redis connection check failed: {e}")
         return {"status": "error", "error": str(e)}
 
-# Update the health check logic
+# Dependency checks are refreshed in the background; /health serves the latest snapshot.
+# The lambdas look the checks up at call time so they can be replaced (e.g. in tests).
+dependency_prober = DependencyProber(
+    {
+        "database": lambda: check_database_connection(),
+        "redis": lambda: check_redis_connection(),
+    },
+    interval=HEALTH_PROBE_INTERVAL,
+)
+
 def health_check():
     """Perform a detailed health check."""
-    with metrics_lock:
-        metrics["health_checks"] += 1
+    health_checks_total.inc()
 
-    db_status = check_database_connection()
-    redis_status = check_redis_connection()
+    dependencies = dependency_prober.snapshot()
+    db_status = dependencies["database"]
+    redis_status = dependencies["redis"]
 
     logger.info("Health check passed. Application is running correctly.")
     return {
         "database": db_status,
         "redis": redis_status,
-        "metrics": metrics,
+        "metrics": metrics_summary(),
         "uptime_seconds": (datetime.now() - start_time).total_seconds(),
     }
 
@@ -295,21 +337,97 @@ def load_environment_config():
 
 class RateLimitedHandler(BaseHTTPRequestHandler):
     """Base HTTP handler with rate limiting and request logging."""
+    # HTTP/1.1 keeps connections open between requests; every response must
+    # therefore carry a Content-Length (see send_body).
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle's algorithm on, a
+    # reused connection holds the body back until the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    # Idle keep-alive connections are dropped after this many seconds (see servers.py)
+    timeout = float(os.getenv("KEEPALIVE_TIMEOUT", 5))
+
+    def handle(self):
+        """Serve requests until the connection closes, letting the server reclaim it while idle."""
+        self.handle_one_request()
+        wait_for_request = getattr(self.server, "wait_for_request", None)
+        while not self.close_connection:
+            if wait_for_request is not None and not wait_for_request(self.connection, self.rfile, self.timeout):
+                break
+            self.handle_one_request()
+
     def log_request(self, code="-", size="-"):
-        """Log the HTTP request."""
-        logger.info(f"Request from {self.client_address[0]}: {self.command} {self.path} {code}")
+        """Log the HTTP request; called by send_response. Successful requests are sampled."""
+        log_access(self.client_address[0], self.command, self.path, code)
+
+    def log_error(self, format, *args):
+        logger.warning(format, *args)
+
+    def send_body(self, code, body=b"", content_type="application/json"):
+        """Send a complete response with a Content-Length so the connection can be reused."""
+        self.send_response(code)
+        if body:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def send_prepared(self, response, code=200):
+        """Send a prepared response, or 304 Not Modified if the client's ETag still matches."""
+        if code == 200 and etag_matches(self.headers.get("If-None-Match"), response.etag):
+            self.send_response(304)
+            self.send_header("ETag", response.etag)
+            self.end_headers()
+            return
+        self.send_response(code)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", response.content_length)
+        self.send_header("ETag", response.etag)
+        self.end_headers()
+        self.wfile.write(response.body)
 
     def handle_rate_limit(self):
         client_ip = self.client_address[0]
         if is_rate_limited(client_ip):
-            self.log_request(429)
-            self.send_response(429)  # Too Many Requests
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Too many requests"}).encode())
+            self.send_body(429, json.dumps({"error": "Too many requests"}).encode())  # Too Many Requests
             return True
         return False
 
+def render_metrics():
+    """Render the collected metrics in Prometheus text format."""
+    return REGISTRY.render()
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+WELCOME_DOCUMENT = {
+    "message": "Welcome to the OctoFit Tracker - Overachievers API!",
+    "health_endpoint": "/health",
+    "metrics_endpoint": "/metrics"
+}
+
+# Encoded bodies reused until their version changes
+response_cache = ResponseCache()
+
+def welcome_response():
+    """The constant root document, encoded once."""
+    return response_cache.get("welcome", 0, lambda: json.dumps(WELCOME_DOCUMENT).encode())
+
+def metrics_response():
+    """The metrics page; stored metrics are re-encoded only when REGISTRY.version() changes.
+
+    Its ETag is a weak one for the stored metrics alone, so a scraper revalidating
+    with If-None-Match gets 304 until a stored metric changes, however much
+    uptime has passed.
+    """
+    stored = response_cache.get(
+        "metrics", REGISTRY.version(), lambda: REGISTRY.render(volatile=False).encode(), METRICS_CONTENT_TYPE
+    )
+    computed = REGISTRY.render(volatile=True)
+    if not computed:
+        return stored
+    # Gauges computed at render time (uptime) are appended fresh on every scrape
+    return PreparedResponse(stored.body + computed.encode(), METRICS_CONTENT_TYPE, etag=f"W/{stored.etag}")
+
 class HealthCheckHandler(RateLimitedHandler):
     """HTTP handler for health check, root, and status endpoints."""
     def do_GET(self):
@@ -317,78 +435,50 @@ class HealthCheckHandler(RateLimitedHandler):
             return
         if self.path == "/":
             # Serve a default response for the root URL
-            response = {
-                "message": "Welcome to the OctoFit Tracker - Overachievers API!",
-                "health_endpoint": "/health",
-                "metrics_endpoint": "/metrics"
-            }
-            self.log_request(200)
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_prepared(welcome_response())
         elif self.path == "/health":
             # Existing health check logic
             uptime = (datetime.now() - start_time).total_seconds()
-            db_status = check_database_connection()
-            redis_status = check_redis_connection()
+            dependencies = dependency_prober.snapshot()
+            db_status = dependencies["database"]
+            redis_status = dependencies["redis"]
+            # A server without a Django database has nothing to check there
+            healthy = db_status["status"] in ("connected", "not_configured") and redis_status["status"] == "connected"
             response = {
-                "status": "healthy" if db_status["status"] == "connected" and redis_status["status"] == "connected" else "unhealthy",
+                "status": "healthy" if healthy else "unhealthy",
                 "uptime_seconds": uptime,
-                "metrics": metrics,
+                "metrics": metrics_summary(),
                 "database": db_status,
                 "redis": redis_status,
             }
-            self.log_request(200 if db_status["status"] == "connected" and redis_status["status"] == "connected" else 500)
-            self.send_response(200 if db_status["status"] == "connected" and redis_status["status"] == "connected" else 500)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_body(200 if healthy else 500, json.dumps(response).encode())
         elif self.path == "/metrics":
-            with metrics_lock:
-                metrics_data = [
-                    f"health_checks_total {metrics['health_checks']}",
-                    f"https_failures_total {metrics['https_failures']}",
-                    f"uptime_seconds {(datetime.now() - start_time).total_seconds()}",
-                ]
-            response = "\n".join(metrics_data)
-            self.log_request(200)
-            self.send_response(200)
-            self.send_header("Content-Type", "text/plain; version=0.0.4")
-            self.end_headers()
-            self.wfile.write(response.encode())
+            self.send_prepared(metrics_response())
         else:
-            self.log_request(404)
-            self.send_response(404)
-            self.end_headers()
+            self.send_body(404)
 
 class MetricsHandler(RateLimitedHandler):
     """HTTP handler for Prometheus-compatible metrics endpoint."""
     def do_GET(self):
         if self.handle_rate_limit():
             return
-        with metrics_lock:
-            metrics_data = [
-                f"health_checks_total {metrics['health_checks']}",
-                f"https_failures_total {metrics['https_failures']}",
-                f"uptime_seconds {(datetime.now() - start_time).total_seconds()}",
-            ]
-        response = "\n".join(metrics_data)
-        self.log_request(200)
-        self.send_response(200)
-        self.send_header("Content-Type", "text/plain; version=0.0.4")
-        self.end_headers()
-        self.wfile.write(response.encode())
+        self.send_prepared(metrics_response())
 
 # Global variables to manage threads and servers
 threads = []
-servers = []
+# Not named `servers`: importing the servers submodule would rebind that attribute
+running_servers = []
+
+def start_health_check_server(port=None, mode=None, max_workers=None):
+    """Start an HTTP server for health checks.
 
-def start_health_check_server(port=None):
-    """Start a simple HTTP server for health checks."""
+    ``mode`` selects the server implementation (``single``, ``threaded`` or
+    ``asyncio``) and defaults to the ``SERVER_MODE`` environment variable.
+    """
+    from .servers import make_server
     port = port or int(os.getenv("HEALTH_CHECK_PORT", 8080))
-    server = HTTPServer(("0.0.0.0", port), HealthCheckHandler)
-    servers.append(server)
+    server = make_server(("0.0.0.0", port), HealthCheckHandler, mode=mode, max_workers=max_workers)
+    running_servers.append(server)
     logger.info(f"Health check server running on port {port}")
     try:
         server.serve_forever()
@@ -396,11 +486,12 @@ def start_health_check_server(port=None):
         logger.info("Health check server shutting down...")
         server.server_close()
 
-def start_metrics_server(port=None):
-    """Start a simple HTTP server for Prometheus-compatible metrics."""
+def start_metrics_server(port=None, mode=None, max_workers=None):
+    """Start an HTTP server for Prometheus-compatible metrics."""
+    from .servers import make_server
     port = port or int(os.getenv("METRICS_PORT", 9090))
-    server = HTTPServer(("0.0.0.0", port), MetricsHandler)
-    servers.append(server)
+    server = make_server(("0.0.0.0", port), MetricsHandler, mode=mode, max_workers=max_workers)
+    running_servers.append(server)
     logger.info(f"Metrics server running on port {port}")
     try:
         server.serve_forever()
@@ -414,35 +505,88 @@ def log_startup():
     logger.info(f"Environment: {os.getenv('ENVIRONMENT', 'development')}")
     logger.info(f"Health Check Port: {os.getenv('HEALTH_CHECK_PORT', 8080)}")
     logger.info(f"Metrics Port: {os.getenv('METRICS_PORT', 9090)}")
+    logger.info(f"Server Mode: {os.getenv('SERVER_MODE', 'threaded')}")
+
+# Variables required by validate_environment_variables at startup
+REQUIRED_ENV_VARS = [
+    "SECRET_KEY",
+    "DATABASE_URL",
+    "REDIS_URL",
+    "LOG_LEVEL",
+    "LOG_FORMAT",
+    "HEALTH_CHECK_PORT",
+    "METRICS_PORT",
+    "CERT_FILE",
+    "KEY_FILE",
+]
+
+class Application:
+    """The overachievers runtime: dependency prober plus health check and metrics servers."""
+    def __init__(self, health_check_port, metrics_port, server_mode=None, ssl_context=None):
+        self.health_check_port = health_check_port
+        self.metrics_port = metrics_port
+        self.server_mode = server_mode
+        self.ssl_context = ssl_context
+        self._stopped = Event()
+
+    def start(self):
+        """Start the dependency prober and both servers in background threads."""
+        # Start refreshing dependency health before the servers start answering probes
+        dependency_prober.start()
+
+        # Start health check server in a separate thread with dynamic port
+        health_check_thread = Thread(target=start_health_check_server, args=(self.health_check_port, self.server_mode), daemon=True, name="HealthCheckThread")
+        health_check_thread.start()
+        threads.append(health_check_thread)
+
+        # Start metrics server in a separate thread with dynamic port
+        metrics_thread = Thread(target=start_metrics_server, args=(self.metrics_port, self.server_mode), daemon=True, name="MetricsThread")
+        metrics_thread.start()
+        threads.append(metrics_thread)
+
+    def run(self):
+        """Start the application and block until SIGTERM or SIGINT."""
+        # Register signal handlers for graceful shutdown
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        self.start()
+
+        # Perform a health check
+        health_check()
+
+        # Keep the main thread alive to allow signal handling
+        self._stopped.wait()
+        graceful_shutdown()
+
+    def _handle_signal(self, signum=None, frame=None):
+        self._stopped.set()
+
+def create_app(health_check_port=None, metrics_port=None, server_mode=None):
+    """Build the application: load ``.env``, configure logging, HTTPS and Django, validate settings.
+
+    Nothing is started; call ``start()`` or ``run()`` on the returned application.
+    Ports default to the values for the current ``ENVIRONMENT``.
+    """
+    global rate_limiter, CERT_FILE, KEY_FILE
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+    configure_logging()
+    # Pick up rate limit settings that came from .env
+    rate_limiter = build_rate_limiter()
 
-# === Main Initialization Logic ===
-try:
     log_startup()
     # Load environment-specific configuration
     env_config = load_environment_config()
     os.environ["LOG_LEVEL"] = env_config.get("log_level", "INFO")
-    health_check_port = env_config.get("health_check_port", 8080)
-    metrics_port = env_config.get("metrics_port", 9090)
-
-    # Register signal handlers for graceful shutdown
-    signal.signal(signal.SIGTERM, graceful_shutdown)
-    signal.signal(signal.SIGINT, graceful_shutdown)
+    health_check_port = health_check_port or env_config.get("health_check_port", 8080)
+    metrics_port = metrics_port or env_config.get("metrics_port", 9090)
 
     ensure_correct_folder("overachievers")
     ensure_correct_module_name("overachievers")
-    clear_pycache()
     initialize_package()
 
-    # Start health check server in a separate thread with dynamic port
-    health_check_thread = Thread(target=start_health_check_server, args=(health_check_port,), daemon=True, name="HealthCheckThread")
-    health_check_thread.start()
-    threads.append(health_check_thread)
-
-    # Start metrics server in a separate thread with dynamic port
-    metrics_thread = Thread(target=start_metrics_server, args=(metrics_port,), daemon=True, name="MetricsThread")
-    metrics_thread.start()
-    threads.append(metrics_thread)
-
     # Load configuration from file or environment variables
     CONFIG_PATH = os.getenv("CONFIG_PATH", "/path/to/config.json")
     try:
@@ -454,32 +598,33 @@ try:
         logger.warning(f"Failed to load configuration file: {e}. Falling back to environment variables.")
 
     # Validate required environment variables
-    REQUIRED_ENV_VARS = [
-        "SECRET_KEY",
-        "DATABASE_URL",
-        "REDIS_URL",
-        "LOG_LEVEL",
-        "LOG_FORMAT",
-        "HEALTH_CHECK_PORT",
-        "METRICS_PORT",
-        "CERT_FILE",
-        "KEY_FILE",
-    ]
     validate_environment_variables(REQUIRED_ENV_VARS)
+    configure_django()
 
     # HTTPS Configuration
+    ssl_context = None
     try:
         ssl_context = configure_https(CERT_FILE, KEY_FILE)
     except Exception as e:
         logger.warning(f"Failed to configure HTTPS: {e}. Running without HTTPS.")
 
-    # Perform a health check
-    health_check()
+    return Application(health_check_port, metrics_port, server_mode=server_mode, ssl_context=ssl_context)
 
-    # Keep the main thread alive to allow signal handling
-    while True:
-        time.sleep(1)
+def main(argv=None):
+    """Command line entry point: build the application and serve until stopped."""
+    import argparse
 
-except Exception as e:
-    logger.error(f"An error occurred during initialization: {e}")
-    graceful_shutdown()
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        prog="python -m octofit_tracker.backend.overachievers",
+        description="Run the OctoFit Tracker - Overachievers health and metrics servers.",
+    )
+    parser.add_argument("--health-check-port", type=int, help="port for /, /health and /metrics")
+    parser.add_argument("--metrics-port", type=int, help="port for the Prometheus metrics server")
+    parser.add_argument("--server-mode", choices=["single", "threaded", "asyncio"], help="HTTP server implementation")
+    args = parser.parse_args(argv)
+    try:
+        app = create_app(args.health_check_port, args.metrics_port, args.server_mode)
+        app.run()
+    except Exception as e:
+        logger.error(f"An error occurred during initialization: {e}")
+        graceful_shutdown()
@@ -0,0 +1,4 @@
+"""Run the health check and metrics servers: ``python -m octofit_tracker.backend.overachievers``."""
+from . import main
+
+main()
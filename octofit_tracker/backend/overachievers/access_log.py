@@ -0,0 +1,85 @@
+"""Non-blocking, sampled access logging.
+
+Request threads never format or write log records. ``start_queue_logging`` moves
+the root logger's handlers behind a bounded queue drained by a ``QueueListener`` thread;
+records are enqueued unformatted and are formatted by the listener. When the
+queue is full the record is dropped and counted instead of blocking the request.
+
+``log_access`` writes one record per request to the ``overachievers.access``
+logger. Successful (below 400) responses are sampled at ``ACCESS_LOG_SAMPLE_RATE``;
+errors are always kept.
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+from .metrics import REGISTRY
+
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", 1.0))  # Fraction of successful requests logged
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))  # Records buffered before new ones are dropped
+
+access_logger = logging.getLogger("overachievers.access")
+
+log_records_dropped_total = REGISTRY.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+access_logs_sampled_out_total = REGISTRY.counter(
+    "access_logs_sampled_out_total",
+    "Successful requests not logged because of access log sampling.",
+)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and never formats in the calling thread."""
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks hold frames that may change; render them now (rare path)
+            return super().prepare(record)
+        # Message and args are formatted by the listener's handlers
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+def start_queue_logging(target=None, maxsize=LOG_QUEUE_SIZE):
+    """Move the handlers of ``target`` (the root logger by default) behind a bounded queue.
+
+    Returns the running ``QueueListener``; call ``stop()`` on it to flush the
+    queue at shutdown.
+    """
+    target = target if target is not None else logging.getLogger()
+    handlers = list(target.handlers)
+    records = queue.Queue(maxsize=maxsize)
+    target.handlers = [DroppingQueueHandler(records)]
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def sampled_out(status, sample_rate=None):
+    """Return True if a successful request should not be logged under ``sample_rate``."""
+    rate = ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    return rate < 1.0 and status < 400 and random.random() >= rate
+
+
+def log_access(client_ip, method, path, status):
+    """Log one served request, subject to sampling."""
+    if not access_logger.isEnabledFor(logging.INFO):
+        return
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        status = 0
+    if sampled_out(status):
+        access_logs_sampled_out_total.inc()
+        return
+    # %-style arguments: the message is only built if the listener writes it
+    access_logger.info("Request from %s: %s %s %s", client_ip, method, path, status, extra={"status": status})
@@ -0,0 +1,137 @@
+"""Shared Redis cache backend.
+
+``LocMemCache`` keeps a private cache per gunicorn worker, so every worker
+misses on its own and hit rates fall as workers are added. ``RedisCache`` is
+Django's Redis backend, shared by all workers, with:
+
+* a bounded connection pool per process (``max_connections``, and
+  ``pool_class`` ``redis.BlockingConnectionPool`` to wait for a free
+  connection rather than fail);
+* ``CompressedSerializer``, which zlib-compresses pickled values of
+  ``COMPRESS_MIN_BYTES`` or more, so large snapshots (the badge catalog,
+  dashboards, API responses) cost less memory and bandwidth;
+* hit and miss counts in ``cache_lookups_total`` and this process's hit ratio
+  in the ``cache_hit_ratio`` gauge;
+* failing open: a Redis error makes reads miss and writes do nothing, is
+  logged and counted in ``cache_errors_total``, and Redis is then left alone
+  for ``retry_interval`` seconds, so an outage does not add a timeout to every
+  request.
+
+Configured in settings when ``REDIS_URL`` is set.
+"""
+import logging
+import pickle
+import time
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache, RedisSerializer
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Pickles smaller than this are stored as they are: compression would barely pay
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+# Marks compressed values; pickles start with b"\x80" and integers with a digit or "-"
+COMPRESSED = b"Z"
+
+cache_lookups_total = REGISTRY.counter(
+    "cache_lookups_total", "Shared cache lookups by result: hit or miss.", labelnames=("result",)
+)
+cache_errors_total = REGISTRY.counter(
+    "cache_errors_total", "Shared cache operations that failed and were skipped, by operation.", labelnames=("operation",)
+)
+
+
+def _hit_ratio():
+    hits, misses = cache_lookups_total.value(result="hit"), cache_lookups_total.value(result="miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+REGISTRY.gauge("cache_hit_ratio", "Fraction of this process's shared cache lookups that hit.").set_function(_hit_ratio)
+
+
+class CompressedSerializer(RedisSerializer):
+    """Django's Redis serializer, compressing large pickles.
+
+    Integers stay plain so ``incr`` and ``decr`` keep working in Redis.
+    """
+
+    def dumps(self, obj):
+        data = super().dumps(obj)
+        if isinstance(data, bytes) and len(data) >= COMPRESS_MIN_BYTES:
+            return COMPRESSED + zlib.compress(data, COMPRESS_LEVEL)
+        return data
+
+    def loads(self, data):
+        if data[:1] == COMPRESSED:
+            return pickle.loads(zlib.decompress(data[1:]))
+        return super().loads(data)
+
+
+_MISSING = object()
+
+
+class RedisCache(DjangoRedisCache):
+    """Django's Redis cache, counting hits and misses and failing open."""
+
+    retry_interval = 5.0
+
+    def __init__(self, server, params, clock=time.monotonic):
+        super().__init__(server, params)
+        from redis.exceptions import RedisError
+
+        self._redis_error = RedisError
+        self._clock = clock
+        self._retry_at = 0.0
+
+    def _fail_open(self, operation, fallback, method, *args):
+        if self._clock() < self._retry_at:
+            return fallback
+        try:
+            return method(*args)
+        except self._redis_error as e:
+            self._retry_at = self._clock() + self.retry_interval
+            cache_errors_total.inc(operation=operation)
+            logger.warning("Shared cache %s failed, skipping Redis for %ss: %s", operation, self.retry_interval, e)
+            return fallback
+
+    def get(self, key, default=None, version=None):
+        value = self._fail_open("get", _MISSING, super().get, key, _MISSING, version)
+        if value is _MISSING:
+            cache_lookups_total.inc(result="miss")
+            return default
+        cache_lookups_total.inc(result="hit")
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._fail_open("get_many", {}, super().get_many, keys, version)
+        if found:
+            cache_lookups_total.inc(len(found), result="hit")
+        if len(keys) > len(found):
+            cache_lookups_total.inc(len(keys) - len(found), result="miss")
+        return found
+
+    def has_key(self, key, version=None):
+        return self._fail_open("has_key", False, super().has_key, key, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._fail_open("add", False, super().add, key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._fail_open("set", None, super().set, key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._fail_open("set_many", list(data), super().set_many, data, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._fail_open("touch", False, super().touch, key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self._fail_open("delete", False, super().delete, key, version)
+
+    def delete_many(self, keys, version=None):
+        self._fail_open("delete_many", None, super().delete_many, keys, version)
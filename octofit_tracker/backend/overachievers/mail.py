@@ -0,0 +1,241 @@
+"""Pooled, batched SMTP delivery.
+
+Every new SMTP connection costs a TCP connect, a STARTTLS handshake and a login.
+``SMTPConnectionPool`` keeps authenticated connections open between messages:
+a batch is sent over one connection, idle connections are closed after
+``idle_timeout`` seconds, and a connection that drops mid-batch is replaced and
+the message retried once.
+
+``get_smtp_pool()`` returns one pool per worker process, created on first use,
+so connections are never shared across a fork.
+"""
+import logging
+import os
+import smtplib
+import time
+from email.mime.text import MIMEText
+from threading import Lock
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 10))  # Socket timeout in seconds
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 30))  # Servers drop idle clients after ~60s
+SMTP_MAX_IDLE = int(os.getenv("SMTP_MAX_IDLE", 2))  # Idle connections kept per worker
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+
+emails_sent_total = REGISTRY.counter("emails_sent_total", "Emails accepted by the SMTP server.")
+emails_failed_total = REGISTRY.counter("emails_failed_total", "Emails the SMTP server did not accept.")
+smtp_connections_opened_total = REGISTRY.counter(
+    "smtp_connections_opened_total", "SMTP connections opened (connect, STARTTLS and login)."
+)
+
+
+def _is_connection_error(error):
+    """True if ``error`` means the connection is unusable, rather than the message being rejected."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 421: the server is closing the transmission channel
+        return error.smtp_code == 421
+    # SMTPException subclasses OSError; other OSErrors are socket failures
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def build_message(sender, recipient, subject, body):
+    """Build a plain-text email."""
+    message = MIMEText(body)
+    message["Subject"] = subject
+    message["From"] = sender
+    message["To"] = recipient
+    return message
+
+
+class DeliveryReport:
+    """Outcome of a batch: messages sent, per-message failures and throughput."""
+
+    def __init__(self):
+        self.sent = 0
+        # (recipient, exception) pairs
+        self.failures = []
+        self.connections = 0
+        self._started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_failure(self, message, error):
+        self.failures.append((message["To"], error))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._started
+        emails_sent_total.inc(self.sent)
+        emails_failed_total.inc(len(self.failures))
+        return self
+
+    @property
+    def messages_per_second(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "sent": self.sent,
+            "failed": [{"recipient": recipient, "error": str(error)} for recipient, error in self.failures],
+            "connections": self.connections,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "messages_per_second": round(self.messages_per_second, 1),
+        }
+
+
+class SMTPConnectionPool:
+    """Reusable authenticated SMTP connections for one process."""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, timeout=SMTP_TIMEOUT,
+                 idle_timeout=SMTP_IDLE_TIMEOUT, max_idle=SMTP_MAX_IDLE,
+                 max_messages_per_connection=SMTP_MAX_MESSAGES_PER_CONNECTION):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self.max_messages_per_connection = max_messages_per_connection
+        # (connection, last used) pairs, most recently used last
+        self._idle = []
+        self._lock = Lock()
+
+    def _connect(self):
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            connection.close()
+            raise
+        smtp_connections_opened_total.inc()
+        return connection
+
+    def _acquire(self):
+        """Return ``(connection, opened)``: an idle connection if one is fresh enough, else a new one."""
+        now = time.monotonic()
+        expired = []
+        connection = None
+        with self._lock:
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+        for stale in expired:
+            self._discard(stale)
+        if connection is not None:
+            return connection, False
+        return self._connect(), True
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self._discard(connection)
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def send_messages(self, messages):
+        """Send ``messages`` over as few connections as possible and return a ``DeliveryReport``.
+
+        A message the server rejects is recorded as a failure and the batch goes on.
+        If no connection can be opened, the remaining messages all fail with that error.
+        """
+        messages = list(messages)
+        report = DeliveryReport()
+        connection = None
+        sent_on_connection = 0
+        try:
+            for index, message in enumerate(messages):
+                for attempt in range(2):
+                    if connection is None:
+                        try:
+                            connection, opened = self._acquire()
+                        except Exception as e:
+                            logger.error(f"Could not open an SMTP connection to {self.host}:{self.port}: {e}")
+                            for remaining in messages[index:]:
+                                report.add_failure(remaining, e)
+                            return report.finish()
+                        report.connections += opened
+                        sent_on_connection = 0
+                    try:
+                        connection.send_message(message)
+                    except Exception as e:
+                        if _is_connection_error(e):
+                            self._discard(connection)
+                            connection = None
+                            if attempt == 0:
+                                # Reconnect and retry once; pooled connections may have been dropped
+                                continue
+                        report.add_failure(message, e)
+                    else:
+                        report.sent += 1
+                        sent_on_connection += 1
+                        if sent_on_connection >= self.max_messages_per_connection:
+                            # Many servers cap messages per session
+                            self._discard(connection)
+                            connection = None
+                    break
+        finally:
+            if connection is not None:
+                self._release(connection)
+        return report.finish()
+
+    def send(self, message):
+        """Send one message, raising the delivery error if it fails."""
+        report = self.send_messages([message])
+        if report.failures:
+            raise report.failures[0][1]
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = Lock()
+
+
+def get_smtp_pool():
+    """Return this process's SMTP pool, configured from the EMAIL_* environment variables."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = SMTPConnectionPool(
+                    os.getenv("EMAIL_HOST"),
+                    int(os.getenv("EMAIL_PORT", 587)),
+                    username=os.getenv("EMAIL_HOST_USER"),
+                    password=os.getenv("EMAIL_HOST_PASSWORD"),
+                    use_tls=os.getenv("EMAIL_USE_TLS", "true").lower() in ("true", "1", "yes"),
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def close_smtp_pool():
+    """Close this process's pooled connections, e.g. when a worker shuts down."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,343 @@
+"""Prometheus-style metrics for the overachievers package.
+
+``REGISTRY`` holds every metric and renders them in the Prometheus text
+exposition format. Counters and histograms accumulate into per-thread shards:
+the hot path only touches the calling thread's own dict and never takes a lock.
+Shards are merged when metrics are rendered, and a thread's shard is folded into
+a shared base when the thread exits, so totals never go backwards.
+
+    requests = REGISTRY.counter("requests_total", "Requests served.", labelnames=("status",))
+    requests.inc(status="200")
+
+Every update stamps its metric with a fresh version, so ``REGISTRY.version()``
+tells callers whether a previous rendering is still current.
+
+``REGISTRY.dump()`` and ``MetricsRegistry.merge()`` carry stored metrics between
+processes, so the metrics of several workers can be exported together (see
+multiprocess.py).
+"""
+import itertools
+import threading
+import weakref
+from bisect import bisect_left
+
+# Latency buckets in seconds, from 0.5 ms up to 10 s
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Size buckets in bytes, from 100 B up to 10 MB
+DEFAULT_SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Version stamps; next() on a count is atomic, so each update gets a unique stamp
+_versions = itertools.count(1)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Shard:
+    """Per-thread accumulator; its finalizer folds the values back when the thread exits."""
+    __slots__ = ("values", "__weakref__")
+
+    def __init__(self):
+        self.values = {}
+
+
+class _Metric:
+    type = None
+    # Volatile metrics are computed at render time and carry no version
+    volatile = False
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._version = next(_versions)
+
+    def _key(self, labels):
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+
+    def labels(self, **labels):
+        """Return a child bound to ``labels``, skipping label handling on every update."""
+        return _BoundMetric(self, self._key(labels))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self.collect().items()):
+            lines.extend(self._render_series(list(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_series(self, labels, value):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class _BoundMetric:
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        self._metric._inc_key(self._key, amount)
+
+    def dec(self, amount=1):
+        self._metric._inc_key(self._key, -amount)
+
+    def set(self, value):
+        self._metric._set_key(self._key, value)
+
+    def observe(self, value):
+        self._metric._observe_key(self._key, value)
+
+
+class _ShardedMetric(_Metric):
+    """Metric whose updates go to a lock-free per-thread shard."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        # Values from threads that have exited
+        self._retired = {}
+
+    def _shard_values(self):
+        try:
+            return self._local.shard.values
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard.values)
+            weakref.finalize(shard, self._retire, shard.values)
+            return shard.values
+
+    def _retire(self, values):
+        with self._lock:
+            self._shards.remove(values)
+            for key, value in values.items():
+                self._retired[key] = self._merge(self._retired.get(key), value)
+
+    def collect(self):
+        """Merge every shard into ``{label values: value}``."""
+        with self._lock:
+            # dict.copy() is atomic, so an owning thread may keep writing meanwhile
+            snapshots = [self._retired.copy()] + [values.copy() for values in self._shards]
+        merged = {}
+        for snapshot in snapshots:
+            for key, value in snapshot.items():
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+    @staticmethod
+    def _merge(total, value):
+        return value if total is None else total + value
+
+
+class Counter(_ShardedMetric):
+    """Monotonically increasing counter."""
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        self._inc_key(self._key(labels), amount)
+
+    def _inc_key(self, key, amount):
+        values = self._shard_values()
+        values[key] = values.get(key, 0) + amount
+        self._version = next(_versions)
+
+    def value(self, **labels):
+        return self.collect().get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed on demand with ``set_function``."""
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._function = None
+
+    def set(self, value, **labels):
+        self._set_key(self._key(labels), value)
+
+    def inc(self, amount=1, **labels):
+        self._inc_key(self._key(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        self._inc_key(self._key(labels), -amount)
+
+    def _set_key(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            self._version = next(_versions)
+
+    def _inc_key(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._version = next(_versions)
+
+    def set_function(self, function):
+        """Compute the (unlabelled) value by calling ``function`` at render time."""
+        self._function = function
+
+    @property
+    def volatile(self):
+        return self._function is not None
+
+    def value(self, **labels):
+        return self.collect().get(self._key(labels), 0)
+
+    def collect(self):
+        if self._function is not None:
+            return {(): self._function()}
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(_ShardedMetric):
+    """Fixed-bucket histogram."""
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self._observe_key(self._key(labels), value)
+
+    def _observe_key(self, key, value):
+        values = self._shard_values()
+        series = values.get(key)
+        if series is None:
+            # One count per bucket, one for +Inf, then the sum
+            series = values[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+        self._version = next(_versions)
+
+    @staticmethod
+    def _merge(total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def _render_series(self, labels, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-1])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of named metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type}.")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames=labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames=labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames=labelnames, buckets=buckets)
+
+    def version(self):
+        """Return a token that changes whenever a stored (non-volatile) metric changes."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return tuple(metric._version for metric in metrics if not metric.volatile)
+
+    def dump(self):
+        """Return this process's stored (non-volatile) metrics as JSON-serializable data."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        dump = {}
+        for metric in metrics:
+            if metric.volatile:
+                continue
+            dump[metric.name] = {
+                "type": metric.type,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "values": [[list(key), value] for key, value in metric.collect().items()],
+            }
+            if isinstance(metric, Histogram):
+                dump[metric.name]["buckets"] = list(metric.buckets)
+        return dump
+
+    @classmethod
+    def merge(cls, dumps):
+        """Build a registry from the ``dump()`` of several processes, keyed by process id.
+
+        Counters and histograms are summed across processes; gauges keep one
+        series per process, labelled ``pid``.
+        """
+        registry = cls()
+        for pid, dump in dumps.items():
+            for name, data in dump.items():
+                labelnames = tuple(data["labelnames"])
+                if data["type"] == "gauge":
+                    gauge = registry.gauge(name, data["documentation"], labelnames + ("pid",))
+                    for key, value in data["values"]:
+                        gauge._values[tuple(key) + (str(pid),)] = value
+                    continue
+                if data["type"] == "histogram":
+                    metric = registry.histogram(name, data["documentation"], labelnames, buckets=data["buckets"])
+                else:
+                    metric = registry.counter(name, data["documentation"], labelnames)
+                for key, value in data["values"]:
+                    key = tuple(key)
+                    metric._retired[key] = metric._merge(metric._retired.get(key), value)
+        return registry
+
+    def render(self, volatile=None):
+        """Return metrics in Prometheus text exposition format.
+
+        ``volatile=False`` renders only stored metrics, which ``version()`` covers;
+        ``volatile=True`` renders only metrics computed at render time.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            if volatile is None or metric.volatile == volatile:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+REGISTRY = MetricsRegistry()
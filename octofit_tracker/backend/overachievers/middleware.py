@@ -0,0 +1,125 @@
+"""Django integration for the metrics registry.
+
+``RequestMetricsMiddleware`` records latency, status codes and response sizes
+for every view; ``metrics_view`` exports the whole registry in Prometheus text
+format.
+
+``metrics_view`` only answers clients in ``METRICS_ALLOWED_IPS`` (loopback by
+default) or presenting ``Authorization: Bearer <METRICS_TOKEN>``; everyone else
+gets 403. The client is ``REMOTE_ADDR``: behind a proxy or the Heroku router,
+which connects from its own addresses, scrape with the token instead.
+
+With ``METRICS_MULTIPROCESS_DIR`` set, gunicorn workers publish their metrics
+there and ``metrics_view`` exports all of them (see multiprocess.py); without
+it, a scrape reports only the worker that served it.
+"""
+import hmac
+import ipaddress
+import time
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import DEFAULT_SIZE_BUCKETS, REGISTRY
+
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+http_requests_total = REGISTRY.counter(
+    "django_http_requests_total",
+    "Django requests by method, view and response status.",
+    labelnames=("method", "view", "status"),
+)
+http_request_duration = REGISTRY.histogram(
+    "django_http_request_duration_seconds",
+    "Django request latency by method and view.",
+    labelnames=("method", "view"),
+)
+http_response_size = REGISTRY.histogram(
+    "django_http_response_size_bytes",
+    "Django response body size by view.",
+    labelnames=("view",),
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+
+
+_process_metrics = None
+_process_metrics_lock = Lock()
+
+
+def get_process_metrics():
+    """Return the shared ProcessMetricsDirectory, or None if METRICS_MULTIPROCESS_DIR is not set."""
+    global _process_metrics
+    directory = getattr(settings, "METRICS_MULTIPROCESS_DIR", "")
+    if not directory:
+        return None
+    if _process_metrics is None:
+        with _process_metrics_lock:
+            if _process_metrics is None:
+                from .multiprocess import ProcessMetricsDirectory
+
+                _process_metrics = ProcessMetricsDirectory(
+                    directory, publish_interval=getattr(settings, "METRICS_PUBLISH_INTERVAL", 1.0)
+                )
+    return _process_metrics
+
+
+@lru_cache(maxsize=4)
+def _networks(allowed_ips):
+    return tuple(ipaddress.ip_network(entry.strip(), strict=False) for entry in allowed_ips if entry.strip())
+
+
+def metrics_allowed(request):
+    """Whether ``request`` may read /metrics: an allowed client address or the metrics token."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    allowed_ips = tuple(getattr(settings, "METRICS_ALLOWED_IPS", ("127.0.0.1", "::1")))
+    return any(address in network for network in _networks(allowed_ips))
+
+
+def _view_label(request):
+    """Label a request by its URL route rather than its path, to keep cardinality bounded."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match.route or "<unnamed>"
+
+
+class RequestMetricsMiddleware:
+    """Record per-view request metrics. Place it first in MIDDLEWARE to time the whole stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        method = request.method if request.method in KNOWN_METHODS else "OTHER"
+        view = _view_label(request)
+        http_requests_total.inc(method=method, view=view, status=response.status_code)
+        http_request_duration.observe(elapsed, method=method, view=view)
+        if not response.streaming:
+            http_response_size.observe(len(response.content), view=view)
+        process_metrics = get_process_metrics()
+        if process_metrics is not None:
+            process_metrics.publish()
+        return response
+
+
+def metrics_view(request):
+    """Export every registered metric in Prometheus text format, to allowed clients only."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden("Forbidden", content_type="text/plain")
+    process_metrics = get_process_metrics()
+    body = process_metrics.render() if process_metrics is not None else REGISTRY.render()
+    return HttpResponse(body, content_type="text/plain; version=0.0.4")
@@ -20,6 +20,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from fitness_app.views import WeightLogViewSet, AchievementViewSet, NutritionCheckView, WeatherInfoView, UserProfileViewSet, BadgeTierViewSet, PurchasableBadgeViewSet, AwardBadgeView, PurchaseBadgeView
 from django.contrib.auth import views as auth_views
+from overachievers.middleware import metrics_view
 
 router = DefaultRouter()
 router.register(r'weight-logs', WeightLogViewSet, basename='weightlog')
@@ -38,4 +39,5 @@ urlpatterns = [
     path('api/weather-info/', WeatherInfoView.as_view(), name='weather-info'),
     path('api/award-badge/', AwardBadgeView.as_view(), name='award-badge'),
     path('api/purchase-badge/', PurchaseBadgeView.as_view(), name='purchase-badge'),
+    path('metrics/', metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
@@ -0,0 +1,96 @@
+"""Metrics of every worker process of one server, exported together.
+
+Each gunicorn worker has its own ``REGISTRY``, so a scrape of ``/metrics``
+reports whichever worker happened to answer it. ``ProcessMetricsDirectory``
+gives the workers a shared directory instead:
+
+* every process writes its stored metrics to ``<directory>/<pid>.json``, at
+  most every ``publish_interval`` seconds (``RequestMetricsMiddleware`` calls
+  ``publish`` after each request) and whenever it is scraped;
+* ``render`` merges every file (see ``MetricsRegistry.merge``): counters and
+  histograms are summed, including those of exited workers so totals never go
+  backwards, and gauges are reported per live process with a ``pid`` label.
+  Metrics computed at render time, such as uptime, come from the scraped
+  process.
+
+Files are never removed while the server runs. Empty the directory when it
+starts, for example in gunicorn's ``on_starting`` hook, so a reused pid does
+not pick up an earlier server's counts.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from threading import Lock
+
+from .metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def _alive(pid):
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    return True
+
+
+class ProcessMetricsDirectory:
+    """A directory where worker processes publish their metrics for a merged export."""
+
+    def __init__(self, path, registry=REGISTRY, publish_interval=1.0, clock=time.monotonic):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.registry = registry
+        self.publish_interval = publish_interval
+        self._clock = clock
+        self._published_at = None
+        self._lock = Lock()
+
+    def publish(self, force=False):
+        """Write this process's metrics, unless they were written less than ``publish_interval`` ago."""
+        now = self._clock()
+        if not force and self._published_at is not None and now - self._published_at < self.publish_interval:
+            return
+        # One writer per process; other threads skip rather than wait
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            self._published_at = now
+            pid = os.getpid()
+            temporary = self.path / f"{pid}.json.tmp"
+            temporary.write_text(json.dumps(self.registry.dump()))
+            # Readers see the old file or the new one, never a partial write
+            os.replace(temporary, self.path / f"{pid}.json")
+        except OSError as e:
+            logger.warning("Could not publish metrics to %s: %s", self.path, e)
+        finally:
+            self._lock.release()
+
+    def collect(self):
+        """Merge the latest metrics of every process into one registry."""
+        self.publish(force=True)
+        dumps = {}
+        for file in self.path.glob("*.json"):
+            try:
+                pid = int(file.stem)
+                dump = json.loads(file.read_text())
+            except (ValueError, OSError) as e:
+                logger.warning("Skipping unreadable metrics file %s: %s", file, e)
+                continue
+            if not _alive(pid):
+                # An exited worker's gauges no longer describe anything
+                dump = {name: data for name, data in dump.items() if data["type"] != "gauge"}
+            dumps[pid] = dump
+        return MetricsRegistry.merge(dumps)
+
+    def render(self):
+        """Every process's stored metrics, plus this process's computed ones, in Prometheus format."""
+        return self.collect().render() + self.registry.render(volatile=True)
@@ -0,0 +1,304 @@
+"""Background-refreshed dependency health probes.
+
+``DependencyProber`` runs each dependency check on a fixed interval from a single
+background thread and keeps the latest results as an immutable snapshot. Health
+endpoints read that snapshot in constant time, so a burst of probes never turns
+into a burst of Redis or database connections.
+
+``check_database_connections`` is the database check: a timeout-bounded
+``SELECT 1`` against every configured Django database alias. The query is also
+bounded by the database or its driver (see ``_select_one``), and while an
+alias's previous probe is still running no new one is started for it, so a hung
+connection costs one worker thread rather than a growing queue of probes.
+"""
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 5))
+DB_PROBE_TIMEOUT = float(os.getenv("DB_PROBE_TIMEOUT", 2))
+
+database_probe_latency = REGISTRY.histogram(
+    "database_probe_latency_seconds",
+    "Round-trip latency of the SELECT 1 database probe.",
+    labelnames=("alias",),
+)
+database_up = REGISTRY.gauge(
+    "database_up",
+    "Whether the last database probe succeeded (1) or not (0).",
+    labelnames=("alias",),
+)
+
+# Django connections are thread-local. Each alias is probed from its own
+# long-lived thread, which keeps a single persistent probe connection
+# (honouring CONN_MAX_AGE) and never touches request threads' connections.
+_db_probe_executors = {}
+_db_probe_executors_lock = Lock()
+# alias -> (future, monotonic start) of the alias's latest probe
+_db_probes_in_flight = {}
+_db_probes_in_flight_lock = Lock()
+
+
+def _db_probe_executor(alias):
+    executor = _db_probe_executors.get(alias)
+    if executor is None:
+        with _db_probe_executors_lock:
+            executor = _db_probe_executors.get(alias)
+            if executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                executor = _db_probe_executors[alias] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"DatabaseProbe-{alias}"
+                )
+    return executor
+
+
+def _connection_state(connection):
+    """Describe the persistent-connection and pool configuration of a connection."""
+    settings_dict = connection.settings_dict
+    conn_max_age = settings_dict.get("CONN_MAX_AGE", 0)
+    state = {
+        "vendor": connection.vendor,
+        "conn_max_age": conn_max_age,
+        "persistent": conn_max_age != 0,
+        "health_checks": settings_dict.get("CONN_HEALTH_CHECKS", False),
+        "connection_open": connection.connection is not None,
+    }
+    # Native psycopg connection pooling (Django 5.1+, OPTIONS={"pool": ...})
+    pool = getattr(connection, "pool", None)
+    if pool is not None:
+        stats = pool.get_stats()
+        state["pool"] = {
+            "size": stats.get("pool_size"),
+            "available": stats.get("pool_available"),
+            "waiting": stats.get("requests_waiting"),
+        }
+    return state
+
+
+def _select_one(connection, alias, timeout):
+    """Run ``SELECT 1``, cancelled by the database or its driver after ``timeout`` seconds."""
+    from django.db import transaction
+
+    timeout_ms = int(timeout * 1000)
+    if connection.vendor == "postgresql":
+        # is_local=true scopes the statement timeout to this transaction
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(timeout_ms)])
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()
+    if connection.vendor == "mysql":
+        with connection.cursor() as cursor:
+            if connection.mysql_is_mariadb:
+                cursor.execute(f"SET STATEMENT max_statement_time={timeout:g} FOR SELECT 1")
+            else:
+                cursor.execute(f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */ 1")
+            return cursor.fetchone()
+    connection.ensure_connection()
+    if connection.vendor == "sqlite":
+        deadline = time.monotonic() + timeout
+        # Called every 1000 VM instructions; returning True interrupts the query
+        connection.connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                return cursor.fetchone()
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+    if connection.vendor == "oracle":
+        # Bounds every round trip of the driver, including a hung network
+        previous, connection.connection.call_timeout = connection.connection.call_timeout, timeout_ms
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM DUAL")
+                return cursor.fetchone()
+        finally:
+            connection.connection.call_timeout = previous
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        return cursor.fetchone()
+
+
+def _probe_alias(alias, timeout):
+    from django.db import connections
+
+    connection = connections[alias]
+    # Drop the connection if it outlived CONN_MAX_AGE or is broken, as Django does per request
+    connection.close_if_unusable_or_obsolete()
+    try:
+        started = time.perf_counter()
+        _select_one(connection, alias, timeout)
+        latency = time.perf_counter() - started
+    except Exception as e:
+        database_up.set(0, alias=alias)
+        return {"status": "error", "error": str(e), **_connection_state(connection)}
+    database_probe_latency.observe(latency, alias=alias)
+    database_up.set(1, alias=alias)
+    return {"status": "connected", "latency_ms": round(latency * 1000, 3), **_connection_state(connection)}
+
+
+def check_database_connections(timeout=DB_PROBE_TIMEOUT):
+    """Run a timeout-bounded ``SELECT 1`` against every configured database alias.
+
+    Returns an overall ``status`` (``connected`` only if every alias answered)
+    and a per-alias breakdown with latency and connection state, or
+    ``not_configured`` when Django has no settings or no database to probe.
+    """
+    from django.apps import apps
+    from django.conf import settings
+
+    if not settings.configured and not os.getenv("DJANGO_SETTINGS_MODULE"):
+        return {"status": "not_configured", "error": "Django settings are not configured."}
+    try:
+        if not apps.ready:
+            import django
+            django.setup()
+        databases = settings.DATABASES
+    except Exception as e:
+        # Missing settings module, required environment variable, app import error...
+        return {"status": "not_configured", "error": f"Django could not be configured: {e}"}
+    if not databases:
+        return {"status": "not_configured", "error": "No databases are configured."}
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from django.db import connections
+
+    aliases = {}
+    for alias in connections:
+        with _db_probes_in_flight_lock:
+            in_flight = _db_probes_in_flight.get(alias)
+            if in_flight is None or in_flight[0].done():
+                future = _db_probe_executor(alias).submit(_probe_alias, alias, timeout)
+                _db_probes_in_flight[alias] = (future, time.monotonic())
+                in_flight = None
+        if in_flight is not None:
+            # The alias's probe thread is still stuck on an earlier probe; queueing
+            # another behind it would only time out too
+            database_up.set(0, alias=alias)
+            aliases[alias] = {
+                "status": "timeout",
+                "error": f"Previous probe still running after {time.monotonic() - in_flight[1]:.1f}s.",
+            }
+            continue
+        try:
+            aliases[alias] = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            database_up.set(0, alias=alias)
+            aliases[alias] = {"status": "timeout", "error": f"No response within {timeout}s."}
+    connected = all(result["status"] == "connected" for result in aliases.values())
+    return {"status": "connected" if connected else "disconnected", "aliases": aliases}
+
+
+class DependencyProber:
+    """Periodically runs dependency checks and serves their latest results.
+
+    ``checks`` maps a dependency name to a callable returning a status dict such
+    as ``{"status": "connected"}``. Each snapshot entry is extended with the probe
+    latency and the time it was taken; ``snapshot()`` adds the entry's age and
+    marks entries older than ``stale_after`` seconds as ``stale``.
+    """
+
+    def __init__(self, checks, interval=HEALTH_PROBE_INTERVAL, stale_after=None):
+        self.checks = checks
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        self._snapshot = {}
+        self._snapshot_at = 0.0
+        self._probe_lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def probe_once(self):
+        """Run every check now and publish the results as the new snapshot."""
+        with self._probe_lock:
+            return self._probe()
+
+    def _probe(self):
+        results = {}
+        for name, check in self.checks.items():
+            started = time.perf_counter()
+            try:
+                result = dict(check())
+            except Exception as e:
+                logger.error(f"{name} probe failed: {e}")
+                result = {"status": "error", "error": str(e)}
+            result["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            result["checked_at"] = time.time()
+            results[name] = result
+        # Readers never lock: they see either the old or the new dict
+        self._snapshot = results
+        self._snapshot_at = time.time()
+        return results
+
+    def _fresh(self):
+        return bool(self._snapshot) and time.time() - self._snapshot_at < self.interval
+
+    def _refresh_inline(self):
+        """Probe for a caller when no background thread is running.
+
+        One caller probes at a time; while it does, the others get the previous
+        results instead of queueing for another round. Only the very first
+        callers, with nothing to serve yet, wait for it.
+        """
+        if not self._probe_lock.acquire(blocking=not self._snapshot):
+            return self._snapshot
+        try:
+            # Refreshed by another caller while this one waited
+            if self._fresh():
+                return self._snapshot
+            return self._probe()
+        finally:
+            self._probe_lock.release()
+
+    def snapshot(self):
+        """Return the latest results with their age.
+
+        If the background thread is not running, results younger than
+        ``interval`` are reused and older ones are refreshed inline (see
+        ``_refresh_inline``), so callers always get a result without probing
+        on every request.
+        """
+        results = self._snapshot
+        if not self.running and not self._fresh():
+            results = self._refresh_inline()
+        now = time.time()
+        snapshot = {}
+        for name, result in results.items():
+            entry = dict(result)
+            entry["age_seconds"] = round(now - result["checked_at"], 3)
+            if entry["age_seconds"] > self.stale_after:
+                entry["status"] = "stale"
+            snapshot[name] = entry
+        return snapshot
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start refreshing the snapshot in a daemon thread."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True, name="DependencyProberThread")
+        self._thread.start()
+
+    def _run(self):
+        logger.info(f"Dependency prober running every {self.interval}s")
+        while True:
+            try:
+                self.probe_once()
+            except Exception as e:
+                logger.error(f"Dependency probe round failed: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+    def stop(self, timeout=5):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
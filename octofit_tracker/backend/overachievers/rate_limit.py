@@ -0,0 +1,208 @@
+"""Bounded-memory, thread-safe per-client rate limiting.
+
+``RateLimiter`` tracks clients in lock-striped LRU tables. Each check touches a
+single stripe and costs O(1) (amortized for the sliding log), and the number of
+tracked clients never exceeds ``max_clients``: idle clients expire after ``ttl``
+seconds and the least recently seen client is evicted when a stripe is full.
+
+Two algorithms are available:
+
+* ``token_bucket`` - bursts of up to ``limit`` requests, refilled at
+  ``limit / period`` tokens per second. Constant memory per client.
+* ``sliding_log`` - at most ``limit`` requests in any rolling ``period``.
+  Exact, at the cost of up to ``limit`` timestamps per client.
+
+``RedisRateLimiter`` enforces a token bucket shared by all worker processes and
+falls back to a local ``RateLimiter`` while Redis is unavailable.
+"""
+import logging
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MODES = ("token_bucket", "sliding_log")
+
+
+class _Stripe:
+    """One lock-protected LRU table of client states."""
+    __slots__ = ("lock", "clients")
+
+    def __init__(self):
+        self.lock = Lock()
+        self.clients = OrderedDict()
+
+
+class RateLimiter:
+    """Per-client rate limiter with striped locks and LRU/TTL eviction."""
+
+    def __init__(self, limit, period=1.0, mode="token_bucket", max_clients=100_000,
+                 ttl=None, stripes=64, clock=time.monotonic):
+        if mode not in RATE_LIMIT_MODES:
+            raise ValueError(f"Unknown rate limit mode: {mode}. Expected one of: {', '.join(RATE_LIMIT_MODES)}")
+        if limit < 1 or period <= 0:
+            raise ValueError("Rate limit and period must be positive.")
+        self.limit = limit
+        self.period = float(period)
+        self.mode = mode
+        # A client idle for a full period is indistinguishable from a new client
+        # in both modes, so the default TTL loses no state.
+        self.ttl = float(ttl) if ttl is not None else self.period
+        self._clock = clock
+        # Round the stripe count up to a power of two so selection is a mask
+        stripe_count = 1 << max(0, stripes - 1).bit_length()
+        self._mask = stripe_count - 1
+        self._stripes = [_Stripe() for _ in range(stripe_count)]
+        self._stripe_capacity = max(1, max_clients // stripe_count)
+        self.max_clients = self._stripe_capacity * stripe_count
+        self._refill_rate = limit / self.period
+        self._check = self._check_token_bucket if mode == "token_bucket" else self._check_sliding_log
+
+    def is_limited(self, key):
+        """Record a request from ``key`` and return True if it exceeds the limit."""
+        now = self._clock()
+        stripe = self._stripes[hash(key) & self._mask]
+        with stripe.lock:
+            clients = stripe.clients
+            state = clients.get(key)
+            if state is None:
+                if clients:
+                    self._evict(clients, now)
+                state = clients[key] = self._new_state(now)
+            else:
+                clients.move_to_end(key)
+            return self._check(state, now)
+
+    def _evict(self, clients, now):
+        """Drop expired clients, then the least recently seen one if still full."""
+        # Clients are kept in last-seen order, so expired ones are at the front
+        expires_before = now - self.ttl
+        while clients:
+            oldest = next(iter(clients.values()))
+            if oldest[-1] > expires_before:
+                break
+            clients.popitem(last=False)
+        if len(clients) >= self._stripe_capacity:
+            clients.popitem(last=False)
+
+    def _new_state(self, now):
+        if self.mode == "token_bucket":
+            # [tokens, last_seen]
+            return [float(self.limit), now]
+        # [timestamps, last_seen]
+        return [deque(maxlen=self.limit), now]
+
+    def _check_token_bucket(self, state, now):
+        tokens = min(self.limit, state[0] + (now - state[1]) * self._refill_rate)
+        state[1] = now
+        if tokens >= 1:
+            state[0] = tokens - 1
+            return False
+        state[0] = tokens
+        return True
+
+    def _check_sliding_log(self, state, now):
+        log = state[0]
+        state[1] = now
+        window_start = now - self.period
+        while log and log[0] <= window_start:
+            log.popleft()
+        if len(log) >= self.limit:
+            return True
+        log.append(now)
+        return False
+
+    def reset(self):
+        """Forget every tracked client."""
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.clients.clear()
+
+    def __len__(self):
+        return sum(len(stripe.clients) for stripe in self._stripes)
+
+
+# Token bucket evaluated atomically inside Redis. The server clock is used so
+# that workers on different hosts agree on the refill time.
+#   KEYS[1] = bucket key, ARGV = capacity, refill rate per second, TTL in ms
+# Returns 1 if the request is limited, 0 otherwise.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local limited = 1
+if tokens >= 1 then
+    tokens = tokens - 1
+    limited = 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return limited
+"""
+
+
+class RedisRateLimiter:
+    """Token-bucket rate limiter shared by every process through Redis.
+
+    Each check is a single ``EVALSHA`` round trip. When Redis is unreachable the
+    limiter falls back to a process-local ``RateLimiter`` and only retries Redis
+    after ``retry_interval`` seconds, so an outage does not add a connection
+    timeout to every request.
+    """
+
+    def __init__(self, limit, period=1.0, client=None, prefix="ratelimit", fallback=None,
+                 retry_interval=5.0, clock=time.monotonic):
+        if limit < 1 or period <= 0:
+            raise ValueError("Rate limit and period must be positive.")
+        # Imported here so importing the package does not pull in redis
+        from redis.exceptions import RedisError
+
+        self._redis_error = RedisError
+        self.limit = limit
+        self.period = float(period)
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.fallback = fallback or RateLimiter(limit, period=period, mode="token_bucket", clock=clock)
+        self._client = client
+        self._script = None
+        self._clock = clock
+        self._ttl_ms = max(1, int(self.period * 1000))
+        self._retry_at = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_client()
+        return self._client
+
+    def is_limited(self, key):
+        """Record a request from ``key`` and return True if it exceeds the shared limit."""
+        if self._clock() >= self._retry_at:
+            try:
+                if self._script is None:
+                    self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+                limited = self._script(
+                    keys=[f"{self.prefix}:{key}"],
+                    args=[self.limit, self.limit / self.period, self._ttl_ms],
+                )
+                return bool(int(limited))
+            except self._redis_error as e:
+                self._retry_at = self._clock() + self.retry_interval
+                logger.warning("Redis rate limiter unavailable, using local fallback: %s", e)
+        return self.fallback.is_limited(key)
+
+    def reset(self):
+        """Forget local fallback state (Redis keys expire on their own)."""
+        self.fallback.reset()
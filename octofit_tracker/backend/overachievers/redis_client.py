@@ -0,0 +1,36 @@
+"""Shared, pooled Redis client for the overachievers package.
+
+Creating a client with ``Redis.from_url`` per call opens a fresh TCP connection
+every time. ``get_redis_client`` instead hands out one process-wide client backed
+by a bounded, blocking connection pool.
+"""
+import os
+from threading import Lock
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 20))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))
+
+_client = None
+_client_lock = Lock()
+
+
+def get_redis_client():
+    """Return the process-wide pooled Redis client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Imported here so importing the package does not pull in redis
+                from redis import BlockingConnectionPool, Redis
+
+                pool = BlockingConnectionPool.from_url(
+                    REDIS_URL,
+                    max_connections=REDIS_MAX_CONNECTIONS,
+                    timeout=REDIS_SOCKET_TIMEOUT,
+                    socket_timeout=REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                    health_check_interval=30,
+                )
+                _client = Redis(connection_pool=pool)
+    return _client
@@ -0,0 +1,60 @@
+"""Pre-encoded responses for the health check and metrics servers.
+
+A ``PreparedResponse`` holds an encoded body together with its Content-Length
+and ETag, so serving it is a single write. ``ResponseCache`` keeps one prepared
+response per key and rebuilds it only when the caller's version changes:
+
+    response = response_cache.get("metrics", REGISTRY.version(), render_body)
+"""
+import hashlib
+from threading import Lock
+
+
+class PreparedResponse:
+    """An encoded body with its precomputed headers.
+
+    The ETag is a hash of the body unless ``etag`` is given, e.g. a weak ETag
+    for bodies that differ only in parts clients need not revalidate.
+    """
+    __slots__ = ("body", "content_type", "content_length", "etag")
+
+    def __init__(self, body, content_type="application/json", etag=None):
+        self.body = body
+        self.content_type = content_type
+        self.content_length = str(len(body))
+        self.etag = etag or f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+class ResponseCache:
+    """One prepared response per key, rebuilt when its version changes."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = Lock()
+
+    def get(self, key, version, render, content_type="application/json"):
+        """Return the response for ``key`` at ``version``, calling ``render()`` for the body if stale."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        # One thread renders; the others wait and reuse its result
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            response = PreparedResponse(render(), content_type)
+            self._entries[key] = (version, response)
+            return response
+
+    def clear(self):
+        self._entries = {}
+
+
+def etag_matches(if_none_match, etag):
+    """Return True if an If-None-Match header value matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,279 @@
+"""HTTP server implementations for the health check and metrics endpoints.
+
+Three modes are available through ``make_server``:
+
+* ``single``   - a single-threaded ``HTTPServer`` (one connection at a time).
+* ``threaded`` - an ``HTTPServer`` that hands each connection to a bounded worker pool.
+* ``asyncio``  - an asyncio front end that keeps idle keep-alive connections on the
+  event loop and only occupies a pool worker while a request is being handled.
+
+All modes run the same ``BaseHTTPRequestHandler`` subclasses, so handlers do not need
+to know which server they are running under.
+
+In the ``single`` and ``threaded`` modes an idle keep-alive connection occupies the
+server's thread or a pool worker. Between requests, handlers call the server's
+``wait_for_request``, which closes the idle connection as soon as another
+connection is waiting to be served, so idle clients never keep others out.
+"""
+import asyncio
+import logging
+import os
+import select
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+SERVER_MODES = ("single", "threaded", "asyncio")
+SERVER_MODE = os.getenv("SERVER_MODE", "threaded").lower()
+SERVER_MAX_WORKERS = int(os.getenv("SERVER_MAX_WORKERS", 16))
+KEEPALIVE_TIMEOUT = float(os.getenv("KEEPALIVE_TIMEOUT", 5))
+
+# Upper bound on the size of a request head accepted by the asyncio server
+MAX_REQUEST_HEAD = 64 * 1024
+# How often an idle keep-alive connection checks whether others are waiting
+IDLE_POLL_INTERVAL = 0.05
+
+
+class _IdleConnectionServer(HTTPServer):
+    """HTTPServer that gives up idle keep-alive connections when others are waiting."""
+
+    def _others_waiting(self):
+        raise NotImplementedError
+
+    def wait_for_request(self, connection, rfile, timeout):
+        """Wait until the kept-alive ``connection`` has another request.
+
+        Returns False, and the handler closes the connection, once ``timeout``
+        seconds pass or another connection is waiting to be served.
+        """
+        # A request the client already pipelined may sit in rfile's buffer
+        connection.settimeout(0)
+        try:
+            if rfile.peek(1):
+                return True
+        except OSError:
+            pass
+        finally:
+            connection.settimeout(timeout)
+        deadline = time.monotonic() + (timeout if timeout is not None else float("inf"))
+        with selectors.DefaultSelector() as selector:
+            selector.register(connection, selectors.EVENT_READ)
+            while not self._others_waiting():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if selector.select(min(remaining, IDLE_POLL_INTERVAL)):
+                    return True
+        return False
+
+
+class SingleThreadHTTPServer(_IdleConnectionServer):
+    """The stock HTTPServer, dropping an idle keep-alive connection when another client connects."""
+
+    def _others_waiting(self):
+        return bool(select.select([self.socket], [], [], 0)[0])
+
+
+class BoundedThreadPoolHTTPServer(_IdleConnectionServer):
+    """HTTPServer that serves connections from a fixed-size worker pool.
+
+    Unlike ``ThreadingHTTPServer`` the number of threads never grows with the number
+    of clients: once every worker is busy the accept loop waits for a free slot and
+    new connections queue in the kernel listen backlog.
+    """
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers=SERVER_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_workers)
+        # Set while the accept loop waits for a free worker
+        self._saturated = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="HTTPWorker")
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        """Hand the connection to a pool worker, waiting for a free slot if needed."""
+        if not self._slots.acquire(blocking=False):
+            # Workers idling on keep-alive connections close them (see wait_for_request)
+            self._saturated.set()
+            self._slots.acquire()
+            self._saturated.clear()
+        try:
+            self._executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # The executor has been shut down while we were waiting for a slot
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def _others_waiting(self):
+        return self._saturated.is_set()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+class _BufferedConnection:
+    """Socket stand-in that feeds one buffered request to a request handler."""
+
+    def __init__(self, raw_request):
+        self._raw_request = raw_request
+        self._chunks = []
+
+    def makefile(self, mode="r", buffering=None):
+        return BytesIO(self._raw_request)
+
+    def sendall(self, data):
+        self._chunks.append(bytes(data))
+
+    def settimeout(self, timeout):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+    def getvalue(self):
+        return b"".join(self._chunks)
+
+
+def _parse_head(head):
+    """Split a raw HTTP message head into its start line and lower-cased headers."""
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def _keep_alive(request_head, response):
+    """Decide whether a connection may be reused after ``response`` was sent."""
+    request_line, request_headers = _parse_head(request_head)
+    response_line, response_headers = _parse_head(response.partition(b"\r\n\r\n")[0])
+    # 1xx, 204 and 304 responses never carry a body, so they need no Content-Length
+    status = response_line.split(" ", 2)[1] if response_line.count(" ") else ""
+    if "content-length" not in response_headers and not (status.startswith("1") or status in ("204", "304")):
+        return False
+    if response_headers.get("connection", "").lower() == "close" or response_line.startswith("HTTP/1.0"):
+        return False
+    connection = request_headers.get("connection", "").lower()
+    if request_line.endswith("HTTP/1.1"):
+        return connection != "close"
+    return connection == "keep-alive"
+
+
+class AsyncioHTTPServer:
+    """Asyncio HTTP/1.1 server that dispatches requests to a bounded worker pool.
+
+    Connections, including idle keep-alive connections, live on the event loop and
+    cost no thread. Each request is buffered, then handled by ``handler_class`` on
+    one of ``max_workers`` pool threads, so blocking handlers (Redis pings, database
+    probes) never stall the loop.
+    """
+
+    def __init__(self, server_address, handler_class, max_workers=SERVER_MAX_WORKERS,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT):
+        self.RequestHandlerClass = handler_class
+        self.max_workers = max_workers
+        self.keepalive_timeout = keepalive_timeout
+        self.socket = socket.create_server(server_address, backlog=128)
+        self.server_address = self.socket.getsockname()[:2]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="HTTPWorker")
+        self._loop = None
+        self._stopped = None
+
+    def serve_forever(self):
+        """Run the event loop until ``shutdown`` is called."""
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket,
+                                            limit=MAX_REQUEST_HEAD)
+        async with server:
+            await self._stopped.wait()
+        self._executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info("peername")
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    break
+                body = b""
+                content_length = int(_parse_head(head)[1].get("content-length", 0) or 0)
+                if content_length:
+                    body = await reader.readexactly(content_length)
+                response = await self._loop.run_in_executor(
+                    self._executor, self._dispatch, head + body, client_address
+                )
+                writer.write(response)
+                await writer.drain()
+                if not _keep_alive(head, response):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Open connections are cancelled when the server shuts down
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, raw_request, client_address):
+        connection = _BufferedConnection(raw_request)
+        try:
+            self.RequestHandlerClass(connection, client_address, self)
+        except Exception:
+            logger.exception("Unhandled error while serving %s", client_address)
+        return connection.getvalue()
+
+    def shutdown(self):
+        """Stop ``serve_forever``; safe to call from any thread."""
+        if self._loop is not None and self._stopped is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                # The loop already stopped and closed
+                pass
+
+    def server_close(self):
+        if self._loop is None:
+            # Never served: release the socket and pool here
+            self.socket.close()
+            self._executor.shutdown(wait=False)
+        else:
+            # The running loop closes the listening socket when it stops
+            self.shutdown()
+
+
+def make_server(server_address, handler_class, mode=None, max_workers=None):
+    """Build an HTTP server for ``handler_class`` in the requested mode."""
+    mode = (mode or SERVER_MODE).lower()
+    max_workers = max_workers or SERVER_MAX_WORKERS
+    if mode == "single":
+        return SingleThreadHTTPServer(server_address, handler_class)
+    if mode == "threaded":
+        return BoundedThreadPoolHTTPServer(server_address, handler_class, max_workers=max_workers)
+    if mode == "asyncio":
+        return AsyncioHTTPServer(server_address, handler_class, max_workers=max_workers)
+    raise ValueError(f"Unknown server mode: {mode}. Expected one of: {', '.join(SERVER_MODES)}")
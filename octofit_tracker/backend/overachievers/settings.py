@@ -56,6 +56,7 @@ INSTALLED_APPS += [
 ]
 
 MIDDLEWARE = [
+    "overachievers.middleware.RequestMetricsMiddleware",  # First, so it times the whole stack
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -71,12 +72,9 @@ MIDDLEWARE += [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
-# Middleware for performance optimization
-MIDDLEWARE += [
-    'django.middleware.cache.UpdateCacheMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',
-]
+# No site-wide UpdateCacheMiddleware/FetchFromCacheMiddleware: they key pages by
+# URL alone, so token-authenticated API responses could be served to the wrong
+# user. API views cache per user instead (see fitness_app.response_cache).
 
 ROOT_URLCONF = "overachievers.urls"
 
@@ -110,13 +108,44 @@ DATABASES = {
 }
 
 
-# Caching configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Caching configuration: shared by every worker through Redis when REDIS_URL is
+# set (see overachievers.cache), otherwise per process for local development.
+# Version stamps (fitness_app.versions) must be the same in every worker, so
+# without Redis they are kept in a database table (manage.py createcachetable).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'overachievers.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'octofit',
+            'OPTIONS': {
+                'serializer': 'overachievers.cache.CompressedSerializer',
+                'pool_class': 'redis.BlockingConnectionPool',
+                'max_connections': config('CACHE_MAX_CONNECTIONS', default=20, cast=int),
+                'timeout': 1.0,  # Seconds to wait for a free pooled connection
+                'socket_timeout': 1.0,
+                'socket_connect_timeout': 1.0,
+                'health_check_interval': 30,
+            },
+        }
     }
-}
+    VERSION_CACHE_ALIAS = 'default'
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'fitness_app_version_stamps',
+            'OPTIONS': {
+                'MAX_ENTRIES': 1_000_000,  # A culled stamp is only recreated, invalidating its snapshots
+            },
+        },
+    }
+    VERSION_CACHE_ALIAS = 'versions'
 
 
 # Password validation
@@ -158,6 +187,8 @@ LANGUAGES = [
 USE_I18N = True
 USE_L10N = True
 USE_TZ = True
+# The school's timezone: local days (streaks, daily badge limits) start at its midnight
+TIME_ZONE = config('TIME_ZONE', default='UTC')
 
 # Locale paths for translations
 LOCALE_PATHS = [
@@ -246,6 +277,27 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool)
 
+# Nutrition API (Edamam), see fitness_app.nutrition
+NUTRITION_API_URL = config('NUTRITION_API_URL', default='https://api.edamam.com/api/nutrition-data')
+NUTRITION_APP_ID = config('NUTRITION_APP_ID', default='YOUR_APP_ID')
+NUTRITION_APP_KEY = config('NUTRITION_APP_KEY', default='YOUR_APP_KEY')
+NUTRITION_TIMEOUT = config('NUTRITION_TIMEOUT', default=5.0, cast=float)  # Seconds per upstream read
+NUTRITION_CACHE_TIMEOUT = config('NUTRITION_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# Weather API (OpenWeatherMap), see fitness_app.weather
+WEATHER_API_URL = config('WEATHER_API_URL', default='https://api.openweathermap.org/data/2.5/weather')
+WEATHER_API_KEY = config('WEATHER_API_KEY', default='YOUR_API_KEY')
+WEATHER_TIMEOUT = config('WEATHER_TIMEOUT', default=3.0, cast=float)  # Seconds per upstream read
+WEATHER_FRESH_SECONDS = config('WEATHER_FRESH_SECONDS', default=10 * 60, cast=int)
+WEATHER_STALE_SECONDS = config('WEATHER_STALE_SECONDS', default=60 * 60, cast=int)  # Served while refreshing
+WEATHER_REFRESH_LOCATIONS = config('WEATHER_REFRESH_LOCATIONS', default='New York').split(';')  # ';'-separated, kept fresh in the background
+
+# Prometheus metrics (/metrics/), see overachievers.middleware
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Bearer token for scrapers outside METRICS_ALLOWED_IPS
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1').split(',')  # Addresses or networks (CIDR)
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default='')  # Shared by gunicorn workers to export all of them
+METRICS_PUBLISH_INTERVAL = config('METRICS_PUBLISH_INTERVAL', default=1.0, cast=float)  # Seconds between a worker's publishes
+
 # Input Validation and Data Sanitization
 DATA_VALIDATION = {
     'ENABLE_SANITIZATION': True,  # Enable input sanitization
@@ -274,4 +326,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Shared across all gunicorn workers through Redis (see fitness_app.throttling)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'fitness_app.throttling.SharedUserRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': config('API_THROTTLE_RATE', default='120/min'),
+    },
 }
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Celery application and tasks for the overachievers package.
+
+Kept out of ``__init__`` so importing the package does not import Celery or
+build the app; ``overachievers.celery_app`` loads this module on first access.
+"""
+import logging
+import os
+
+from celery import Celery
+from celery.signals import worker_process_shutdown
+
+from .mail import build_message, close_smtp_pool, get_smtp_pool
+
+logger = logging.getLogger(__name__)
+
+# Celery configuration
+celery_app = Celery("octofit_tracker", broker=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+celery_app.conf.update(
+    result_backend=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    task_serializer="json",
+    accept_content=["json"],
+    result_serializer="json",
+)
+
+# Named after the package, where the task used to be defined, so messages queued
+# before the move still find it
+@celery_app.task(name="octofit_tracker.backend.overachievers.send_email_task")
+def send_email_task(recipient_email, subject, message):
+    """Send an email asynchronously over the worker's pooled SMTP connection."""
+    try:
+        email_user = os.getenv("EMAIL_HOST_USER")
+        get_smtp_pool().send(build_message(email_user, recipient_email, subject, message))
+
+        logger.info(f"Email sent to {recipient_email}")
+        return f"Email sent to {recipient_email}"
+    except Exception as e:
+        logger.error(f"Failed to send email to {recipient_email}: {e}")
+        raise
+
+@celery_app.task(name="octofit_tracker.backend.overachievers.send_bulk_email_task")
+def send_bulk_email_task(recipient_emails, subject, message):
+    """Send the same email to each recipient, reusing one authenticated SMTP connection.
+
+    Returns the delivery report: messages sent, per-recipient failures and throughput.
+    """
+    email_user = os.getenv("EMAIL_HOST_USER")
+    report = get_smtp_pool().send_messages(
+        build_message(email_user, recipient, subject, message) for recipient in recipient_emails
+    )
+    logger.info(
+        f"Bulk email: {report.sent} sent, {len(report.failures)} failed in {report.elapsed:.2f}s "
+        f"({report.messages_per_second:.1f} messages/s over {report.connections} connection(s))"
+    )
+    for recipient, error in report.failures:
+        logger.error(f"Failed to send email to {recipient}: {error}")
+    return report.as_dict()
+
+@worker_process_shutdown.connect
+def close_smtp_connections(**kwargs):
+    close_smtp_pool()
@@ -4,6 +4,7 @@ from django.views.generic import TemplateView
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework.permissions import AllowAny
+from overachievers.middleware import metrics_view
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -21,4 +22,5 @@ urlpatterns = [
     path('', TemplateView.as_view(template_name='index.html')),  # Frontend
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('metrics/', metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
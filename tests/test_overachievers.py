@@ -1,45 +1,100 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from http.server import HTTPServer
-from io import BytesIO
+from io import BytesIO, StringIO
 from octofit_tracker.backend.overachievers import (
     configure_https,
     is_rate_limited,
     check_database_connection,
     validate_environment_variables,
     health_check,
-    metrics,
+    health_checks_total,
     HealthCheckHandler,
     MetricsHandler,
-    start_time,
     load_config_from_file,
     load_environment_config,
     graceful_shutdown,
     log_startup,
     celery_app,
-    example_task,
     send_email_task,
     check_redis_connection,
+    build_rate_limiter,
+    dependency_prober,
 )
+from octofit_tracker.backend.overachievers.servers import SERVER_MODES, make_server
+from octofit_tracker.backend.overachievers.rate_limit import RateLimiter, RedisRateLimiter
+from octofit_tracker.backend.overachievers.probes import DependencyProber
+from octofit_tracker.backend.overachievers.metrics import Histogram, MetricsRegistry
+from octofit_tracker.backend.overachievers.multiprocess import ProcessMetricsDirectory
+from octofit_tracker.backend.overachievers.mail import SMTPConnectionPool, build_message, close_smtp_pool
+from octofit_tracker.backend.overachievers.responses import ResponseCache, etag_matches
+from octofit_tracker.backend.overachievers.cache import (
+    COMPRESSED,
+    CompressedSerializer,
+    RedisCache,
+    cache_errors_total,
+    cache_lookups_total,
+)
+from octofit_tracker.backend.overachievers.access_log import (
+    DroppingQueueHandler,
+    log_records_dropped_total,
+    sampled_out,
+    start_queue_logging,
+)
+from benchmarks.import_time import IMPORT_TIME_BUDGET_MS, measure_import
+import http.client
 import json
+import logging
+import queue
+import socket
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from redis import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+def redis_for_tests():
+    """Return a fakeredis client, or a local redis-server if fakeredis is not installed."""
+    try:
+        import fakeredis
+        return fakeredis.FakeRedis()
+    except ImportError:
+        pass
+    try:
+        client = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), socket_timeout=1)
+        client.ping()
+        return client
+    except Exception:
+        return None
 
 class MockRequest:
-    """Mock HTTP request for testing."""
+    """Mock client connection for testing: a socket carrying one GET request."""
     def __init__(self, path):
         self.path = path
         self.client_address = ("127.0.0.1", 12345)
-        self.rfile = BytesIO()
+        self.rfile = BytesIO(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
         self.wfile = BytesIO()
 
-    def send_response(self, code):
-        self.response_code = code
-
-    def send_header(self, key, value):
+    def settimeout(self, timeout):
         pass
 
-    def end_headers(self):
+    def setsockopt(self, level, option, value):
         pass
 
+    def makefile(self, mode, buffering=None):
+        return self.rfile
+
+    def sendall(self, data):
+        self.wfile.write(data)
+
+    @property
+    def response_code(self):
+        status_line = self.wfile.getvalue().split(b"\r\n", 1)[0]
+        return int(status_line.split()[1])
+
 class TestOverachievers(unittest.TestCase):
     @patch("os.path.exists", return_value=True)
     @patch("ssl.create_default_context")
@@ -51,6 +106,7 @@ class TestOverachievers(unittest.TestCase):
         mock_ssl_context.assert_called_once()
         self.assertIsNotNone(context)
 
+    @patch("octofit_tracker.backend.overachievers.rate_limiter", build_rate_limiter())
     def test_is_rate_limited(self):
         """Test rate limiting functionality."""
         client_ip = "127.0.0.1"
@@ -63,7 +119,7 @@ class TestOverachievers(unittest.TestCase):
         """Test database connection check."""
         with patch("octofit_tracker.backend.overachievers.logger") as mock_logger:
             result = check_database_connection()
-            self.assertIn(result["status"], ["connected", "disconnected", "error"])
+            self.assertIn(result["status"], ["connected", "disconnected", "error", "not_configured"])
             mock_logger.error.assert_not_called()
 
     def test_validate_environment_variables(self):
@@ -74,51 +130,57 @@ class TestOverachievers(unittest.TestCase):
             except EnvironmentError:
                 self.fail("validate_environment_variables raised EnvironmentError unexpectedly!")
 
+        # CERT_FILE and KEY_FILE have fallback values in the package; SECRET_KEY does not
         with patch("os.getenv", side_effect=lambda var: None):
             with self.assertRaises(EnvironmentError):
-                validate_environment_variables(["CERT_FILE", "KEY_FILE"])
+                validate_environment_variables(["SECRET_KEY", "CERT_FILE", "KEY_FILE"])
 
     def test_health_check(self):
         """Test health check functionality."""
-        initial_health_checks = metrics["health_checks"]
+        initial_health_checks = health_checks_total.value()
         health_check()
-        self.assertEqual(metrics["health_checks"], initial_health_checks + 1)
+        self.assertEqual(health_checks_total.value(), initial_health_checks + 1)
 
+@patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+@patch("octofit_tracker.backend.overachievers.check_redis_connection", return_value={"status": "connected"})
+@patch("octofit_tracker.backend.overachievers.check_database_connection", return_value={"status": "connected"})
 class TestHTTPHandlers(unittest.TestCase):
-    def test_health_check_handler_root(self):
+    def setUp(self):
+        # A prober without results from earlier tests, running the same checks
+        patcher = patch("octofit_tracker.backend.overachievers.dependency_prober", DependencyProber(dependency_prober.checks))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_health_check_handler_root(self, *mocks):
         """Test the root endpoint."""
         request = MockRequest("/")
-        handler = HealthCheckHandler(request, None, None)
-        handler.do_GET()
+        HealthCheckHandler(request, request.client_address, None)
         self.assertEqual(request.response_code, 200)
 
-    def test_health_check_handler_health(self):
+    def test_health_check_handler_health(self, *mocks):
         """Test the /health endpoint."""
         request = MockRequest("/health")
-        handler = HealthCheckHandler(request, None, None)
-        handler.do_GET()
+        HealthCheckHandler(request, request.client_address, None)
         self.assertEqual(request.response_code, 200)
 
-    def test_health_check_handler_status(self):
-        """Test the /status endpoint."""
+    def test_health_check_handler_status(self, *mocks):
+        """Test that /status is not an endpoint; status is reported by /health."""
         request = MockRequest("/status")
-        handler = HealthCheckHandler(request, None, None)
-        handler.do_GET()
-        self.assertEqual(request.response_code, 200)
+        HealthCheckHandler(request, request.client_address, None)
+        self.assertEqual(request.response_code, 404)
 
-    def test_metrics_handler(self):
+    def test_metrics_handler(self, *mocks):
         """Test the /metrics endpoint."""
         request = MockRequest("/metrics")
-        handler = MetricsHandler(request, None, None)
-        handler.do_GET()
+        MetricsHandler(request, request.client_address, None)
         self.assertEqual(request.response_code, 200)
 
 class TestEdgeCases(unittest.TestCase):
-    def test_health_check_handler_invalid_path(self):
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_health_check_handler_invalid_path(self, mock_rate_limited):
         """Test an invalid path."""
         request = MockRequest("/invalid")
-        handler = HealthCheckHandler(request, None, None)
-        handler.do_GET()
+        HealthCheckHandler(request, request.client_address, None)
         self.assertEqual(request.response_code, 404)
 
     def test_validate_environment_variables_missing(self):
@@ -128,6 +190,12 @@ class TestEdgeCases(unittest.TestCase):
                 validate_environment_variables(["MISSING_VAR"])
 
 class TestRateLimiting(unittest.TestCase):
+    def setUp(self):
+        # Start from a fresh limiter: other tests use the same client IPs
+        patcher = patch("octofit_tracker.backend.overachievers.rate_limiter", build_rate_limiter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_rate_limiting_single_client(self):
         """Test rate limiting for a single client."""
         client_ip = "127.0.0.1"
@@ -145,13 +213,155 @@ class TestRateLimiting(unittest.TestCase):
         self.assertTrue(is_rate_limited(client_ip_1))
         self.assertTrue(is_rate_limited(client_ip_2))
 
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.clock = lambda: self.now
+
+    def test_token_bucket_refills(self):
+        """Test that the token bucket allows a burst and then refills over time."""
+        limiter = RateLimiter(5, period=1, mode="token_bucket", clock=self.clock)
+        self.assertEqual([limiter.is_limited("a") for _ in range(6)], [False] * 5 + [True])
+        self.now += 0.2
+        self.assertFalse(limiter.is_limited("a"))
+        self.assertTrue(limiter.is_limited("a"))
+
+    def test_sliding_log_window(self):
+        """Test that the sliding log allows at most `limit` requests per rolling period."""
+        limiter = RateLimiter(5, period=1, mode="sliding_log", clock=self.clock)
+        for _ in range(5):
+            self.assertFalse(limiter.is_limited("a"))
+            self.now += 0.1
+        self.assertTrue(limiter.is_limited("a"))
+        self.now = 1.01
+        self.assertFalse(limiter.is_limited("a"))
+
+    def test_tracked_clients_are_capped(self):
+        """Test that spraying distinct clients never exceeds the client cap."""
+        limiter = RateLimiter(5, max_clients=128, stripes=8, ttl=3600, clock=self.clock)
+        for i in range(10000):
+            limiter.is_limited(f"10.0.{i >> 8}.{i & 255}")
+        self.assertLessEqual(len(limiter), limiter.max_clients)
+
+    def test_idle_clients_expire(self):
+        """Test that idle clients are evicted once their TTL has passed."""
+        limiter = RateLimiter(5, max_clients=1024, stripes=1, clock=self.clock)
+        for i in range(100):
+            limiter.is_limited(str(i))
+        self.now += 2
+        limiter.is_limited("fresh")
+        self.assertEqual(len(limiter), 1)
+
+    def test_unknown_mode(self):
+        """Test that an unknown algorithm is rejected."""
+        with self.assertRaises(ValueError):
+            RateLimiter(5, mode="leaky")
+
+class TestRedisRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.client = redis_for_tests()
+        if self.client is None:
+            self.skipTest("fakeredis or a local redis-server is required")
+        self.prefix = f"test-ratelimit-{uuid.uuid4().hex}"
+
+    def test_limit_is_shared_between_workers(self):
+        """Test that two limiter instances (two workers) share one budget."""
+        worker_1 = RedisRateLimiter(5, period=60, client=self.client, prefix=self.prefix)
+        worker_2 = RedisRateLimiter(5, period=60, client=self.client, prefix=self.prefix)
+        results = [worker_1.is_limited("10.0.0.1") for _ in range(3)]
+        results += [worker_2.is_limited("10.0.0.1") for _ in range(3)]
+        self.assertEqual(results, [False] * 5 + [True])
+        self.assertFalse(worker_2.is_limited("10.0.0.2"))
+
+    def test_local_fallback_when_redis_is_down(self):
+        """Test that the limiter keeps enforcing limits locally when Redis fails."""
+        broken = MagicMock()
+        broken.register_script.return_value.side_effect = RedisConnectionError("down")
+        limiter = RedisRateLimiter(5, period=60, client=broken, prefix=self.prefix)
+        self.assertEqual([limiter.is_limited("10.0.0.1") for _ in range(6)], [False] * 5 + [True])
+        # Redis is not retried until the retry interval has passed
+        self.assertEqual(broken.register_script.return_value.call_count, 1)
+
+class TestRedisCache(unittest.TestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest("fakeredis is required")
+        options = {
+            "serializer": "octofit_tracker.backend.overachievers.cache.CompressedSerializer",
+            "pool_class": "redis.BlockingConnectionPool",
+            "max_connections": 2,
+            "connection_class": fakeredis.FakeConnection,
+            "server": fakeredis.FakeServer(),
+        }
+        self.server = options["server"]
+        self.now = 0.0
+        self.cache = RedisCache(
+            "redis://localhost:6379/0", {"KEY_PREFIX": uuid.uuid4().hex, "OPTIONS": options}, clock=lambda: self.now
+        )
+
+    def test_large_values_are_compressed(self):
+        """Test that large values are stored compressed and read back intact."""
+        serializer = CompressedSerializer()
+        large = [{"weight": 80.5, "date": "2024-01-01"}] * 500
+        self.assertTrue(serializer.dumps(large).startswith(COMPRESSED))
+        self.assertLess(len(serializer.dumps(large)), len(serializer.dumps(large[:1])) * 50)
+        self.assertFalse(serializer.dumps({"small": True}).startswith(COMPRESSED))
+        self.cache.set("large", large)
+        self.assertEqual(self.cache.get("large"), large)
+
+    def test_integers_stay_plain(self):
+        """Test that integers are not pickled, so incr works in Redis."""
+        self.cache.set("count", 41)
+        self.assertEqual(self.cache.incr("count"), 42)
+        self.assertEqual(self.cache.get("count"), 42)
+
+    def test_hits_and_misses_are_counted(self):
+        """Test that single and batched lookups count hits and misses."""
+        hits, misses = cache_lookups_total.value(result="hit"), cache_lookups_total.value(result="miss")
+        self.cache.set("present", "yes")
+        self.assertEqual(self.cache.get("present"), "yes")
+        self.assertEqual(self.cache.get("absent", "default"), "default")
+        self.assertEqual(self.cache.get_many(["present", "absent"]), {"present": "yes"})
+        self.assertEqual(cache_lookups_total.value(result="hit"), hits + 2)
+        self.assertEqual(cache_lookups_total.value(result="miss"), misses + 2)
+
+    def test_redis_errors_fail_open(self):
+        """Test that with Redis down reads miss and writes do nothing, then Redis is retried later."""
+        self.cache.set("present", "yes")
+        self.server.connected = False
+        errors = cache_errors_total.value(operation="get")
+        skipped = cache_errors_total.value(operation="get_many")
+        with self.assertLogs("octofit_tracker.backend.overachievers.cache", "WARNING"):
+            self.assertEqual(self.cache.get("present", "default"), "default")
+        self.assertEqual(cache_errors_total.value(operation="get"), errors + 1)
+        # Redis is left alone until the retry interval has passed
+        self.assertEqual(self.cache.get_many(["present"]), {})
+        self.assertIsNone(self.cache.set("other", "value"))
+        self.assertFalse(self.cache.add("other", "value"))
+        self.assertFalse(self.cache.delete("present"))
+        self.assertEqual(cache_errors_total.value(operation="get_many"), skipped)
+        self.now += self.cache.retry_interval
+        with self.assertLogs("octofit_tracker.backend.overachievers.cache", "WARNING"):
+            self.assertEqual(self.cache.set_many({"other": "value"}), ["other"])
+        self.server.connected = True
+        self.now += self.cache.retry_interval
+        self.assertEqual(self.cache.get("present"), "yes")
+        self.assertIsNone(self.cache.get("other"))
+
 class TestErrorResponses(unittest.TestCase):
-    def test_health_check_handler_error(self):
+    def setUp(self):
+        patcher = patch("octofit_tracker.backend.overachievers.dependency_prober", DependencyProber(dependency_prober.checks))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_health_check_handler_error(self, mock_rate_limited):
         """Test error response for health check."""
         with patch("octofit_tracker.backend.overachievers.check_database_connection", side_effect=Exception("Database error")):
             request = MockRequest("/health")
-            handler = HealthCheckHandler(request, None, None)
-            handler.do_GET()
+            HealthCheckHandler(request, request.client_address, None)
             self.assertEqual(request.response_code, 500)
 
 class TestConfiguration(unittest.TestCase):
@@ -164,34 +374,37 @@ class TestConfiguration(unittest.TestCase):
                 self.assertEqual(config, valid_config)
 
     def test_load_config_from_file_missing(self):
-        """Test loading a missing configuration file."""
+        """Test that a missing configuration file falls back to defaults."""
         with patch("os.path.exists", return_value=False):
-            with self.assertRaises(FileNotFoundError):
-                load_config_from_file("/path/to/missing_config.json")
+            self.assertEqual(load_config_from_file("/path/to/missing_config.json"), {})
 
     def test_load_environment_config_valid(self):
         """Test loading a valid environment-specific configuration."""
-        with patch("os.getenv", side_effect=lambda var: "development" if var == "ENVIRONMENT" else None):
+        with patch("os.getenv", side_effect=lambda var, default=None: "development" if var == "ENVIRONMENT" else default):
             config = load_environment_config()
             self.assertEqual(config["health_check_port"], 8080)
             self.assertEqual(config["log_level"], "DEBUG")
 
     def test_load_environment_config_invalid(self):
         """Test loading an invalid environment-specific configuration."""
-        with patch("os.getenv", side_effect=lambda var: "invalid" if var == "ENVIRONMENT" else None):
+        with patch("os.getenv", side_effect=lambda var, default=None: "invalid" if var == "ENVIRONMENT" else default):
             with self.assertRaises(ValueError):
                 load_environment_config()
 
 class TestGracefulShutdown(unittest.TestCase):
     def test_graceful_shutdown(self):
         """Test graceful shutdown behavior."""
-        with patch("octofit_tracker.backend.overachievers.logger") as mock_logger:
-            with patch("threading.Thread.join") as mock_join:
-                with patch("http.server.HTTPServer.server_close") as mock_server_close:
-                    graceful_shutdown()
-                    mock_logger.info.assert_any_call("Performing graceful shutdown...")
-                    mock_server_close.assert_called()
-                    mock_join.assert_called()
+        server = MagicMock(server_address=("0.0.0.0", 8080))
+        thread = MagicMock()
+        thread.is_alive.return_value = True
+        with patch("octofit_tracker.backend.overachievers.logger") as mock_logger, \
+                patch("octofit_tracker.backend.overachievers.running_servers", [server]), \
+                patch("octofit_tracker.backend.overachievers.threads", [thread]):
+            with self.assertRaises(SystemExit):
+                graceful_shutdown()
+            mock_logger.info.assert_any_call("Performing graceful shutdown...")
+            server.server_close.assert_called_once()
+            thread.join.assert_called_once_with(timeout=5)
 
 class TestLoggingBehavior(unittest.TestCase):
     def test_log_startup(self):
@@ -204,10 +417,19 @@ class TestLoggingBehavior(unittest.TestCase):
             mock_logger.info.assert_any_call("Metrics Port: 9090")
 
 class TestCeleryIntegration(unittest.TestCase):
-    def test_celery_task_execution(self):
+    @patch("octofit_tracker.backend.overachievers.mail.smtplib.SMTP")
+    def test_celery_task_execution(self, mock_smtp):
         """Test that a Celery task executes successfully."""
-        result = example_task.apply().get()
-        self.assertEqual(result, "Task completed successfully!")
+        close_smtp_pool()
+        self.addCleanup(close_smtp_pool)
+        result = send_email_task.apply(args=("test@example.com", "Test Subject", "Test Message")).get()
+        self.assertEqual(result, "Email sent to test@example.com")
+
+    def test_task_names_are_stable(self):
+        """Test that the tasks keep the names workers and queued messages know them by."""
+        self.assertEqual(send_email_task.name, "octofit_tracker.backend.overachievers.send_email_task")
+        self.assertIn("octofit_tracker.backend.overachievers.send_email_task", celery_app.tasks)
+        self.assertIn("octofit_tracker.backend.overachievers.send_bulk_email_task", celery_app.tasks)
 
     def test_celery_configuration(self):
         """Test that Celery is configured with the correct broker and backend."""
@@ -215,6 +437,13 @@ class TestCeleryIntegration(unittest.TestCase):
         self.assertEqual(celery_app.conf.result_backend, "redis://localhost:6379/0")
 
 class TestDatabaseConnection(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The probe runs SELECT 1 on every Django database alias; use an in-memory SQLite one
+        from django.conf import settings
+        if not settings.configured:
+            settings.configure(DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}})
+
     def test_check_database_connection_success(self):
         """Test successful database connection."""
         with patch("octofit_tracker.backend.overachievers.logger") as mock_logger:
@@ -222,43 +451,567 @@ class TestDatabaseConnection(unittest.TestCase):
             self.assertEqual(result["status"], "connected")
             mock_logger.error.assert_not_called()
 
+    def test_hung_probe_is_not_queued_behind(self):
+        """Test that while an alias's probe hangs, later probes report it at once instead of queueing."""
+        from octofit_tracker.backend.overachievers import probes
+        release = threading.Event()
+        self.addCleanup(release.set)
+        hung = MagicMock(side_effect=lambda alias, timeout: release.wait(5) and {"status": "connected"})
+        with patch.object(probes, "_probe_alias", hung):
+            first = probes.check_database_connections(timeout=0.05)
+            started = time.perf_counter()
+            second = probes.check_database_connections(timeout=0.05)
+            self.assertLess(time.perf_counter() - started, 0.05)
+            self.assertEqual(hung.call_count, 1)
+            release.set()
+            probes._db_probes_in_flight["default"][0].result(timeout=5)
+        self.assertEqual(first["aliases"]["default"]["status"], "timeout")
+        self.assertEqual(second["aliases"]["default"]["status"], "timeout")
+        self.assertIn("Previous probe still running", second["aliases"]["default"]["error"])
+        self.assertEqual(probes.check_database_connections()["status"], "connected")
+
     def test_check_database_connection_failure(self):
         """Test failed database connection."""
         with patch("octofit_tracker.backend.overachievers.logger") as mock_logger:
-            with patch("octofit_tracker.backend.overachievers.check_database_connection", side_effect=Exception("Connection error")):
+            with patch("octofit_tracker.backend.overachievers.check_database_connections", side_effect=Exception("Connection error")):
                 result = check_database_connection()
                 self.assertEqual(result["status"], "error")
                 self.assertIn("error", result)
                 mock_logger.error.assert_called_with("Database connection check failed: Connection error")
 
+class TestDjangoConfiguration(unittest.TestCase):
+    # Each test runs in a fresh interpreter; Django can only be set up once per process
+    def probe_database(self, setup, **env):
+        code = (
+            "import json; from octofit_tracker.backend import overachievers; "
+            f"{setup}; print(json.dumps(overachievers.check_database_connection()))"
+        )
+        env = {key: value for key, value in os.environ.items() if key != "DJANGO_SETTINGS_MODULE"} | env
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def test_configure_django_uses_project_settings(self):
+        """Test that configure_django() gives the database probe the project's database."""
+        settings_env = {
+            "DATABASE_URL": "sqlite://:memory:",
+            "JWT_SECRET_KEY": "test",
+            "EMAIL_HOST": "localhost",
+            "EMAIL_PORT": "25",
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+            "EMAIL_USE_TLS": "False",
+        }
+        result = self.probe_database("overachievers.configure_django()", **settings_env)
+        self.assertEqual(result["status"], "connected")
+        self.assertIn("default", result["aliases"])
+
+    def test_unconfigured_django_is_not_a_failure(self):
+        """Test that without Django settings the database is reported as not configured."""
+        result = self.probe_database("pass")
+        self.assertEqual(result["status"], "not_configured")
+
+    def test_unimportable_settings_are_not_configured(self):
+        """Test that settings that fail to import are reported as not configured."""
+        result = self.probe_database("overachievers.configure_django()", DJANGO_SETTINGS_MODULE="missing.settings")
+        self.assertEqual(result["status"], "not_configured")
+
 class TestEmailTask(unittest.TestCase):
-    @patch("octofit_tracker.backend.overachievers.smtplib.SMTP")
+    def setUp(self):
+        # Connections are pooled per process; start every test without one
+        close_smtp_pool()
+
+    @patch("octofit_tracker.backend.overachievers.mail.smtplib.SMTP")
     def test_send_email_task_success(self, mock_smtp):
         """Test successful email sending."""
         result = send_email_task("test@example.com", "Test Subject", "Test Message")
         self.assertEqual(result, "Email sent to test@example.com")
         mock_smtp.assert_called_once()
 
-    @patch("octofit_tracker.backend.overachievers.smtplib.SMTP", side_effect=Exception("SMTP error"))
+    @patch("octofit_tracker.backend.overachievers.mail.smtplib.SMTP", side_effect=Exception("SMTP error"))
     def test_send_email_task_failure(self, mock_smtp):
         """Test failed email sending."""
         with self.assertRaises(Exception):
             send_email_task("test@example.com", "Test Subject", "Test Message")
 
+def free_port():
+    """Return a local port nothing is listening on."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+class RecordingSMTPHandler:
+    """aiosmtpd handler that records messages and the client port each came from."""
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.deliveries = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.deliveries.append((session.peer[1], envelope.rcpt_tos[0]))
+        return "250 Message accepted for delivery"
+
+class TestSMTPConnectionPool(unittest.TestCase):
+    def setUp(self):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            self.skipTest("aiosmtpd is not installed")
+        # Controller checks it is up by connecting to its configured port, so it cannot use port 0
+        port = free_port()
+        self.handler = RecordingSMTPHandler(rejected={"nobody@example.com"})
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.pool = SMTPConnectionPool("127.0.0.1", port, use_tls=False)
+        self.addCleanup(self.pool.close)
+
+    def messages(self, recipients):
+        return [build_message("coach@example.com", recipient, "Practice", "See you at 5.") for recipient in recipients]
+
+    def test_batch_reuses_one_connection(self):
+        """Test that a batch is sent over a single connection, which is reused by the next batch."""
+        report = self.pool.send_messages(self.messages([f"student{i}@example.com" for i in range(20)]))
+        self.assertEqual(report.sent, 20)
+        self.assertEqual(report.connections, 1)
+        self.assertGreater(report.messages_per_second, 0)
+        self.assertEqual(self.pool.send_messages(self.messages(["late@example.com"])).connections, 0)
+        self.assertEqual(len({port for port, _ in self.handler.deliveries}), 1)
+
+    def test_rejected_recipients_are_reported(self):
+        """Test that a rejected message is reported without stopping the batch."""
+        report = self.pool.send_messages(self.messages(["a@example.com", "nobody@example.com", "b@example.com"]))
+        self.assertEqual(report.sent, 2)
+        self.assertEqual([failure["recipient"] for failure in report.as_dict()["failed"]], ["nobody@example.com"])
+        self.assertEqual(report.connections, 1)
+
+    def test_reconnects_after_connection_loss(self):
+        """Test that a pooled connection dropped by the server is replaced transparently."""
+        self.pool.send_messages(self.messages(["a@example.com"]))
+        connection, _ = self.pool._idle[-1]
+        connection.sock.shutdown(socket.SHUT_RDWR)
+        report = self.pool.send_messages(self.messages(["b@example.com"]))
+        self.assertEqual(report.sent, 1)
+        self.assertEqual(report.connections, 1)
+
+    def test_idle_connections_expire(self):
+        """Test that connections idle for longer than idle_timeout are not reused."""
+        self.pool.idle_timeout = 0
+        self.pool.send_messages(self.messages(["a@example.com"]))
+        time.sleep(0.01)
+        self.assertEqual(self.pool.send_messages(self.messages(["b@example.com"])).connections, 1)
+
+    def test_unreachable_server_fails_the_batch(self):
+        """Test that every message fails, without hanging, when no connection can be opened."""
+        pool = SMTPConnectionPool("127.0.0.1", free_port(), use_tls=False, timeout=1)
+        report = pool.send_messages(self.messages(["a@example.com", "b@example.com"]))
+        self.assertEqual(report.sent, 0)
+        self.assertEqual(len(report.failures), 2)
+
 class TestRedisConnection(unittest.TestCase):
     def test_check_redis_connection_success(self):
         """Test successful Redis connection."""
-        with patch("octofit_tracker.backend.overachievers.Redis.from_url") as mock_redis:
+        with patch("octofit_tracker.backend.overachievers.get_redis_client") as mock_redis:
             mock_redis.return_value.ping.return_value = True
             result = check_redis_connection()
             self.assertEqual(result["status"], "connected")
 
     def test_check_redis_connection_failure(self):
         """Test failed Redis connection."""
-        with patch("octofit_tracker.backend.overachievers.Redis.from_url", side_effect=Exception("Connection error")):
+        with patch("octofit_tracker.backend.overachievers.get_redis_client", side_effect=Exception("Connection error")):
             result = check_redis_connection()
             self.assertEqual(result["status"], "error")
             self.assertIn("error", result)
 
+class TestServerModes(unittest.TestCase):
+    def _serve(self, mode):
+        server = make_server(("127.0.0.1", 0), MetricsHandler, mode=mode, max_workers=2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_keep_alive_in_every_mode(self, mock_rate_limited):
+        """Test that every server mode answers several requests over one connection."""
+        for mode in SERVER_MODES:
+            with self.subTest(mode=mode):
+                connection = http.client.HTTPConnection("127.0.0.1", self._serve(mode), timeout=5)
+                self.addCleanup(connection.close)
+                for _ in range(3):
+                    connection.request("GET", "/metrics")
+                    response = connection.getresponse()
+                    self.assertEqual(response.status, 200)
+                    self.assertIn(b"health_checks_total", response.read())
+                    self.assertFalse(response.will_close)
+
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_keep_alive_latency(self, mock_rate_limited):
+        """Test that reused connections are not held back by Nagle's algorithm and delayed ACKs."""
+        for mode in SERVER_MODES:
+            with self.subTest(mode=mode):
+                connection = http.client.HTTPConnection("127.0.0.1", self._serve(mode), timeout=5)
+                self.addCleanup(connection.close)
+                latencies = []
+                for _ in range(20):
+                    started = time.perf_counter()
+                    connection.request("GET", "/metrics")
+                    connection.getresponse().read()
+                    latencies.append(time.perf_counter() - started)
+                # A delayed ACK stall costs ~40 ms per request
+                self.assertLess(sorted(latencies)[len(latencies) // 2], 0.02)
+
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_idle_keep_alive_clients_do_not_block_new_ones(self, mock_rate_limited):
+        """Test that idle keep-alive connections holding every worker give way to a new client."""
+        for mode in ("single", "threaded"):
+            with self.subTest(mode=mode):
+                port = self._serve(mode)
+                idle = []
+                for _ in range(2):
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                    self.addCleanup(connection.close)
+                    connection.request("GET", "/metrics")
+                    connection.getresponse().read()
+                    idle.append(connection)
+                started = time.perf_counter()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                self.addCleanup(connection.close)
+                connection.request("GET", "/metrics")
+                self.assertEqual(connection.getresponse().status, 200)
+                # Well under the 5 s keep-alive timeout
+                self.assertLess(time.perf_counter() - started, 1)
+
+    def test_unknown_server_mode(self):
+        """Test that an unknown server mode is rejected."""
+        with self.assertRaises(ValueError):
+            make_server(("127.0.0.1", 0), MetricsHandler, mode="forking")
+
+class TestDependencyProber(unittest.TestCase):
+    def test_snapshot_is_served_without_rerunning_checks(self):
+        """Test that a running prober serves cached results instead of probing per request."""
+        check = MagicMock(return_value={"status": "connected"})
+        prober = DependencyProber({"redis": check}, interval=60)
+        prober.start()
+        self.addCleanup(prober.stop)
+        for _ in range(100):
+            snapshot = prober.snapshot()
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual(snapshot["redis"]["status"], "connected")
+        self.assertIn("age_seconds", snapshot["redis"])
+        self.assertIn("latency_ms", snapshot["redis"])
+
+    def test_failing_check_is_reported(self):
+        """Test that an exception in a check is reported as an error."""
+        prober = DependencyProber({"database": MagicMock(side_effect=Exception("boom"))})
+        result = prober.snapshot()["database"]
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["error"], "boom")
+
+    def test_snapshot_is_reused_without_background_thread(self):
+        """Test that without the background thread results are reused until they are interval old."""
+        check = MagicMock(return_value={"status": "connected"})
+        prober = DependencyProber({"redis": check}, interval=0.2)
+        for _ in range(100):
+            prober.snapshot()
+        self.assertEqual(check.call_count, 1)
+        time.sleep(0.25)
+        prober.snapshot()
+        self.assertEqual(check.call_count, 2)
+
+    def test_inline_refresh_does_not_block_other_callers(self):
+        """Test that callers get the previous results while another caller refreshes them."""
+        release = threading.Event()
+        calls = []
+
+        def check():
+            calls.append(1)
+            if len(calls) > 1:
+                release.wait(5)
+            return {"status": "connected", "round": len(calls)}
+
+        prober = DependencyProber({"redis": check}, interval=0.01)
+        prober.snapshot()
+        time.sleep(0.02)
+        refresher = threading.Thread(target=prober.snapshot)
+        refresher.start()
+        self.addCleanup(refresher.join, 5)
+        self.addCleanup(release.set)
+        while len(calls) < 2:
+            time.sleep(0.001)
+        started = time.perf_counter()
+        snapshots = [prober.snapshot() for _ in range(50)]
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(snapshot["redis"]["round"] == 1 for snapshot in snapshots))
+        release.set()
+        refresher.join(5)
+        self.assertEqual(prober.snapshot()["redis"]["round"], 2)
+
+    def test_old_results_are_stale(self):
+        """Test that results older than stale_after are marked stale."""
+        prober = DependencyProber({"redis": lambda: {"status": "connected"}}, interval=60, stale_after=0.01)
+        prober.start()
+        self.addCleanup(prober.stop)
+        prober.snapshot()
+        time.sleep(0.05)
+        self.assertEqual(prober.snapshot()["redis"]["status"], "stale")
+
+class TestHistogram(unittest.TestCase):
+    def test_render_cumulative_buckets(self):
+        """Test that histogram buckets are cumulative and labelled."""
+        histogram = Histogram("probe_seconds", "Probe latency.", labelnames=("alias",), buckets=(0.01, 0.1))
+        for value in (0.005, 0.05, 0.5):
+            histogram.observe(value, alias="default")
+        lines = histogram.render()
+        self.assertIn('probe_seconds_bucket{alias="default",le="0.01"} 1', lines)
+        self.assertIn('probe_seconds_bucket{alias="default",le="0.1"} 2', lines)
+        self.assertIn('probe_seconds_bucket{alias="default",le="+Inf"} 3', lines)
+        self.assertIn('probe_seconds_count{alias="default"} 3', lines)
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_sharded_counter_across_threads(self):
+        """Test that per-thread shards add up, including shards of exited threads."""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.", labelnames=("status",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(status="200")
+
+        workers = [threading.Thread(target=work) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(counter.value(status="200"), 8000)
+        self.assertIn('requests_total{status="200"} 8000', registry.render())
+
+    def test_gauge_function_and_type_conflicts(self):
+        """Test computed gauges and that a name cannot be registered with two types."""
+        registry = MetricsRegistry()
+        registry.gauge("uptime_seconds", "Uptime.").set_function(lambda: 42)
+        self.assertIn("uptime_seconds 42", registry.render())
+        with self.assertRaises(ValueError):
+            registry.counter("uptime_seconds", "Uptime.")
+
+    def test_version_tracks_stored_metrics(self):
+        """Test that the version changes on updates but not for computed gauges."""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.")
+        registry.gauge("uptime_seconds", "Uptime.").set_function(time.monotonic)
+        version = registry.version()
+        self.assertEqual(registry.version(), version)
+        counter.inc()
+        self.assertNotEqual(registry.version(), version)
+        self.assertNotIn("uptime_seconds", registry.render(volatile=False))
+        self.assertIn("uptime_seconds", registry.render(volatile=True))
+
+    def test_wrong_labels_are_rejected(self):
+        """Test that updates with the wrong label names fail loudly."""
+        counter = MetricsRegistry().counter("requests_total", "Requests.", labelnames=("status",))
+        with self.assertRaises(ValueError):
+            counter.inc(view="home")
+
+    def test_merge_sums_counters_and_labels_gauges_by_process(self):
+        """Test that merged dumps add counters and histograms and keep gauges per process."""
+        dumps = {}
+        for pid, requests in ((101, 3), (102, 4)):
+            registry = MetricsRegistry()
+            counter = registry.counter("requests_total", "Requests.", labelnames=("status",))
+            counter.inc(requests, status="200")
+            registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)).observe(0.5)
+            registry.gauge("database_up", "Up.", labelnames=("alias",)).set(1, alias="default")
+            dumps[pid] = json.loads(json.dumps(registry.dump()))
+        rendered = MetricsRegistry.merge(dumps).render()
+        self.assertIn('requests_total{status="200"} 7', rendered)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', rendered)
+        self.assertIn('database_up{alias="default",pid="101"} 1', rendered)
+        self.assertIn('database_up{alias="default",pid="102"} 1', rendered)
+
+class TestProcessMetricsDirectory(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+
+    def test_render_merges_every_process(self):
+        """Test that a scrape reports other workers' counters, and exited workers' gauges are dropped."""
+        exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+        exited_pid = int(exited.stdout)
+        other = MetricsRegistry()
+        other.counter("requests_total", "Requests.").inc(5)
+        other.gauge("queue_depth", "Queued.").set(9)
+        with open(os.path.join(self.path, f"{exited_pid}.json"), "w") as file:
+            json.dump(other.dump(), file)
+
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests.").inc(2)
+        registry.gauge("queue_depth", "Queued.").set(1)
+        registry.gauge("uptime_seconds", "Uptime.").set_function(lambda: 42)
+        rendered = ProcessMetricsDirectory(self.path, registry=registry).render()
+        self.assertIn("requests_total 7", rendered)
+        self.assertIn(f'queue_depth{{pid="{os.getpid()}"}} 1', rendered)
+        self.assertNotIn(f'pid="{exited_pid}"', rendered)
+        self.assertIn("uptime_seconds 42", rendered)
+
+    def test_publish_is_rate_limited(self):
+        """Test that publishing more often than the interval does not rewrite the file."""
+        now = [0.0]
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.")
+        directory = ProcessMetricsDirectory(self.path, registry=registry, publish_interval=1, clock=lambda: now[0])
+        path = os.path.join(self.path, f"{os.getpid()}.json")
+        directory.publish()
+        counter.inc()
+        directory.publish()
+        with open(path) as file:
+            self.assertEqual(json.load(file)["requests_total"]["values"], [])
+        now[0] = 1.5
+        directory.publish()
+        with open(path) as file:
+            self.assertEqual(json.load(file)["requests_total"]["values"], [[[], 1]])
+
+class TestResponseCache(unittest.TestCase):
+    def test_rebuilds_only_when_version_changes(self):
+        """Test that a body is rendered once per version with matching headers."""
+        cache = ResponseCache()
+        render = MagicMock(return_value=b'{"ok": true}')
+        first = cache.get("doc", 1, render)
+        self.assertIs(cache.get("doc", 1, render), first)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content_length, "12")
+        second = cache.get("doc", 2, render)
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(second.etag, first.etag)
+
+    def test_etag_matching(self):
+        """Test If-None-Match lists, weak validators and wildcards."""
+        self.assertTrue(etag_matches('"a", W/"b"', '"b"'))
+        self.assertTrue(etag_matches("*", '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+        self.assertTrue(etag_matches('W/"b"', 'W/"b"'))
+        self.assertTrue(etag_matches('"b"', 'W/"b"'))
+
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_metrics_get_304_until_stored_metrics_change(self, mock_rate_limited):
+        """Test that /metrics keeps its ETag across scrapes while only computed gauges change."""
+        server = make_server(("127.0.0.1", 0), MetricsHandler, mode="threaded", max_workers=2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        self.addCleanup(connection.close)
+
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        self.assertIn(b"uptime_seconds", response.read())
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+
+        connection.request("GET", "/metrics", headers={"If-None-Match": etag})
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 304)
+
+        health_checks_total.inc()
+        connection.request("GET", "/metrics", headers={"If-None-Match": etag})
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    @patch("octofit_tracker.backend.overachievers.is_rate_limited", return_value=False)
+    def test_conditional_requests_get_304(self, mock_rate_limited):
+        """Test that a matching If-None-Match gets 304 and the connection stays usable."""
+        for mode in SERVER_MODES:
+            with self.subTest(mode=mode):
+                server = make_server(("127.0.0.1", 0), HealthCheckHandler, mode=mode, max_workers=2)
+                thread = threading.Thread(target=server.serve_forever, daemon=True)
+                thread.start()
+                self.addCleanup(thread.join, 5)
+                self.addCleanup(server.server_close)
+                self.addCleanup(server.shutdown)
+                connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+                self.addCleanup(connection.close)
+
+                connection.request("GET", "/")
+                response = connection.getresponse()
+                body = response.read()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(int(response.headers["Content-Length"]), len(body))
+                etag = response.headers["ETag"]
+
+                connection.request("GET", "/", headers={"If-None-Match": etag})
+                response = connection.getresponse()
+                self.assertEqual(response.status, 304)
+                self.assertEqual(response.read(), b"")
+                self.assertFalse(response.will_close)
+
+                connection.request("GET", "/", headers={"If-None-Match": '"stale"'})
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.read(), body)
+
+class TestAccessLog(unittest.TestCase):
+    def test_full_queue_drops_and_counts(self):
+        """Test that records are dropped and counted, not blocked on, when the queue is full."""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.makeLogRecord({"msg": "Request from %s", "args": ("127.0.0.1",)})
+        dropped = log_records_dropped_total.value()
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(log_records_dropped_total.value(), dropped + 1)
+        # Enqueued unformatted; the listener builds the message
+        self.assertEqual(handler.queue.get_nowait().args, ("127.0.0.1",))
+
+    def test_sampling_keeps_errors(self):
+        """Test that only successful requests are sampled out."""
+        self.assertTrue(sampled_out(200, sample_rate=0.0))
+        self.assertTrue(sampled_out(304, sample_rate=0.0))
+        self.assertFalse(sampled_out(429, sample_rate=0.0))
+        self.assertFalse(sampled_out(500, sample_rate=0.0))
+        self.assertFalse(sampled_out(200, sample_rate=1.0))
+
+    def test_queue_listener_writes_records(self):
+        """Test that records logged through the queue reach the original handlers."""
+        target = logging.getLogger(f"test.access.{uuid.uuid4().hex}")
+        target.propagate = False
+        stream = StringIO()
+        target.addHandler(logging.StreamHandler(stream))
+        listener = start_queue_logging(target)
+        target.warning("Request from %s: %s", "127.0.0.1", "GET /health")
+        listener.stop()
+        self.assertEqual(stream.getvalue(), "Request from 127.0.0.1: GET /health\n")
+
+class TestImportTime(unittest.TestCase):
+    def test_import_has_no_side_effects(self):
+        """Test that importing the package starts no threads and loads no heavy dependencies."""
+        result = measure_import(runs=1)
+        self.assertEqual(result["threads"], 1)
+        self.assertEqual(result["heavy_modules"], [])
+
+    def test_import_time_budget(self):
+        """Test that importing the package stays within the import-time budget."""
+        result = measure_import(runs=3)
+        self.assertLessEqual(result["total_ms"], IMPORT_TIME_BUDGET_MS)
+
+    def test_celery_app_is_loaded_lazily(self):
+        """Test that the Celery app is reachable under the names `celery -A` looks for."""
+        import octofit_tracker.backend.overachievers as overachievers
+        self.assertIs(overachievers.celery, overachievers.celery_app)
+        with self.assertRaises(AttributeError):
+            overachievers.no_such_attribute
+
 if __name__ == "__main__":
     unittest.main()